@@ -11,4 +11,6 @@ Modules:
 
 Packages:
     pages: Contains the Page Object Model classes and their locators.
+    support: Contains the test infrastructure (e.g., the browser pool).
+    tests: Contains the unit tests of the framework's own code.
 """
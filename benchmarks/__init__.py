@@ -0,0 +1,7 @@
+"""
+The benchmarks of the framework's wait primitives and page flows.
+
+Run them with python -m benchmarks.run_benchmarks (see its docstring).
+The load runner, python -m benchmarks.load_runner, replays the page
+object flows as concurrent virtual users.
+"""
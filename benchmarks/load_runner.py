@@ -0,0 +1,537 @@
+"""
+Runs the page-object flows as concurrent virtual users to load a store.
+
+Every virtual user repeats the flows (the guest adding a promo product
+to the basket, the UI sign-up, and the guest's empty basket) through
+the same page objects as the tests, each iteration as a new visitor.
+In the "http" mode, every user drives an HTTP driver of its own (see
+support/http_driver.py): the pages and the forms are requested without
+a browser, and the promo quiz, which only the page asks, is skipped.
+In the "browser" mode, the users share a bounded set of headless
+browsers with the "fast" profile, one per iteration.
+
+The users start evenly over the ramp-up period and pause for the think
+time (give or take half of it) after every step. For every step of
+every flow, reports the throughput, the error rate, the latency
+percentiles, and a latency histogram:
+
+    python -m benchmarks.load_runner --base-url=https://staging.example/ \
+        --users=50 --ramp-up=30 --duration=300 --think-time=2
+
+    python -m benchmarks.load_runner --local-store --mode=browser \
+        --users=8 --browsers=4 --duration=60
+
+The run fails (exit code 1) if the error rate exceeds --max-error-rate.
+"""
+
+import argparse
+import json
+import pathlib
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from configuration import DEFAULT_BASE_URL, Links
+from pages.basket_page import BasketPage
+from pages.locators import BasketPageLocators
+from pages.login_and_sign_up_page import LoginAndSignUpPage
+from pages.main_page import MainPage
+from pages.product_page import ProductPage
+from support.browser_pool import BrowserPool
+from support.http_driver import HttpDriver
+from support.local_store import LocalStore
+from support.store_api import generate_user_credentials
+
+from .run_benchmarks import percentile, start_benchmark_browser
+
+# Default number of virtual users, their ramp-up period and the length
+# of the run (in seconds), and the think time after a step (in seconds).
+DEFAULT_USERS = 10
+DEFAULT_RAMP_UP = 10
+DEFAULT_DURATION = 60
+DEFAULT_THINK_TIME = 1.0
+
+# The think time varies by this fraction either way.
+THINK_TIME_JITTER = 0.5
+
+# Default number of browsers shared by the users in the browser mode.
+DEFAULT_BROWSERS = 4
+
+# The upper bounds (in ms) of the latency histogram's buckets; the last
+# bucket holds the slower steps.
+HISTOGRAM_BOUNDS = (50, 100, 200, 500, 1000, 2000, 5000)
+
+# The length the error messages are cut to in the report.
+MAX_ERROR_LENGTH = 200
+
+
+class StepFailed(Exception):
+    """Raised when a step of a flow fails; its error is recorded."""
+
+
+def flow_guest_add_to_basket(user):
+    """Add a promo product to the basket as a guest and open the basket."""
+    page = ProductPage(user.driver, f"{Links.PRODUCT_PAGE}?promo=offer0")
+    with user.step("open product page"):
+        page.open()
+
+    with user.step("add to basket"):
+        page.add_product_to_basket()
+        if user.in_browser:
+            page.solve_quiz_alert()
+        page.should_be_product_added_message()
+
+    with user.step("open basket"):
+        page.go_to_basket()
+        basket_page = BasketPage(user.driver, user.driver.current_url)
+        assert basket_page.is_element_present(
+            *BasketPageLocators.BASKET_ITEMS
+        ), "Basket is empty but should not be"
+
+
+def flow_sign_up(user):
+    """Sign up a new user through the sign-up form."""
+    page = MainPage(user.driver, Links.MAIN_PAGE)
+    with user.step("open main page"):
+        page.open()
+
+    with user.step("open login page"):
+        page.go_to_login_and_sign_up_page()
+        login_page = LoginAndSignUpPage(
+            user.driver, user.driver.current_url
+        )
+        login_page.should_be_sign_up_form()
+
+    # The users sign up at the same time, so the time is not unique.
+    email, password = generate_user_credentials()
+    with user.step("sign up"):
+        login_page.sign_up_new_user(f"vu{user.number}-{email}", password)
+        login_page.should_be_authorized_user()
+
+
+def flow_guest_basket(user):
+    """Open the guest's basket from the main page and check it is empty."""
+    page = MainPage(user.driver, Links.MAIN_PAGE)
+    with user.step("open main page"):
+        page.open()
+
+    with user.step("open basket"):
+        page.go_to_basket()
+        basket_page = BasketPage(user.driver, user.driver.current_url)
+        basket_page.should_be_empty()
+        basket_page.should_be_empty_basket_message()
+
+
+# The flows: functions that run the steps of a VirtualUser.
+FLOWS = {
+    "guest_add_to_basket": flow_guest_add_to_basket,
+    "sign_up": flow_sign_up,
+    "guest_basket": flow_guest_basket,
+}
+
+
+class LoadStats:
+    """The latencies and the errors of the steps, shared by the users."""
+
+    def __init__(self):
+        """Initialize the empty statistics."""
+        self._lock = threading.Lock()
+        # {step: [latency in seconds]}
+        self._latencies = {}
+        # {step: {error message: count}}
+        self._errors = {}
+        self.iterations = 0
+
+    def record(self, step, latency, error=None):
+        """Add a step's latency and its error, if it has failed."""
+        with self._lock:
+            self._latencies.setdefault(step, []).append(latency)
+            if error is not None:
+                errors = self._errors.setdefault(step, {})
+                errors[error] = errors.get(error, 0) + 1
+
+    def add_iteration(self):
+        """Count a finished iteration of a flow."""
+        with self._lock:
+            self.iterations += 1
+
+    def summary(self, elapsed):
+        """Return {step: its statistics} for the run's elapsed time."""
+        with self._lock:
+            latencies = {
+                step: list(values)
+                for step, values in self._latencies.items()
+            }
+            errors = {
+                step: dict(messages)
+                for step, messages in self._errors.items()
+            }
+
+        summary = {}
+        for step, values in sorted(latencies.items()):
+            error_count = sum(errors.get(step, {}).values())
+            summary[step] = {
+                "count": len(values),
+                "throughput": len(values) / elapsed if elapsed else 0.0,
+                "errors": error_count,
+                "error_rate": error_count / len(values),
+                "p50": percentile(values, 0.5),
+                "p95": percentile(values, 0.95),
+                "p99": percentile(values, 0.99),
+                "max": max(values),
+                "histogram": histogram(values),
+                "error_messages": errors.get(step, {}),
+            }
+
+        return summary
+
+
+def histogram(latencies):
+    """Return the {bucket label: count} histogram of the latencies."""
+    labels = [f"<{bound}ms" for bound in HISTOGRAM_BOUNDS]
+    labels.append(f">={HISTOGRAM_BOUNDS[-1]}ms")
+    counts = dict.fromkeys(labels, 0)
+    for latency in latencies:
+        milliseconds = latency * 1000
+        index = next(
+            (
+                index for index, bound in enumerate(HISTOGRAM_BOUNDS)
+                if milliseconds < bound
+            ),
+            len(HISTOGRAM_BOUNDS)
+        )
+        counts[labels[index]] += 1
+
+    return counts
+
+
+def _error_message(exception):
+    """Return the first line of the exception's description."""
+    lines = str(exception).strip().splitlines()
+    message = type(exception).__name__
+    if lines:
+        message += f": {lines[0]}"
+
+    return message[:MAX_ERROR_LENGTH]
+
+
+class DriverLeases:
+    """The drivers leased to the virtual users for an iteration each."""
+
+    def __init__(self, factory, reset, size):
+        """
+        Initialize the set of at most size drivers.
+
+        The factory starts a new driver. reset(driver) brings it back
+        to a clean state, returning False if the driver is broken.
+        """
+        self.factory = factory
+        self.reset = reset
+        self.size = size
+        self._idle = queue.Queue()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lease(self):
+        """Lease an idle driver, or a new one, or wait for one."""
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                start = len(self._drivers) < self.size
+                if start:
+                    # Hold the place while the driver starts.
+                    self._drivers.append(None)
+            if start:
+                driver = self._start()
+            else:
+                driver = self._idle.get()
+
+        try:
+            yield driver
+        finally:
+            if self.reset(driver):
+                self._idle.put(driver)
+            else:
+                self._discard(driver)
+
+    def close(self):
+        """Quit all the drivers."""
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            if driver is not None:
+                driver.quit()
+
+    def _start(self):
+        """Start a driver in the place held for it."""
+        try:
+            driver = self.factory()
+        except Exception:
+            with self._lock:
+                self._drivers.remove(None)
+            raise
+
+        with self._lock:
+            self._drivers[self._drivers.index(None)] = driver
+
+        return driver
+
+    def _discard(self, driver):
+        """Quit the broken driver and free its place."""
+        with self._lock:
+            self._drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            # The driver is already broken; nothing to clean up.
+            pass
+
+
+def reset_http_driver(driver):
+    """Forget the HTTP driver's visitor; it is never broken."""
+    driver.reset()
+
+    return True
+
+
+class VirtualUser:
+    """A visitor of the store repeating the flows."""
+
+    def __init__(self, number, stats, think_time, in_browser):
+        """Initialize the user with its number (from 0)."""
+        self.number = number
+        self.stats = stats
+        self.think_time = think_time
+        self.in_browser = in_browser
+        self.driver = None
+        self.flow = None
+        self._random = random.Random(number)
+
+    @contextmanager
+    def step(self, name):
+        """
+        Time the step of the current flow and pause for the think time.
+
+        Raises StepFailed if the step fails, so the flow stops.
+        """
+        error = None
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as exception:
+            error = _error_message(exception)
+            raise StepFailed(error) from exception
+        finally:
+            self.stats.record(
+                f"{self.flow}: {name}", time.perf_counter() - started, error
+            )
+
+        self.think()
+
+    def think(self):
+        """Pause for the think time, give or take the jitter."""
+        if self.think_time:
+            time.sleep(self.think_time * self._random.uniform(
+                1 - THINK_TIME_JITTER, 1 + THINK_TIME_JITTER
+            ))
+
+    def run(self, flows, leases, deadline, iterations=None):
+        """
+        Run the flows in turn with the leased drivers until the deadline
+        or for the number of iterations.
+        """
+        iteration = 0
+        while time.monotonic() < deadline and (
+                iterations is None or iteration < iterations
+        ):
+            self.flow = flows[(self.number + iteration) % len(flows)]
+            try:
+                with leases.lease() as self.driver:
+                    FLOWS[self.flow](self)
+            except StepFailed:
+                self.think()
+            except Exception as exception:
+                # E.g., a browser that cannot be started.
+                self.stats.record(
+                    f"{self.flow}: (setup)", 0.0, _error_message(exception)
+                )
+                self.think()
+            finally:
+                self.driver = None
+
+            self.stats.add_iteration()
+            iteration += 1
+
+
+def run_load(args, flows):
+    """Run the virtual users; return the statistics and the elapsed time."""
+    if args.mode == "browser":
+        leases = DriverLeases(
+            start_benchmark_browser, BrowserPool.reset, args.browsers
+        )
+    else:
+        leases = DriverLeases(
+            lambda: HttpDriver("en"), reset_http_driver, args.users
+        )
+
+    stats = LoadStats()
+    started = time.monotonic()
+    deadline = started + args.duration
+
+    def run_user(number):
+        time.sleep(args.ramp_up * number / args.users)
+        VirtualUser(
+            number, stats, args.think_time, args.mode == "browser"
+        ).run(flows, leases, deadline, args.iterations)
+
+    threads = [
+        threading.Thread(target=run_user, args=(number,), daemon=True)
+        for number in range(args.users)
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        leases.close()
+
+    return stats, time.monotonic() - started
+
+
+def print_report(summary, elapsed, iterations):
+    """Print the statistics of every step."""
+    print(f"{iterations} iterations in {elapsed:.1f} s")
+    print(
+        f"{'step':<40} {'count':>6} {'req/s':>7} {'errors':>7} "
+        f"{'p50, ms':>8} {'p95, ms':>8} {'p99, ms':>8}"
+    )
+    for step, result in summary.items():
+        print(
+            f"{step:<40} {result['count']:6d} {result['throughput']:7.2f} "
+            f"{result['error_rate']:7.1%} {result['p50'] * 1000:8.1f} "
+            f"{result['p95'] * 1000:8.1f} {result['p99'] * 1000:8.1f}"
+        )
+        print("    " + "  ".join(
+            f"{label}: {count}"
+            for label, count in result["histogram"].items()
+        ))
+        for message, count in result["error_messages"].items():
+            print(f"    {count} x {message}")
+
+
+def parse_args(argv):
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "flows", nargs="*", metavar="FLOW",
+        help=f"Flows to run (all by default): {', '.join(FLOWS)}."
+    )
+    parser.add_argument(
+        "--mode", choices=("http", "browser"), default="http",
+        help="Drive the flows over HTTP or in headless browsers."
+    )
+    parser.add_argument(
+        "--users", type=int, default=DEFAULT_USERS,
+        help="Number of concurrent virtual users."
+    )
+    parser.add_argument(
+        "--ramp-up", type=float, default=DEFAULT_RAMP_UP,
+        help="Seconds over which the users start."
+    )
+    parser.add_argument(
+        "--duration", type=float, default=DEFAULT_DURATION,
+        help="Seconds after which the users stop starting new flows."
+    )
+    parser.add_argument(
+        "--iterations", type=int,
+        help="Maximum number of flows per user (unlimited by default)."
+    )
+    parser.add_argument(
+        "--think-time", type=float, default=DEFAULT_THINK_TIME,
+        help="Mean pause (in seconds) after every step."
+    )
+    parser.add_argument(
+        "--browsers", type=int, default=DEFAULT_BROWSERS,
+        help="Number of browsers shared by the users (browser mode)."
+    )
+    parser.add_argument(
+        "--base-url", default=DEFAULT_BASE_URL,
+        help="Base URL of the web store to load."
+    )
+    parser.add_argument(
+        "--local-store", action="store_true",
+        help="Load a local stand-in web store instead (e.g., to try "
+             "the runner)."
+    )
+    parser.add_argument(
+        "--output",
+        help="File to save the statistics to as JSON."
+    )
+    parser.add_argument(
+        "--max-error-rate", type=float,
+        help="Fail if the overall error rate exceeds it (e.g., 0.01)."
+    )
+
+    args = parser.parse_args(argv)
+    unknown_flows = set(args.flows) - set(FLOWS)
+    if unknown_flows:
+        parser.error(f"unknown flows: {', '.join(sorted(unknown_flows))}")
+    if args.users < 1 or args.browsers < 1:
+        parser.error("--users and --browsers must be at least 1")
+
+    return args
+
+
+def main(argv=None):
+    """Run the load, report it, and check the error rate."""
+    args = parse_args(argv)
+    flows = args.flows or list(FLOWS)
+
+    local_store = LocalStore().start() if args.local_store else None
+    Links.set_base_url(
+        local_store.base_url if local_store else args.base_url
+    )
+    try:
+        stats, elapsed = run_load(args, flows)
+    finally:
+        if local_store is not None:
+            local_store.stop()
+
+    summary = stats.summary(elapsed)
+    print_report(summary, elapsed, stats.iterations)
+
+    if args.output:
+        output = pathlib.Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({
+            "mode": args.mode,
+            "users": args.users,
+            "elapsed": elapsed,
+            "iterations": stats.iterations,
+            "steps": summary,
+        }, indent=2), encoding="utf-8")
+        print(f"Results saved to {args.output}")
+
+    if args.max_error_rate is None:
+        return 0
+
+    steps = sum(result["count"] for result in summary.values())
+    errors = sum(result["errors"] for result in summary.values())
+    error_rate = errors / steps if steps else 0.0
+    if error_rate > args.max_error_rate:
+        print(
+            f"ERROR RATE {error_rate:.1%} > {args.max_error_rate:.1%}"
+        )
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
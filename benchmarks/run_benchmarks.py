@@ -0,0 +1,328 @@
+"""
+Runs the benchmarks of the BasePage wait primitives and page flows.
+
+The primitives run against the static HTML pages in benchmarks/fixtures
+and the product flows against the local stand-in web store, all in a
+headless Chrome with the "fast" browser profile, so the results do not
+depend on the network. For every benchmark, reports the p50 and p95
+latency and the number of WebDriver commands issued per run.
+
+The results are saved as JSON to benchmarks/results (by default, named
+after the current git commit) and can be compared with the results of
+another commit:
+
+    python -m benchmarks.run_benchmarks \
+        --baseline=benchmarks/results/abc1234.json
+
+The run fails (exit code 1) if a latency grows by more than the
+threshold or a benchmark issues more commands than in the baseline.
+"""
+
+import argparse
+import json
+import math
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+
+from configuration import Links
+from pages.base_page import BasePage
+from pages.product_page import ProductPage
+from support.browser_pool import BrowserPool
+from support.browser_profiles import (
+    PROFILES,
+    apply_profile_blocking,
+    apply_profile_options,
+)
+from support.local_store import LocalStore
+
+# The directories of the fixture pages and of the results.
+FIXTURES_DIR = pathlib.Path(__file__).parent / "fixtures"
+RESULTS_DIR = pathlib.Path(__file__).parent / "results"
+
+# Default number of measured runs and warm-up runs per benchmark.
+DEFAULT_RUNS = 20
+DEFAULT_WARMUP_RUNS = 2
+
+# Default allowed latency growth (a fraction) before the run fails.
+DEFAULT_THRESHOLD = 0.2
+
+# The delay (in milliseconds) before the fixture pages change.
+FIXTURE_DELAY = 300
+
+# The element the fixture pages add or remove.
+TARGET = (By.ID, "target")
+
+
+def fixture_url(name):
+    """Return the URL of the fixture page with the delay parameter."""
+    return f"{(FIXTURES_DIR / name).as_uri()}?delay={FIXTURE_DELAY}"
+
+
+def bench_appearing_element(browser):
+    """Wait for an element added after the delay."""
+    page = BasePage(browser, fixture_url("appearing_element.html"))
+    page.open()
+
+    yield
+
+    assert page.is_element_present(*TARGET)
+
+
+def bench_disappearing_element(browser):
+    """Wait for an element removed after the delay."""
+    page = BasePage(browser, fixture_url("disappearing_element.html"))
+    page.open()
+
+    yield
+
+    assert page.is_disappeared(*TARGET)
+
+
+def bench_absent_element(browser):
+    """Check for an element that never appears."""
+    page = BasePage(browser, fixture_url("absent_element.html"))
+    page.open()
+
+    yield
+
+    assert page.is_not_element_present(*TARGET)
+
+
+def bench_product_getters(browser):
+    """Read the product name and price with the getters."""
+    page = ProductPage(browser, Links.PRODUCT_PAGE)
+    page.open()
+
+    yield
+
+    assert page.get_product_name()
+    assert page.get_product_price()
+
+
+def bench_add_to_basket_flow(browser):
+    """Add a promo product to the basket and check the messages."""
+    page = ProductPage(browser, f"{Links.PRODUCT_PAGE}?promo=offer0")
+
+    yield
+
+    page.open()
+    snapshot = page.take_product_snapshot()
+    product_name = page.get_product_name(snapshot=snapshot)
+    product_price = page.get_product_price(snapshot=snapshot)
+
+    page.add_product_to_basket()
+    page.solve_quiz_alert()
+
+    snapshot = page.take_product_snapshot(after_adding=True)
+    page.should_be_product_added_message(snapshot)
+    page.should_be_basket_total_message(snapshot)
+    page.should_be_correct_product_name_in_product_added_message(
+        product_name, snapshot
+    )
+    page.should_be_correct_price_in_basket_total_message(
+        product_price, snapshot
+    )
+
+
+# The benchmarks: generators that prepare the page, yield, and then run
+# the measured code.
+BENCHMARKS = {
+    "appearing_element": bench_appearing_element,
+    "disappearing_element": bench_disappearing_element,
+    "absent_element": bench_absent_element,
+    "product_getters": bench_product_getters,
+    "add_to_basket_flow": bench_add_to_basket_flow,
+}
+
+
+def start_benchmark_browser():
+    """Launch a headless Chrome with the "fast" browser profile."""
+    profile = PROFILES["fast"]
+    options = Options()
+    apply_profile_options(profile, options)
+    # Like the tests' browsers: the dialogs are left to the page objects.
+    options.unhandled_prompt_behavior = "ignore"
+
+    browser = webdriver.Chrome(options=options)
+    apply_profile_blocking(profile, browser)
+
+    return browser
+
+
+def count_commands(browser):
+    """Count the browser's WebDriver commands; return the counter."""
+    counter = {"commands": 0}
+    execute = browser.execute
+
+    def counted_execute(driver_command, params=None):
+        counter["commands"] += 1
+        return execute(driver_command, params)
+
+    browser.execute = counted_execute
+
+    return counter
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of the values."""
+    ordered = sorted(values)
+
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def run_benchmark(browser, counter, benchmark, runs, warmup_runs):
+    """Return the latency percentiles and command count of a benchmark."""
+    durations = []
+    commands = []
+    for run in range(warmup_runs + runs):
+        BrowserPool.reset(browser)
+
+        steps = benchmark(browser)
+        next(steps)
+
+        counter["commands"] = 0
+        started = time.perf_counter()
+        for _ in steps:
+            pass
+        duration = time.perf_counter() - started
+
+        if run >= warmup_runs:
+            durations.append(duration)
+            commands.append(counter["commands"])
+
+    return {
+        "p50": percentile(durations, 0.5),
+        "p95": percentile(durations, 0.95),
+        "commands": statistics.median_low(commands),
+    }
+
+
+def find_regressions(results, baseline, threshold):
+    """Return the descriptions of the regressions against the baseline."""
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            continue
+
+        for metric in ("p50", "p95"):
+            limit = base[metric] * (1 + threshold)
+            if result[metric] > limit:
+                regressions.append(
+                    f"{name}: {metric} {result[metric] * 1000:.1f} ms > "
+                    f"{limit * 1000:.1f} ms "
+                    f"(baseline {base[metric] * 1000:.1f} ms)"
+                )
+        if result["commands"] > base["commands"]:
+            regressions.append(
+                f"{name}: {result['commands']} commands > "
+                f"{base['commands']} (baseline)"
+            )
+
+    return regressions
+
+
+def current_commit():
+    """Return the short hash of the current git commit or "unknown"."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def parse_args(argv):
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "names", nargs="*", metavar="NAME",
+        help=f"Benchmarks to run (all by default): {', '.join(BENCHMARKS)}."
+    )
+    parser.add_argument(
+        "--runs", type=int, default=DEFAULT_RUNS,
+        help="Number of measured runs per benchmark."
+    )
+    parser.add_argument(
+        "--warmup-runs", type=int, default=DEFAULT_WARMUP_RUNS,
+        help="Number of unmeasured runs per benchmark."
+    )
+    parser.add_argument(
+        "--output",
+        help="Results file (by default, results/<commit>.json)."
+    )
+    parser.add_argument(
+        "--baseline",
+        help="Results file of another commit to compare with."
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD,
+        help="Allowed latency growth against the baseline (e.g., 0.2)."
+    )
+
+    args = parser.parse_args(argv)
+    unknown_names = set(args.names) - set(BENCHMARKS)
+    if unknown_names:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown_names))}")
+
+    return args
+
+
+def main(argv=None):
+    """Run the benchmarks, save the results, and compare them."""
+    args = parse_args(argv)
+    names = args.names or list(BENCHMARKS)
+    commit = current_commit()
+
+    local_store = LocalStore().start()
+    Links.set_base_url(local_store.base_url)
+    browser = start_benchmark_browser()
+    counter = count_commands(browser)
+
+    results = {"commit": commit, "runs": args.runs, "benchmarks": {}}
+    try:
+        print(
+            f"{'benchmark':<22} {'p50, ms':>8} {'p95, ms':>8} "
+            f"{'commands':>8}"
+        )
+        for name in names:
+            result = run_benchmark(
+                browser, counter, BENCHMARKS[name],
+                args.runs, args.warmup_runs
+            )
+            results["benchmarks"][name] = result
+            print(
+                f"{name:<22} {result['p50'] * 1000:8.1f} "
+                f"{result['p95'] * 1000:8.1f} {result['commands']:8d}"
+            )
+    finally:
+        browser.quit()
+        local_store.stop()
+
+    output = pathlib.Path(args.output or RESULTS_DIR / f"{commit}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"Results saved to {os.path.relpath(output)}")
+
+    if args.baseline is None:
+        return 0
+
+    baseline = json.loads(pathlib.Path(args.baseline).read_text("utf-8"))
+    regressions = find_regressions(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
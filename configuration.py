@@ -2,16 +2,65 @@
 Stores configuration constants such as URLs for testing.
 
 Centralizes external links to simplify maintenance if they change.
+The pages the tests reach by navigation have routes: their canonical
+URLs in an interface language, so a test can open them directly.
+All the links can be pointed to another web store (e.g., the local
+stand-in store) with the --base-url command-line option.
 """
 
+# The base URL of the web store under test.
+DEFAULT_BASE_URL = "http://selenium1py.pythonanywhere.com/"
+
+# The paths of the pages relative to the base URL.
+PRODUCT_PAGE_PATH = "catalogue/coders-at-work_207/"
+LOGIN_PAGE_PATH = "accounts/login/"
+BASKET_PAGE_PATH = "basket/"
+
+# The store's language prefixes for the --language values that differ
+# from them (the English pages are under /en-gb/).
+LANGUAGE_PREFIXES = {"en": "en-gb"}
+
+# The paths of the pages opened directly, by their page object classes.
+# The store redirects a path without a language prefix to the prefixed
+# one, so the routes include the prefix (see Links.route()).
+ROUTES = {
+    "BasketPage": BASKET_PAGE_PATH,
+    "LoginAndSignUpPage": LOGIN_PAGE_PATH,
+}
+
+
 class Links:
     """Container for the URLs used by the automated tests."""
 
+    # The base URL of the web store under test.
+    BASE_URL = DEFAULT_BASE_URL
+
     # The URL of the web store's main page.
-    MAIN_PAGE = "http://selenium1py.pythonanywhere.com/"
+    MAIN_PAGE = DEFAULT_BASE_URL
 
     # The URL of the product page ("Coders at Work" book).
-    PRODUCT_PAGE = (
-        "http://selenium1py.pythonanywhere.com/catalogue/"
-        "coders-at-work_207/"
-    )
+    PRODUCT_PAGE = DEFAULT_BASE_URL + PRODUCT_PAGE_PATH
+
+    # The URL of the login and sign-up page.
+    LOGIN_PAGE = DEFAULT_BASE_URL + LOGIN_PAGE_PATH
+
+    @classmethod
+    def set_base_url(cls, base_url):
+        """Point all the URLs to the web store at the given base URL."""
+        base_url = base_url.rstrip("/") + "/"
+
+        cls.BASE_URL = base_url
+        cls.MAIN_PAGE = base_url
+        cls.PRODUCT_PAGE = base_url + PRODUCT_PAGE_PATH
+        cls.LOGIN_PAGE = base_url + LOGIN_PAGE_PATH
+
+    @classmethod
+    def route(cls, page, language):
+        """
+        Return the canonical URL of the page object class's page
+        (e.g., "BasketPage") in the interface language.
+        """
+        language = language.lower()
+        prefix = LANGUAGE_PREFIXES.get(language, language)
+
+        return f"{cls.BASE_URL}{prefix}/{ROUTES[page]}"
@@ -1,19 +1,118 @@
 """
 Sets up the pytest testing environment.
 
-Defines the browser setup and the CLI option for the browser's locale.
+Defines the browser setup and the CLI options for the browser's locale
+and for the reuse of the browsers between the tests. Provides the
+registered users, whose logged-in state can be shared between the tests.
 """
 
+import asyncio
+import inspect
+import os
+import time
+from contextlib import contextmanager
+
 import pytest
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 
+from configuration import DEFAULT_BASE_URL, Links
+from pages.base_page import BasePage, QUIZ_SOLVER_JS
+from pages.basket_page import BasketPage
+from pages.locator_timings import DEFAULT_TIMINGS_DB, LocatorTimings
+from pages.login_and_sign_up_page import LoginAndSignUpPage
+from pages.main_page import MainPage
+from pages.page_timings import DEFAULT_PAGE_TIMINGS_DB, PageTimings
+from support.async_cdp import AsyncBrowser
+from support.auth_state import (
+    AuthStateStore,
+    DEFAULT_TTL,
+    capture_local_storage,
+    new_auth_state,
+    restore_auth_state,
+)
+from support.browser_pool import (
+    BrowserPool,
+    DEFAULT_MAX_USES,
+    add_script_to_new_documents,
+)
+from support.browser_profiles import (
+    DEFAULT_PROFILE,
+    PROFILES,
+    apply_profile_blocking,
+    apply_profile_options,
+    describe_profile,
+)
+from support import http_cache
+from support.chrome_service import SharedChromeService
+from support.command_trace import (
+    DEFAULT_TRACE_DIR,
+    CommandTracer,
+    clear_traces,
+    summarize_traces,
+)
+from support.duration_schedule import (
+    DEFAULT_DURATIONS_FILE,
+    DurationRecorder,
+    DurationStore,
+    group_key,
+    parse_shard,
+)
+from support.failure_artifacts import (
+    DEFAULT_ARTIFACTS_DIR,
+    DEFAULT_MAX_SIZE_MB,
+    FailureArtifacts,
+)
+from support.http_driver import HttpDriver
+from support.local_store import LocalStore
+from support.profile_template import ProfileTemplate
+from support.store_api import StoreApi, generate_user_credentials
+from support.tab_scheduler import TabScheduler
+
+# Passes the URL of the local store to the pytest-xdist workers.
+LOCAL_STORE_URL_VARIABLE = "LOCAL_STORE_URL"
+
+# Passes the run's directory of the failure artifacts to the workers.
+ARTIFACTS_RUN_VARIABLE = "FAILURE_ARTIFACTS_RUN"
+
+# The page object methods that click through to the routed pages.
+NAVIGATION_METHODS = {
+    BasketPage: "go_to_basket",
+    LoginAndSignUpPage: "go_to_login_and_sign_up_page",
+}
+
+# The reports of the test's phases by their names, e.g., "call".
+phase_reports_key = pytest.StashKey()
+
 
 def pytest_addoption(parser):
     """
-    Add the custom --language command-line option to pytest.
+    Add the custom command-line options to pytest.
 
-    This enables running tests with a localized browser interface.
+    --language enables running tests with a localized browser interface.
+    --browser-max-uses limits how many tests a pooled browser serves.
+    --browser-profile chooses the browser's performance settings.
+    --no-browser-warm-up stops starting spare browsers in the background.
+    --profile-template starts the browsers with a pre-warmed profile.
+    --no-http-driver runs the no_js tests in browsers too.
+    --navigate-by-click makes open_page() click through in all the tests.
+    --auth-state and --auth-state-ttl control the sharing of
+    a logged-in user between the tests.
+    --base-url and --local-store choose the web store under test.
+    --http-cache, --http-cache-dir, and --http-cache-max-mb control
+    the record-and-replay cache of the static resources.
+    --trace-commands and --trace-dir turn on the per-command latency
+    trace of the browsers.
+    --adaptive-timeouts and --timings-db turn on the per-locator
+    timeouts learned from the past runs.
+    --page-timings and --page-timings-db turn on the page-load metrics
+    and the load budgets of the page objects.
+    --multi-tab runs the cases of the multi_tab tests concurrently.
+    --quiz-mode chooses how the promo quiz is answered.
+    --artifacts-dir and --artifacts-max-mb control the saved state
+    of the failed tests' browsers.
+    --schedule-by-durations, --shard, and --durations-path balance
+    the tests between the workers and the CI shards by their durations.
     """
     parser.addoption(
         "--language",
@@ -21,25 +120,1019 @@ def pytest_addoption(parser):
         default="en",
         help="Choose browser language (e.g., en, es, fr, ru)."
     )
+    parser.addoption(
+        "--browser-max-uses",
+        action="store",
+        type=int,
+        default=DEFAULT_MAX_USES,
+        help="Number of tests served by a browser before it is recycled."
+    )
+    parser.addoption(
+        "--browser-profile",
+        action="store",
+        choices=sorted(PROFILES),
+        default=DEFAULT_PROFILE,
+        help="Browser performance profile (a test's browser_profile "
+             "marker overrides it)."
+    )
+    parser.addoption(
+        "--no-browser-warm-up",
+        action="store_true",
+        help="Do not start the next pooled browser in the background."
+    )
+    parser.addoption(
+        "--profile-template",
+        action="store_true",
+        help="Start every browser with a copy of a profile whose caches "
+             "were filled by visiting the store once per run."
+    )
+    parser.addoption(
+        "--no-http-driver",
+        action="store_true",
+        help="Run the no_js tests in browsers instead of the browserless "
+             "HTTP driver."
+    )
+    parser.addoption(
+        "--navigate-by-click",
+        action="store_true",
+        help="Reach the routed pages by clicking through from another "
+             "page in all the tests, not only in the navigation tests."
+    )
+    parser.addoption(
+        "--auth-state",
+        action="store",
+        choices=("off", "worker", "run"),
+        default="worker",
+        help="Share a logged-in user per worker, per run, or not at all."
+    )
+    parser.addoption(
+        "--auth-state-ttl",
+        action="store",
+        type=float,
+        default=DEFAULT_TTL,
+        help="Lifetime (in seconds) of a shared logged-in user."
+    )
+    parser.addoption(
+        "--base-url",
+        action="store",
+        default=DEFAULT_BASE_URL,
+        help="Base URL of the web store under test."
+    )
+    parser.addoption(
+        "--local-store",
+        action="store_true",
+        help="Run the tests against the local stand-in web store."
+    )
+    parser.addoption(
+        "--http-cache",
+        action="store",
+        choices=(http_cache.OFF, http_cache.RECORD, http_cache.REPLAY),
+        default=http_cache.OFF,
+        help="Record the static resources to the cache or replay them."
+    )
+    parser.addoption(
+        "--http-cache-dir",
+        action="store",
+        default=http_cache.DEFAULT_CACHE_DIR,
+        help="Directory of the record-and-replay HTTP cache."
+    )
+    parser.addoption(
+        "--http-cache-max-mb",
+        action="store",
+        type=int,
+        default=http_cache.DEFAULT_MAX_SIZE_MB,
+        help="Size limit (in megabytes) of the HTTP cache."
+    )
+    parser.addoption(
+        "--trace-commands",
+        action="store_true",
+        help="Trace the latency of every WebDriver command of the tests."
+    )
+    parser.addoption(
+        "--trace-dir",
+        action="store",
+        default=DEFAULT_TRACE_DIR,
+        help="Directory of the per-test command trace files."
+    )
+    parser.addoption(
+        "--adaptive-timeouts",
+        action="store_true",
+        help="Record the locators' appearance latencies and wait for "
+             "each locator as long as its history suggests."
+    )
+    parser.addoption(
+        "--timings-db",
+        action="store",
+        default=DEFAULT_TIMINGS_DB,
+        help="SQLite database of the locators' appearance latencies."
+    )
+    parser.addoption(
+        "--page-timings",
+        action="store_true",
+        help="Measure every page load of the page objects, check it "
+             "against their load budgets, and report it per page."
+    )
+    parser.addoption(
+        "--page-timings-db",
+        action="store",
+        default=DEFAULT_PAGE_TIMINGS_DB,
+        help="SQLite database of the page-load timings."
+    )
+    parser.addoption(
+        "--multi-tab",
+        action="store",
+        type=int,
+        default=0,
+        metavar="TABS",
+        help="Run the cases of the multi_tab tests concurrently in up to "
+             "TABS tabs of one browser."
+    )
+    parser.addoption(
+        "--quiz-mode",
+        action="store",
+        choices=("dialog", "inject"),
+        default="dialog",
+        help="Answer the promo quiz in its real prompt, or by a script "
+             "injected into the promo pages before they load."
+    )
+    parser.addoption(
+        "--artifacts-dir",
+        action="store",
+        default=DEFAULT_ARTIFACTS_DIR,
+        help="Directory of the failed tests' screenshots, DOM, console "
+             "logs, and latest WebDriver commands."
+    )
+    parser.addoption(
+        "--artifacts-max-mb",
+        action="store",
+        type=int,
+        default=DEFAULT_MAX_SIZE_MB,
+        help="Size limit (in megabytes) of the failure artifacts; "
+             "0 turns them off."
+    )
+    parser.addoption(
+        "--schedule-by-durations",
+        action="store_true",
+        help="Run the longest tests first, keeping the tests that share "
+             "a logged-in user on one pytest-xdist worker."
+    )
+    parser.addoption(
+        "--shard",
+        action="store",
+        type=parse_shard,
+        metavar="I/N",
+        help="Run only the I-th of N shards balanced by the durations."
+    )
+    parser.addoption(
+        "--durations-path",
+        action="store",
+        help="JSON file with the tests' durations from the earlier runs "
+             f"(default: {DEFAULT_DURATIONS_FILE}); giving it records "
+             "the durations of the run."
+    )
 
 
-@pytest.fixture(scope="function")
-def browser(request):
+def pytest_configure(config):
     """
-    Launch and tear down a Chrome browser instance per test.
+    Point the links to the web store chosen on the command line.
 
-    Supports the --language CLI option to set the browser's locale.
+    With --local-store, the stand-in store is started once: the
+    pytest-xdist workers reuse the one started by the controller.
+    With --trace-commands, the traces of the previous run are removed.
+    With --adaptive-timeouts, the page objects use the learned timeouts.
+    With --page-timings, the page objects measure their page loads.
+    With --schedule-by-durations, --shard, or --durations-path, the
+    durations of the tests are recorded by the main process; under
+    pytest-xdist, --schedule-by-durations uses the loadgroup scheduling
+    (see pytest_collection_modifyitems).
     """
-    user_language = request.config.getoption("language")
+    config.browser_warm_up = {"hits": 0, "misses": 0, "saved": 0.0}
+    os.environ.setdefault(
+        ARTIFACTS_RUN_VARIABLE, time.strftime("%Y%m%d-%H%M%S")
+    )
+    if config.getoption("adaptive_timeouts"):
+        config.timings_started_at = time.time()
+        BasePage.locator_timings = LocatorTimings(
+            config.getoption("timings_db")
+        )
+
+    if config.getoption("page_timings"):
+        config.page_timings_started_at = time.time()
+        BasePage.page_timings = PageTimings(
+            config.getoption("page_timings_db")
+        )
+
+    if (
+            config.getoption("trace_commands")
+            and not hasattr(config, "workerinput")
+    ):
+        clear_traces(config.getoption("trace_dir"))
+
+    local_store_url = None
+    if config.getoption("local_store"):
+        local_store_url = os.environ.get(LOCAL_STORE_URL_VARIABLE)
+        if local_store_url is None:
+            config.local_store = LocalStore().start()
+            local_store_url = config.local_store.base_url
+            os.environ[LOCAL_STORE_URL_VARIABLE] = local_store_url
+
+    Links.set_base_url(local_store_url or config.getoption("base_url"))
+
+    config.duration_store = None
+    if not (
+            config.getoption("schedule_by_durations")
+            or config.getoption("shard")
+            or config.getoption("durations_path")
+    ):
+        return
+
+    config.duration_store = DurationStore(
+        config.getoption("durations_path") or DEFAULT_DURATIONS_FILE,
+        local_store_url=local_store_url
+    )
+    if not hasattr(config, "workerinput"):
+        config.pluginmanager.register(
+            DurationRecorder(config.duration_store), "duration_recorder"
+        )
+
+    # pytest-xdist keeps the xdist_group tests on one worker only with
+    # the loadgroup scheduling (its workers check the option), and
+    # without reordering the groups.
+    if not config.getoption("schedule_by_durations"):
+        return
+    if hasattr(config, "workerinput"):
+        config.option.loadgroup = True
+    elif config.getoption("dist", "no") != "no":
+        config.option.dist = "loadgroup"
+        config.option.loadscopereorder = False
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_collection_modifyitems(config, items):
+    """
+    Keep only the tests of the --shard, and with --schedule-by-durations,
+    order them longest first.
+
+    The tests of a group (see group_key) are marked with xdist_group
+    before the other implementations run, so that pytest-xdist (which
+    reads the markers in its own implementation) sends them to one
+    worker. The tests are sharded and ordered after the deselection.
+    """
+    if config.getoption("schedule_by_durations"):
+        for item in items:
+            if group_key(item) != item.nodeid:
+                item.add_marker(pytest.mark.xdist_group(group_key(item)))
+
+    yield
+
+    store = config.duration_store
+    shard = config.getoption("shard")
+    if shard is not None:
+        selected, deselected = store.shard(items, *shard)
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = selected
+
+    if config.getoption("schedule_by_durations"):
+        items[:] = store.order(items)
+
+
+def pytest_report_collectionfinish(config, items):
+    """Show the shard's share of the tests and its expected duration."""
+    shard = config.getoption("shard")
+    if shard is None:
+        return None
+
+    expected = sum(config.duration_store.estimate(item) for item in items)
+
+    return (
+        f"shard {shard[0]}/{shard[1]}: {len(items)} tests, "
+        f"expected {expected:.0f} s"
+    )
+
+
+def pytest_report_header(config):
+    """Show the active browser profile, so that timings are comparable."""
+    profile = PROFILES[config.getoption("browser_profile")]
+
+    return f"browser profile: {describe_profile(profile)}"
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """
+    Run the async tests in an event loop of their own.
+
+    With --multi-tab, the case of a multi_tab test is already running
+    in a tab (see the browser fixture): the call waits for its outcome.
+    """
+    if inspect.iscoroutinefunction(pyfuncitem.obj):
+        arguments = {
+            name: pyfuncitem.funcargs[name]
+            for name in inspect.signature(pyfuncitem.obj).parameters
+        }
+        asyncio.run(pyfuncitem.obj(**arguments))
+        return True
+
+    if not pyfuncitem.get_closest_marker("multi_tab"):
+        return None
+    scheduler = pyfuncitem.funcargs.get("browser")
+    if not isinstance(scheduler, TabScheduler):
+        return None
+
+    scheduler.result(pyfuncitem.nodeid)
+
+    return True
+
+
+def multi_tab_cases(item, count):
+    """
+    Return the item and the next cases of its test function to run,
+    at most count in all: the cases that can run at once.
+
+    Under pytest-xdist, the cases are spread between the workers, so
+    each one runs alone.
+    """
+    if "PYTEST_XDIST_WORKER" in os.environ:
+        cases = [item]
+    else:
+        items = item.session.items
+        cases = [
+            case for case in items[items.index(item):]
+            if case.parent is item.parent
+            and getattr(case, "originalname", None) == item.originalname
+            and not case.get_closest_marker("skip")
+            and not case.get_closest_marker("skipif")
+        ][:count]
+
+    for case in cases:
+        parameters = (
+            set(case.callspec.params) if hasattr(case, "callspec") else set()
+        )
+        arguments = set(inspect.signature(case.obj).parameters)
+        if arguments - parameters - {"browser"}:
+            raise pytest.UsageError(
+                f"{case.nodeid}: the multi_tab tests can only use "
+                f"the browser fixture and their parameters"
+            )
+
+    return cases
+
+
+def run_tab_case(tab, case, profile, quiz_mode, tracer, artifacts):
+    """
+    Run the multi_tab test case with the TabDriver of its tab.
+
+    The tab is set up like a leased browser: the profile's blocking,
+    the quiz script, and the recording and tracing of its commands.
+    """
+    apply_profile_blocking(profile, tab)
+    if quiz_mode == "inject":
+        add_script_to_new_documents(tab, QUIZ_SOLVER_JS)
+    if artifacts is not None:
+        artifacts.instrument(tab)
+
+    arguments = {
+        name: case.callspec.params[name]
+        for name in inspect.signature(case.obj).parameters
+        if name != "browser"
+    }
+    with traced(tab, tracer, case.nodeid):
+        case.obj(browser=tab, **arguments)
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_makereport(item, call):
+    """Keep the reports of the test's phases for its fixtures."""
+    report = yield
+    item.stash.setdefault(phase_reports_key, {})[report.when] = report
+
+    return report
+
+
+def has_failed(item):
+    """Return True if the test's setup or call has failed."""
+    reports = item.stash.get(phase_reports_key, {})
+
+    return any(
+        report.failed for when, report in reports.items()
+        if when in ("setup", "call")
+    )
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    """
+    Add up the browser warm-up and the element cache statistics of
+    the pytest-xdist worker.
+    """
+    warm_up = getattr(node, "workeroutput", {}).get("browser_warm_up")
+    if warm_up:
+        for key, value in warm_up.items():
+            node.config.browser_warm_up[key] += value
+
+    element_cache = getattr(node, "workeroutput", {}).get("element_cache")
+    if element_cache:
+        BasePage.element_cache_stats.add(element_cache)
+
+
+def pytest_sessionfinish(session):
+    """
+    Save the locators' latencies and the page loads of this process.
+
+    A pytest-xdist worker passes its element cache statistics on.
+    """
+    if hasattr(session.config, "workeroutput"):
+        session.config.workeroutput["element_cache"] = (
+            BasePage.element_cache_stats.as_dict()
+        )
+    if BasePage.locator_timings is not None:
+        BasePage.locator_timings.flush()
+    if BasePage.page_timings is not None:
+        BasePage.page_timings.flush()
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    """
+    Report the slowest page-object methods and locators, the locators
+    whose appearance latency is drifting upward, the page loads,
+    the browser warm-up, the element cache, and the failure artifacts
+    of the run.
+    """
+    run_directory = os.path.join(
+        config.getoption("artifacts_dir"),
+        os.environ[ARTIFACTS_RUN_VARIABLE]
+    )
+    if os.path.isdir(run_directory):
+        terminalreporter.write_sep("=", "Failure artifacts")
+        for name in sorted(os.listdir(run_directory)):
+            terminalreporter.write_line(os.path.join(run_directory, name))
+
+    warm_up = config.browser_warm_up
+    if warm_up["hits"] or warm_up["misses"]:
+        terminalreporter.write_sep("=", "Browser warm-up")
+        terminalreporter.write_line(
+            f"{warm_up['hits']} hits, {warm_up['misses']} misses, "
+            f"{warm_up['saved']:.1f} s of browser startup saved"
+        )
+
+    element_cache = BasePage.element_cache_stats
+    if element_cache.hits or element_cache.misses or element_cache.stale:
+        terminalreporter.write_sep("=", "Element cache")
+        terminalreporter.write_line(
+            f"{element_cache.hits} hits, {element_cache.misses} misses, "
+            f"{element_cache.stale} stale "
+            f"({element_cache.hit_rate():.0%} hit rate), "
+            f"{element_cache.round_trips_saved()} round trips saved"
+        )
+
+    if config.getoption("trace_commands"):
+        lines = summarize_traces(config.getoption("trace_dir"))
+        if lines:
+            terminalreporter.write_sep("=", "WebDriver command latency")
+            for line in lines:
+                terminalreporter.write_line(line)
+
+    if BasePage.locator_timings is not None:
+        drifting = BasePage.locator_timings.drifting_locators(
+            config.timings_started_at
+        )
+        if drifting:
+            terminalreporter.write_sep("=", "Locator latency drifting up")
+            for locator, previous_p50, current_p50 in drifting:
+                terminalreporter.write_line(
+                    f"{locator}: p50 {previous_p50 * 1000:.0f} ms -> "
+                    f"{current_p50 * 1000:.0f} ms"
+                )
+
+    if BasePage.page_timings is not None:
+        lines = BasePage.page_timings.report(config.page_timings_started_at)
+        if lines:
+            terminalreporter.write_sep("=", "Page load")
+            for line in lines:
+                terminalreporter.write_line(line)
 
+
+def pytest_unconfigure(config):
+    """Stop the local stand-in web store if it was started."""
+    local_store = getattr(config, "local_store", None)
+    if local_store is not None:
+        local_store.stop()
+        os.environ.pop(LOCAL_STORE_URL_VARIABLE, None)
+
+    if not hasattr(config, "workerinput"):
+        os.environ.pop(ARTIFACTS_RUN_VARIABLE, None)
+
+    BasePage.locator_timings = None
+    BasePage.page_timings = None
+
+
+def start_browser(
+        user_language,
+        profile=None,
+        cache=None,
+        service=None,
+        user_data_dir=None,
+        console_log=False
+):
+    """
+    Launch a Chrome browser instance with the given locale and profile.
+
+    Without a profile, the default one is used. If the HTTP cache is
+    given, the browser's requests go through it. If the shared
+    ChromeDriver service is given, the browser is a session of it.
+    The user data directory, if given, holds the browser's Chrome
+    profile. With console_log, the browser keeps its console log for
+    the failure artifacts.
+    """
+    profile = profile or PROFILES[DEFAULT_PROFILE]
     options = Options()
     options.add_experimental_option(
         'prefs',
         {'intl.accept_languages': user_language}
     )
+    apply_profile_options(profile, options)
+    # The page objects answer the dialogs: a command that runs into one
+    # fails without dismissing it.
+    options.unhandled_prompt_behavior = "ignore"
+    if console_log:
+        options.set_capability("goog:loggingPrefs", {"browser": "ALL"})
+    if user_data_dir is not None:
+        options.add_argument(f"--user-data-dir={user_data_dir}")
+
+    if service is not None:
+        browser = service.new_browser(options)
+    else:
+        browser = webdriver.Chrome(options=options)
+    apply_profile_blocking(profile, browser)
+
+    if cache is not None:
+        cache.attach(browser)
+
+    return browser
+
+
+@pytest.fixture(scope="session")
+def cache(request):
+    """
+    Provide the record-and-replay HTTP cache chosen on the command line.
+
+    Returns None if the cache is off.
+    """
+    mode = request.config.getoption("http_cache")
+    if mode == http_cache.OFF:
+        yield None
+        return
+
+    store = http_cache.HttpCacheStore(
+        request.config.getoption("http_cache_dir"),
+        request.config.getoption("http_cache_max_mb")
+    )
+
+    yield http_cache.HttpCache(store, mode)
+
+    store.flush()
+
+
+@pytest.fixture(scope="session")
+def chrome_service():
+    """
+    Provide the ChromeDriver process shared by the session's browsers.
+
+    With pytest-xdist, each worker gets its own service.
+    """
+    service = SharedChromeService()
+
+    yield service
+
+    service.stop()
+
+
+@pytest.fixture(scope="session")
+def profile_template(request, tmp_path_factory, cache, chrome_service):
+    """
+    Provide the pre-warmed profile cloned for every browser.
+
+    The template is built once per run (shared by the pytest-xdist
+    workers) by visiting the main and the product page. Returns None
+    unless --profile-template is given. The clones left behind are
+    removed at the end of the session.
+    """
+    if not request.config.getoption("profile_template"):
+        yield None
+        return
+
+    base_dir = tmp_path_factory.getbasetemp()
+    template_dir = (
+        base_dir.parent if "PYTEST_XDIST_WORKER" in os.environ else base_dir
+    )
+    template = ProfileTemplate(
+        template_dir / "profile_template", base_dir / "profiles"
+    )
+
+    profile = PROFILES[request.config.getoption("browser_profile")]
+    template.build(
+        lambda user_data_dir: start_browser(
+            request.config.getoption("language"), profile, cache,
+            chrome_service, user_data_dir
+        ),
+        (Links.MAIN_PAGE, Links.PRODUCT_PAGE)
+    )
+
+    yield template
+
+    template.remove_clones()
+
+
+def start_cloned_browser(
+        template,
+        user_language,
+        profile,
+        cache,
+        service,
+        console_log=False
+):
+    """
+    Launch a browser with a clone of the profile template, removed once
+    the browser quits; without a template, with a new profile.
+    """
+    if template is None:
+        return start_browser(
+            user_language, profile, cache, service, console_log=console_log
+        )
+
+    return template.launch(
+        lambda user_data_dir: start_browser(
+            user_language, profile, cache, service, user_data_dir,
+            console_log
+        )
+    )
+
+
+@pytest.fixture(scope="session")
+def browser_pools(request, chrome_service, profile_template):
+    """
+    Keep a pool of warm browsers per browser profile for the session.
+
+    With pytest-xdist, each worker gets its own pools and passes their
+    warm-up statistics to the main process. The pools' browsers are
+    started with the profile template's clones, so they quit before
+    the template removes its clones.
+    """
+    pools = {}
+
+    yield pools
+
+    warm_up = request.config.browser_warm_up
+    for pool in pools.values():
+        pool.close()
+        warm_up["hits"] += pool.warm_up_hits
+        warm_up["misses"] += pool.warm_up_misses
+        warm_up["saved"] += pool.startup_time_saved
+
+    if hasattr(request.config, "workeroutput"):
+        request.config.workeroutput["browser_warm_up"] = warm_up
+
+
+@pytest.fixture(scope="function")
+def browser_profile(request):
+    """
+    Return the browser profile of the test.
+
+    The test's browser_profile marker overrides the --browser-profile
+    CLI option.
+    """
+    marker = request.node.get_closest_marker("browser_profile")
+    name = (
+        marker.args[0] if marker
+        else request.config.getoption("browser_profile")
+    )
+    if name not in PROFILES:
+        pytest.fail(f"Unknown browser profile: {name}", pytrace=False)
+
+    return PROFILES[name]
+
+
+@pytest.fixture(scope="session")
+def command_tracer(request):
+    """
+    Provide the tracer of the WebDriver commands.
+
+    The tracer also records the page objects' element cache lookups.
+    Returns None if the tracing is off.
+    """
+    if not request.config.getoption("trace_commands"):
+        yield None
+        return
+
+    tracer = CommandTracer(request.config.getoption("trace_dir"))
+    listeners = BasePage.element_cache_stats.listeners
+    listeners.append(tracer.record_cache_lookup)
+
+    yield tracer
+
+    listeners.remove(tracer.record_cache_lookup)
+
+
+@contextmanager
+def traced(browser, tracer, test_id):
+    """Trace the browser's commands within the block if tracing is on."""
+    if tracer is None:
+        yield
+        return
+
+    tracer.instrument(browser)
+    tracer.start_test()
+    try:
+        yield
+    finally:
+        tracer.finish_test(test_id)
+
+
+@pytest.fixture(scope="session")
+def failure_artifacts(request):
+    """
+    Provide the saver of the failed tests' browser state.
+
+    Returns None if --artifacts-max-mb is 0.
+    """
+    max_size_mb = request.config.getoption("artifacts_max_mb")
+    if not max_size_mb:
+        yield None
+        return
+
+    artifacts = FailureArtifacts(
+        request.config.getoption("artifacts_dir"),
+        os.environ[ARTIFACTS_RUN_VARIABLE],
+        max_size_mb
+    )
+
+    yield artifacts
+
+    artifacts.close()
+
+
+@contextmanager
+def capture_on_failure(request, browser, artifacts):
+    """Save the browser's state after the block if the test has failed."""
+    if artifacts is None:
+        yield
+        return
+
+    # The HTTP driver sends no WebDriver commands to record.
+    if not isinstance(browser, HttpDriver):
+        artifacts.instrument(browser)
+    yield
+    if has_failed(request.node):
+        artifacts.capture(browser, request.node.nodeid)
+
+
+@pytest.fixture(scope="session")
+def http_driver(request):
+    """Provide the browserless driver of the no_js tests."""
+    driver = HttpDriver(request.config.getoption("language"))
+
+    yield driver
+
+    driver.quit()
+
+
+@pytest.fixture(scope="session")
+def tab_scheduler(request, cache, chrome_service, profile_template):
+    """Provide the browser whose tabs run the multi_tab test cases."""
+    profile = PROFILES[request.config.getoption("browser_profile")]
+    scheduler = TabScheduler(
+        start_cloned_browser(
+            profile_template, request.config.getoption("language"),
+            profile, cache, chrome_service
+        ),
+        request.config.getoption("multi_tab")
+    )
+
+    yield scheduler
+
+    scheduler.close()
+
+
+@pytest.fixture(scope="function")
+def browser(
+        request,
+        browser_pools,
+        browser_profile,
+        cache,
+        command_tracer,
+        chrome_service,
+        profile_template,
+        failure_artifacts
+):
+    """
+    Lease a Chrome browser instance to a test and reset it afterwards.
+
+    Supports the --language CLI option to set the browser's locale.
+    The pools start the next browser in the background while the test
+    runs, unless --no-browser-warm-up is given. With --profile-template,
+    every browser starts with a clone of the pre-warmed profile.
+    With --quiz-mode=inject, the promo pages answer the quiz themselves.
+    If the test fails, the browser's state is saved before the reset.
+    Tests marked with no_js get the browserless HTTP driver instead,
+    unless --no-http-driver is given.
+    Tests marked with fresh_browser get a new browser of their own.
+    With --multi-tab, the cases of the tests marked with multi_tab run
+    in the tabs of the tab scheduler instead, each one set up like
+    a leased browser (see pytest_pyfunc_call).
+    """
+    user_language = request.config.getoption("language")
+
+    if (
+            request.config.getoption("multi_tab")
+            and request.node.get_closest_marker("multi_tab")
+    ):
+        # The next cases start in the tabs now, so that they run while
+        # pytest goes through this one's phases.
+        scheduler = request.getfixturevalue("tab_scheduler")
+        for case in multi_tab_cases(request.node, scheduler.max_tabs):
+            if case.nodeid not in scheduler:
+                scheduler.submit(
+                    case.nodeid, run_tab_case, case,
+                    PROFILES[request.config.getoption("browser_profile")],
+                    request.config.getoption("quiz_mode"),
+                    command_tracer, failure_artifacts
+                )
+
+        yield scheduler
+
+        with scheduler.finished(request.node.nodeid) as tab:
+            if (
+                    tab is not None
+                    and failure_artifacts is not None
+                    and has_failed(request.node)
+            ):
+                failure_artifacts.capture(tab, request.node.nodeid)
+        return
+
+    if (
+            request.node.get_closest_marker("no_js")
+            and not request.config.getoption("no_http_driver")
+    ):
+        driver = request.getfixturevalue("http_driver")
+        with capture_on_failure(request, driver, failure_artifacts):
+            yield driver
+
+        driver.reset()
+        return
+
+    if request.node.get_closest_marker("fresh_browser"):
+        browser = start_cloned_browser(
+            profile_template, user_language, browser_profile, cache,
+            chrome_service, console_log=failure_artifacts is not None
+        )
+        if request.config.getoption("quiz_mode") == "inject":
+            add_script_to_new_documents(browser, QUIZ_SOLVER_JS)
+
+        with capture_on_failure(request, browser, failure_artifacts):
+            with traced(browser, command_tracer, request.node.nodeid):
+                yield browser
+
+        browser.quit()
+        return
+
+    pool = browser_pools.get(browser_profile.name)
+    if pool is None:
+        pool = browser_pools[browser_profile.name] = BrowserPool(
+            lambda: start_cloned_browser(
+                profile_template, user_language, browser_profile, cache,
+                chrome_service, console_log=failure_artifacts is not None
+            ),
+            max_uses=request.config.getoption("browser_max_uses"),
+            warm_up=not request.config.getoption("no_browser_warm_up")
+        )
+
+    browser = pool.acquire()
+    # The pool removes the script when it resets the browser.
+    if request.config.getoption("quiz_mode") == "inject":
+        add_script_to_new_documents(browser, QUIZ_SOLVER_JS)
+
+    with capture_on_failure(request, browser, failure_artifacts):
+        with traced(browser, command_tracer, request.node.nodeid):
+            yield browser
+
+    pool.release(browser)
+
+
+@pytest.fixture(scope="function")
+def async_browser(browser):
+    """
+    Provide the asyncio DevTools client of the leased browser.
+
+    The tabs the async test opens are closed afterwards.
+    """
+    client = AsyncBrowser.to_browser(browser)
+
+    yield client
+
+    client.close()
+
+
+@pytest.fixture(scope="function")
+def open_page(request, browser):
+    """
+    Provide the factory that opens a routed page for the test.
+
+    open_page(BasketPage, via=main_page) opens the page at its route
+    (see Links.route()) and returns its page object, skipping the load
+    of the via page and the wait for its link. In the tests marked with
+    navigation (or with --navigate-by-click), it opens the via page and
+    clicks through to the page instead.
+    """
+    language = request.config.getoption("language")
+    by_click = (
+        request.node.get_closest_marker("navigation") is not None
+        or request.config.getoption("navigate_by_click")
+    )
+
+    def open_page(page_class, via):
+        if by_click:
+            via.open()
+            getattr(via, NAVIGATION_METHODS[page_class])()
+            return page_class(browser, browser.current_url)
+
+        page = page_class(
+            browser, Links.route(page_class.__name__, language)
+        )
+        page.open()
+        return page
+
+    return open_page
+
+
+@pytest.fixture(scope="session")
+def store_api(request):
+    """Provide the HTTP client for the web store's account pages."""
+    api = StoreApi(request.config.getoption("language"))
+
+    yield api
+
+    api.close()
+
+
+@pytest.fixture(scope="session")
+def auth_state_store(request, tmp_path_factory):
+    """
+    Provide the file with the shared logged-in user's state.
+
+    With pytest-xdist, the "run" scope places the file in the directory
+    shared by all the workers. Returns None if the sharing is off.
+    """
+    scope = request.config.getoption("auth_state")
+    if scope == "off":
+        return None
+
+    state_dir = tmp_path_factory.getbasetemp()
+    if scope == "run" and "PYTEST_XDIST_WORKER" in os.environ:
+        state_dir = state_dir.parent
+
+    return AuthStateStore(
+        state_dir / "auth_state.json",
+        ttl=request.config.getoption("auth_state_ttl")
+    )
+
+
+@pytest.fixture(scope="function")
+def authorized_user(request, browser, store_api, auth_state_store):
+    """
+    Log the browser in as a registered user and return the user's state.
+
+    Reuses the shared user's state if possible. The first use of a state
+    in a worker checks it on the main page; a stale state is replaced
+    with a new user. Tests marked with fresh_user get a new user.
+    """
+    def sign_up():
+        email, password = generate_user_credentials()
+        cookies = store_api.sign_up_new_user(email, password)
+        return new_auth_state(email, cookies)
+
+    if (
+            auth_state_store is None
+            or request.node.get_closest_marker("fresh_user")
+    ):
+        state = sign_up()
+        restore_auth_state(browser, state)
+        return state
+
+    state = auth_state_store.load_or_create(sign_up)
+    restore_auth_state(browser, state)
 
-    browser = webdriver.Chrome(options=options)
+    if not auth_state_store.is_validated(state):
+        main_page = MainPage(browser, Links.MAIN_PAGE)
+        main_page.open()
+        try:
+            main_page.should_be_authorized_user()
+        except AssertionError:
+            state = auth_state_store.replace(state, sign_up)
+            restore_auth_state(browser, state)
+            main_page.open()
+            main_page.should_be_authorized_user()
 
-    yield browser
+        auth_state_store.mark_validated(state, capture_local_storage(browser))
 
-    browser.quit()
+    return state
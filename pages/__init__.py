@@ -2,10 +2,17 @@
 The Page Object Model classes and their locators.
 
 Modules:
+    aio: The asyncio versions of the page objects.
     base_page: Defines the BasePage class with common methods.
     basket_page: Defines the Page Object class for the basket page.
+    conditions: Composite conditions over several elements, one poll.
+    dom_waits: Implements the event-driven waits for the elements.
+    element_cache: Caches the located element handles until stale.
+    locator_timings: Learns the per-locator timeouts from past runs.
     locators: Contains all the page locators.
     login_and_sign_up_page: Defines the PO class for login and sign-up.
     main_page: Defines the Page Object class for the main page.
+    page_timings: Measures the page loads and checks their budgets.
     product_page: Defines the Page Object class for the product page.
+    snapshots: Reads the state of several elements in one round trip.
 """
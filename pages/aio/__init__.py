@@ -0,0 +1,16 @@
+"""
+The asyncio versions of the page objects.
+
+They drive the tabs of support.async_cdp.AsyncBrowser instead of the
+Selenium WebDriver, so that many pages run concurrently in one event
+loop. The waits are awaitable and event-driven, and the dialogs are
+received as events. They use the same locators and assertion messages
+as the page objects in the pages package.
+
+Modules:
+    base_page: Defines the AsyncBasePage class with common methods.
+    basket_page: Defines the async page object for the basket page.
+    login_and_sign_up_page: Defines the async PO for login and sign-up.
+    main_page: Defines the async page object for the main page.
+    product_page: Defines the async page object for the product page.
+"""
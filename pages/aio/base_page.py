@@ -0,0 +1,242 @@
+"""
+Defines AsyncBasePage: the base class for the async page objects.
+
+Mirrors BasePage over an AsyncTab: the waits run the same
+MutationObserver scripts as the dom_waits module, but they are awaited,
+so the other pages of the event loop keep running meanwhile. The quiz
+alert is received as a dialog event instead of being polled for.
+"""
+
+import asyncio
+
+from selenium.common.exceptions import TimeoutException
+
+from support.cdp import CdpError
+
+from ..base_page import (
+    BasePage,
+    DEFAULT_TIMEOUT,
+    QUIZ_RESULT_TIMEOUT,
+    quiz_answer,
+)
+from ..dom_waits import (
+    DEFAULT_QUIET_WINDOW,
+    FIND_ELEMENT_JS,
+    SCRIPT_TIMEOUT_MARGIN,
+    WAIT_FOR_ELEMENT_JS,
+    WAIT_FOR_SETTLED_PAGE_JS,
+)
+from ..locators import BasePageLocators
+
+# Calls back with the text of the element or null if there is none.
+ELEMENT_TEXT_JS = FIND_ELEMENT_JS + """
+var element = findElement(arguments[0], arguments[1]);
+arguments[arguments.length - 1](element ? element.innerText : null);
+"""
+
+# Calls back with true and clicks the element right after, if it is
+# visible and enabled; otherwise calls back with false. The click is
+# deferred, so that a dialog it opens does not block the script.
+CLICK_JS = FIND_ELEMENT_JS + """
+var element = findElement(arguments[0], arguments[1]);
+var clickable = Boolean(
+    element && element.getClientRects().length && !element.disabled
+);
+if (clickable) {
+    setTimeout(function () { element.click(); }, 0);
+}
+arguments[arguments.length - 1](clickable);
+"""
+
+# Types the text into the input element; calls back with false if
+# there is no such element.
+FILL_JS = FIND_ELEMENT_JS + """
+var element = findElement(arguments[0], arguments[1]);
+if (element) {
+    element.focus();
+    element.value = arguments[2];
+    element.dispatchEvent(new Event("input", {bubbles: true}));
+    element.dispatchEvent(new Event("change", {bubbles: true}));
+}
+arguments[arguments.length - 1](Boolean(element));
+"""
+
+# Time (in seconds) between the checks of an element to be clickable.
+CLICKABLE_POLL_INTERVAL = 0.1
+
+# The errors of the scripts interrupted by a navigation, and the time
+# (in seconds) to let the new document appear before a retry.
+NAVIGATION_ERRORS = ("context", "navigated")
+NAVIGATION_RETRY_INTERVAL = 0.05
+
+
+class AsyncBasePage:
+    """The base class for the async page objects."""
+
+    def __init__(self, tab, url):
+        """Initialize the page object of the AsyncTab."""
+        self.tab = tab
+        self.url = url
+
+    async def open(self):
+        """Open the page using the stored URL."""
+        await self.tab.navigate(self.url)
+
+    async def current_url(self):
+        """Return the URL of the page opened in the tab."""
+        return await self.tab.evaluate("window.location.href")
+
+    def timeout_for(self, locator, timeout=None):
+        """Return the explicit, learned, or default timeout of the wait."""
+        if timeout is not None:
+            return timeout
+        if BasePage.locator_timings is None:
+            return DEFAULT_TIMEOUT
+
+        return BasePage.locator_timings.timeout_for(locator, DEFAULT_TIMEOUT)
+
+    async def is_element_present(self, how, what, timeout=None):
+        """Return True if the element appears within the timeout."""
+        timeout = self.timeout_for((how, what), timeout)
+
+        return bool(await self._wait(
+            timeout, WAIT_FOR_ELEMENT_JS, how, what, True
+        ))
+
+    async def is_not_element_present(
+            self,
+            how,
+            what,
+            timeout=None,
+            strict=False,
+            quiet_window=DEFAULT_QUIET_WINDOW
+    ):
+        """
+        Return True if the element is not present on the page.
+
+        By default, waits (at most for the timeout) until the page
+        settles, then checks for the element once. In strict mode,
+        returns True only if the element does not appear within
+        the whole timeout.
+        """
+        timeout = self.timeout_for((how, what), timeout)
+        if not strict:
+            await self._wait(
+                timeout, WAIT_FOR_SETTLED_PAGE_JS, int(quiet_window * 1000)
+            )
+            return await self._wait(0, WAIT_FOR_ELEMENT_JS, how, what, False)
+
+        return not await self._wait(
+            timeout, WAIT_FOR_ELEMENT_JS, how, what, True
+        )
+
+    async def is_disappeared(self, how, what, timeout=None):
+        """Return True if the element disappears within the timeout."""
+        if timeout is None:
+            timeout = DEFAULT_TIMEOUT
+
+        return await self._wait(timeout, WAIT_FOR_ELEMENT_JS, how, what, False)
+
+    async def wait_for_present_element(self, locator, timeout=None):
+        """
+        Wait for the element to be present in the DOM.
+
+        Raises TimeoutException if it does not appear within the timeout.
+        """
+        timeout = self.timeout_for(locator, timeout)
+        if not await self.is_element_present(*locator, timeout=timeout):
+            raise TimeoutException(
+                f"Element {locator} is not present after {timeout} s"
+            )
+
+    async def get_text(self, locator, timeout=None):
+        """Return the text of the element once it is present."""
+        await self.wait_for_present_element(locator, timeout)
+
+        return (await self.tab.call(ELEMENT_TEXT_JS, *locator)).strip()
+
+    async def click(self, locator, timeout=None):
+        """Click the element once it is visible and enabled."""
+        timeout = self.timeout_for(locator, timeout)
+        deadline = asyncio.get_running_loop().time() + timeout
+        await self.wait_for_present_element(locator, timeout)
+
+        while not await self.tab.call(CLICK_JS, *locator):
+            if asyncio.get_running_loop().time() > deadline:
+                raise TimeoutException(
+                    f"Element {locator} is not clickable after {timeout} s"
+                )
+            await asyncio.sleep(CLICKABLE_POLL_INTERVAL)
+
+    async def fill(self, locator, text, timeout=None):
+        """Type the text into the input element once it is present."""
+        await self.wait_for_present_element(locator, timeout)
+        await self.tab.call(FILL_JS, *locator, text)
+
+    async def should_be_login_and_sign_up_link(self):
+        """Assert the presence of the login and sign-up link."""
+        assert await self.is_element_present(
+            *BasePageLocators.LOGIN_AND_SIGN_UP_LINK
+        ), "Login and sign-up link is not present but should be"
+
+    async def go_to_login_and_sign_up_page(self, timeout=None):
+        """Navigate to the login and sign-up page."""
+        await self.click(BasePageLocators.LOGIN_AND_SIGN_UP_LINK, timeout)
+
+    async def should_be_authorized_user(self, timeout=None):
+        """Assert the user is authorized (the user icon is visible)."""
+        assert await self.is_element_present(
+            *BasePageLocators.USER_ICON, timeout=timeout
+        ), "User icon is not present, indicating unauthorized user"
+
+    async def go_to_basket(self, timeout=None):
+        """Navigate to the basket page."""
+        await self.click(BasePageLocators.BASKET_BUTTON, timeout)
+
+    async def solve_quiz_alert(self, timeout=DEFAULT_TIMEOUT):
+        """
+        Solve the quiz presented in a JavaScript alert.
+
+        Used on product pages with promo offers requiring a math answer.
+        Returns the dialogs shown as [{"type", "message", "response"}]:
+        the quiz prompt and the alert with its result, if any. The result
+        alert is accepted too: while it is open, the tab runs no scripts.
+        """
+        question = await self.tab.next_dialog(timeout)
+        answer = quiz_answer(question)
+        await self.tab.handle_dialog(accept=True, prompt_text=answer)
+        dialogs = [{"type": "prompt", "message": question, "response": answer}]
+
+        try:
+            result = await self.tab.next_dialog(QUIZ_RESULT_TIMEOUT)
+        except asyncio.TimeoutError:
+            return dialogs
+
+        await self.tab.handle_dialog(accept=True)
+        dialogs.append({"type": "alert", "message": result, "response": None})
+
+        return dialogs
+
+    async def _wait(self, timeout, script, *args):
+        """
+        Run the waiting script until it resolves or the time is up.
+
+        The script receives the time left (in ms) as its first argument.
+        It is restarted if the page navigates while waiting.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            time_left = max(deadline - loop.time(), 0)
+            try:
+                return await self.tab.call(
+                    script, int(time_left * 1000), *args,
+                    timeout=time_left + SCRIPT_TIMEOUT_MARGIN
+                )
+            except CdpError as error:
+                # A navigation destroys the observed document.
+                if time_left == 0 or not any(
+                        message in str(error) for message in NAVIGATION_ERRORS
+                ):
+                    raise
+                await asyncio.sleep(NAVIGATION_RETRY_INTERVAL)
@@ -0,0 +1,24 @@
+"""
+Defines AsyncBasketPage: the async page object for the basket page.
+
+Includes assertions for verifying the basket's empty state.
+"""
+
+from ..locators import BasketPageLocators
+from .base_page import AsyncBasePage
+
+
+class AsyncBasketPage(AsyncBasePage):
+    """The async page object class for the basket page."""
+
+    async def should_be_empty(self, strict=False):
+        """Assert that the basket contains no products."""
+        assert await self.is_not_element_present(
+            *BasketPageLocators.BASKET_ITEMS, strict=strict
+        ), "Basket is not empty but should be"
+
+    async def should_be_empty_basket_message(self):
+        """Assert the presence of the 'Empty basket' message."""
+        assert await self.is_element_present(
+            *BasketPageLocators.EMPTY_BASKET_MESSAGE
+        ), "'Empty basket' message is not present but should be"
@@ -0,0 +1,50 @@
+"""
+Defines AsyncLoginAndSignUpPage: the async page object for login and
+sign-up.
+
+Provides methods for the URL/form assertions and new user sign-up.
+"""
+
+from ..locators import LoginAndSignUpPageLocators
+from .base_page import AsyncBasePage
+
+
+class AsyncLoginAndSignUpPage(AsyncBasePage):
+    """The async page object class for the login and sign-up page."""
+
+    async def should_be_login_and_sign_up_page(self):
+        """Assert the current page is the login and sign-up page."""
+        await self.should_be_login_url()
+        await self.should_be_login_form()
+        await self.should_be_sign_up_form()
+
+    async def should_be_login_url(self):
+        """Assert that the current URL contains 'login'."""
+        assert "login" in await self.current_url(), (
+            "'login' substring is not present in current URL"
+        )
+
+    async def should_be_login_form(self):
+        """Assert the presence of the login form."""
+        assert await self.is_element_present(
+            *LoginAndSignUpPageLocators.LOGIN_FORM
+        ), "Login form is not present"
+
+    async def should_be_sign_up_form(self):
+        """Assert the presence of the sign-up form."""
+        assert await self.is_element_present(
+            *LoginAndSignUpPageLocators.SIGN_UP_FORM
+        ), "Sign-up form is not present"
+
+    async def sign_up_new_user(self, email, password, timeout=None):
+        """Fill the sign-up form and submit it."""
+        await self.fill(
+            LoginAndSignUpPageLocators.EMAIL_INPUT, email, timeout
+        )
+        await self.fill(
+            LoginAndSignUpPageLocators.PASSWORD_INPUT_1, password, timeout
+        )
+        await self.fill(
+            LoginAndSignUpPageLocators.PASSWORD_INPUT_2, password, timeout
+        )
+        await self.click(LoginAndSignUpPageLocators.SIGN_UP_BUTTON, timeout)
@@ -0,0 +1,12 @@
+"""
+Defines AsyncMainPage: the async page object for the main page.
+
+Currently contains no extra logic; inherits all from AsyncBasePage.
+"""
+
+from .base_page import AsyncBasePage
+
+
+class AsyncMainPage(AsyncBasePage):
+    """The async page object class for the main page."""
+    pass
@@ -0,0 +1,82 @@
+"""
+Defines AsyncProductPage: the async page object for the product page.
+
+Includes methods for product interaction and basket message validation.
+"""
+
+from ..locators import ProductPageLocators
+from .base_page import AsyncBasePage
+
+
+class AsyncProductPage(AsyncBasePage):
+    """The async page object class for the product page."""
+
+    async def get_product_name(self, timeout=None):
+        """Return the product name from the product page."""
+        return await self.get_text(ProductPageLocators.PRODUCT_NAME, timeout)
+
+    async def get_product_price(self, timeout=None):
+        """Return the product price from the product page."""
+        return await self.get_text(
+            ProductPageLocators.PRODUCT_PRICE, timeout
+        )
+
+    async def get_product_name_in_message(self, timeout=None):
+        """Return the product name from the 'Product added' message."""
+        return await self.get_text(
+            ProductPageLocators.PRODUCT_NAME_IN_MESSAGE, timeout
+        )
+
+    async def get_basket_total(self, timeout=None):
+        """Return the basket total from the basket total message."""
+        return await self.get_text(ProductPageLocators.BASKET_TOTAL, timeout)
+
+    async def add_product_to_basket(self, timeout=None):
+        """Add the product to the basket."""
+        await self.click(ProductPageLocators.ADD_TO_BASKET_BUTTON, timeout)
+
+    async def should_be_product_added_message(self):
+        """Assert the presence of the 'Product added' message."""
+        assert await self.is_element_present(
+            *ProductPageLocators.PRODUCT_ADDED_MESSAGE
+        ), "'Product added' message is not present but should be"
+
+    async def should_not_be_product_added_message(self, strict=False):
+        """Assert the absence of the 'Product added' message."""
+        assert await self.is_not_element_present(
+            *ProductPageLocators.PRODUCT_ADDED_MESSAGE, strict=strict
+        ), "'Product added' message is present but should not be"
+
+    async def should_disappear_product_added_message(self):
+        """Assert that the 'Product added' message disappears."""
+        assert await self.is_disappeared(
+            *ProductPageLocators.PRODUCT_ADDED_MESSAGE
+        ), "'Product added' message did not disappear but should have"
+
+    async def should_be_basket_total_message(self):
+        """Assert the presence of the basket total message."""
+        assert await self.is_element_present(
+            *ProductPageLocators.BASKET_TOTAL_MESSAGE
+        ), "Basket total message is not present but should be"
+
+    async def should_be_correct_product_name_in_product_added_message(
+            self,
+            product_name
+    ):
+        """Assert the product name in message matches added product."""
+        product_name_in_message = await self.get_product_name_in_message()
+        assert product_name == product_name_in_message, (
+            f"Expected product name '{product_name}' in 'Product added' "
+            f"message, but got '{product_name_in_message}'"
+        )
+
+    async def should_be_correct_price_in_basket_total_message(
+            self,
+            product_price
+    ):
+        """Assert the basket total matches the added product's price."""
+        basket_total = await self.get_basket_total()
+        assert product_price == basket_total, (
+            f"Expected basket total '{product_price}', "
+            f"but got '{basket_total}'"
+        )
@@ -3,64 +3,402 @@ Defines BasePage: a reusable base class for the page objects.
 
 Encapsulates common actions and checks shared across the pages.
 Covers navigation, element presence checks, and alert handling.
+The promo quiz is answered either in its real prompt or, if the
+QUIZ_SOLVER_JS script is installed before the page loads, by the page
+itself without any dialog.
+The presence waits are event-driven (see the dom_waits module).
+Without an explicit timeout, a wait uses the timeout learned for its
+locator (see the locator_timings module) or DEFAULT_TIMEOUT.
+With page timings on, every page load is measured and checked against
+the load budgets of the page object it leads to (see page_timings).
+The elements read with read_element() are located once and reused
+until they go stale (see element_cache).
 """
 
 import math
+import time
+import warnings
+import weakref
 
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import (
+    JavascriptException,
+    StaleElementReferenceException,
+    TimeoutException,
+    UnexpectedAlertPresentException,
+)
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
+from .conditions import (
+    ConditionFailed,
+    describe,
+    evaluate,
+    leaves,
+    snapshot_key,
+    unmet,
+)
+from .dom_waits import (
+    DEFAULT_QUIET_WINDOW,
+    ScriptWaitUnavailable,
+    wait_for_absence,
+    wait_for_presence,
+    wait_for_settled_page,
+)
+from .element_cache import (
+    ElementCache,
+    ElementCacheStats,
+    document_identity,
+)
 from .locators import BasePageLocators
+from .page_timings import (
+    BudgetExceeded,
+    describe_budget,
+    exceeded_budgets,
+    read_page_timing,
+)
+from .snapshots import take_snapshot
 
 # Default explicit wait timeout (in seconds).
 DEFAULT_TIMEOUT = 5
 
+# Time (in seconds) between the polls of the composite conditions.
+CONDITION_POLL_INTERVAL = 0.1
+
+# Time (in seconds) to wait for the alert with the quiz's result.
+QUIZ_RESULT_TIMEOUT = 1
+
+# The monotonic time of the last navigation started by a page object,
+# for each driver (shared by the page objects of the driver).
+_navigation_starts = weakref.WeakKeyDictionary()
+
+# Replaces the dialogs of the promo pages: prompt() answers the quiz
+# (as quiz_answer() does) and alert() returns at once. The dialogs and
+# the responses are kept in the session storage, so the ones shown
+# right before the form submission survive the navigation.
+QUIZ_SOLVER_JS = """
+(function () {
+    if (!/[?&]promo=/.test(window.location.search)) {
+        return;
+    }
+    if (window.sessionStorage.getItem("__quizDialogs") === null) {
+        window.sessionStorage.setItem("__quizDialogs", "[]");
+    }
+
+    function record(type, message, response) {
+        var dialogs = JSON.parse(
+            window.sessionStorage.getItem("__quizDialogs") || "[]"
+        );
+        dialogs.push({type: type, message: message, response: response});
+        window.sessionStorage.setItem(
+            "__quizDialogs", JSON.stringify(dialogs)
+        );
+    }
+
+    window.prompt = function (message) {
+        var x = parseFloat(String(message).split(" ")[2]);
+        var answer = String(Math.log(Math.abs(12 * Math.sin(x))));
+        record("prompt", String(message), answer);
+        return answer;
+    };
+    window.alert = function (message) {
+        record("alert", String(message), null);
+    };
+})();
+"""
+
+# Returns (and forgets) the dialogs recorded by QUIZ_SOLVER_JS since
+# the last call, or null if the script has not run in the tab.
+TAKE_QUIZ_DIALOGS_JS = """
+var dialogs = window.sessionStorage.getItem("__quizDialogs");
+if (dialogs !== null) {
+    window.sessionStorage.removeItem("__quizDialogs");
+}
+return JSON.parse(dialogs);
+"""
+
+
+def quiz_answer(question):
+    """Return the answer to the promo quiz, e.g., to "x = 1.234"."""
+    x = question.split(" ")[2]
+
+    return str(math.log(abs((12 * math.sin(float(x))))))
+
 
 class BasePage:
     """The base class for the page objects."""
 
+    # The LocatorTimings shared by the page objects, if any.
+    locator_timings = None
+
+    # The PageTimings shared by the page objects, if any.
+    page_timings = None
+
+    # The LoadBudget values of the page's loads.
+    load_budgets = ()
+
+    # The element cache lookups of all the page objects.
+    element_cache_stats = ElementCacheStats()
+
+    # The page object classes by name (registered when their modules
+    # are imported), for the budgets of the pages the navigation
+    # methods lead to.
+    _page_classes = {}
+
+    def __init_subclass__(cls, **kwargs):
+        """Register the page object class by its name."""
+        super().__init_subclass__(**kwargs)
+        BasePage._page_classes[cls.__name__] = cls
+
     def __init__(self, browser, url):
         """Initialize the page object."""
         self.browser = browser
         self.url = url
+        self._element_cache = ElementCache()
 
     def open(self):
         """Open the page using the stored URL."""
+        self.start_navigation()
         self.browser.get(self.url)
+        self.measure_page_load(type(self).__name__, "open")
 
-    def is_element_present(self, how, what, timeout=DEFAULT_TIMEOUT):
-        """Return True if the element appears within the timeout."""
-        try:
-            WebDriverWait(self.browser, timeout).until(
-                EC.presence_of_element_located((how, what))
+    def measure_page_load(self, page, action):
+        """
+        Record the timings of the page just loaded by the action and
+        check them against the load budgets of the named page object.
+
+        Warns with BudgetExceeded for the soft budgets exceeded, and
+        raises AssertionError if a hard budget is exceeded, or if the
+        page has budgets but the browser has no timing of the page.
+        Returns the PageTiming, or None if the page timings are off or
+        the browser has no timing API (the HTTP driver).
+        """
+        if (
+                self.page_timings is None
+                or getattr(self.browser, "static_document", False)
+        ):
+            return None
+
+        budgets = self._page_classes.get(page, BasePage).load_budgets
+        timing = read_page_timing(self.browser)
+        if timing is None:
+            assert not budgets, (
+                f"{page} ({action}) has load budgets, but the browser "
+                "has no timing of the page"
             )
-        except TimeoutException:
-            return False
+            return None
 
-        return True
+        exceeded = exceeded_budgets(timing, budgets)
+        self.page_timings.record(page, action, timing, len(exceeded))
 
-    def is_not_element_present(self, how, what, timeout=DEFAULT_TIMEOUT):
-        """Return True if the element does not appear within timeout."""
-        try:
-            WebDriverWait(self.browser, timeout).until(
-                EC.presence_of_element_located((how, what))
+        for budget in exceeded:
+            if not budget.hard:
+                warnings.warn(BudgetExceeded(
+                    f"{page} ({action}): {describe_budget(budget, timing)}"
+                ), stacklevel=2)
+        hard = [budget for budget in exceeded if budget.hard]
+        assert not hard, f"{page} ({action}) is over budget: " + ", ".join(
+            describe_budget(budget, timing) for budget in hard
+        )
+
+        return timing
+
+    def start_navigation(self):
+        """
+        Note that the next action loads a new page.
+
+        The appearance latencies of the locators are measured from
+        this moment (see wait_for_present_element()).
+        """
+        _navigation_starts[self.browser] = time.monotonic()
+
+    def timeout_for(self, locator, timeout=None):
+        """Return the explicit, learned, or default timeout of the wait."""
+        if timeout is not None:
+            return timeout
+        if self.locator_timings is None or locator is None:
+            return DEFAULT_TIMEOUT
+
+        return self.locator_timings.timeout_for(locator, DEFAULT_TIMEOUT)
+
+    def wait_for_present_element(self, locator, timeout=None):
+        """
+        Return the element once it is present, or None after the timeout.
+
+        Records the time the element took to appear since the start of
+        the last navigation (or of the wait, if the page object has not
+        navigated the driver): an element already present would take
+        no time otherwise.
+        """
+        timeout = self.timeout_for(locator, timeout)
+        started = _navigation_starts.get(self.browser, time.monotonic())
+        element = wait_for_presence(self.browser, locator, timeout)
+        if element is not None and self.locator_timings is not None:
+            self.locator_timings.record(locator, time.monotonic() - started)
+
+        return element
+
+    def find_present_element(self, locator, timeout=None):
+        """
+        Return the element once it is present in the DOM.
+
+        Raises TimeoutException if it does not appear within the timeout.
+        """
+        element = self.wait_for_present_element(locator, timeout)
+        if element is None:
+            timeout = self.timeout_for(locator, timeout)
+            raise TimeoutException(
+                f"Element {locator} is not present after {timeout} s"
             )
-        except TimeoutException:
-            return True
 
-        return False
+        return element
 
-    def is_disappeared(self, how, what, timeout=DEFAULT_TIMEOUT):
-        """Return True if the element disappears within the timeout."""
-        try:
-            WebDriverWait(
-                self.browser, timeout, 1, (TimeoutException,)
-            ).until_not(EC.presence_of_element_located((how, what)))
-        except TimeoutException:
-            return False
+    def read_element(self, locator, read, timeout=None):
+        """
+        Return read(element) of the element once it is present.
+
+        Reuses the handle found earlier. If it has gone stale (e.g., the
+        page has changed since), locates the element again and retries
+        once. The lookup is counted in element_cache_stats.
+        """
+        stats = self.element_cache_stats
+        element = self._element_cache.get(locator)
+        if element is not None:
+            try:
+                result = read(element)
+            except StaleElementReferenceException:
+                stats.record("stale", locator)
+                self._element_cache.forget(locator)
+            else:
+                stats.record("hits", locator)
+                return result
+        else:
+            stats.record("misses", locator)
 
-        return True
+        element = self.find_present_element(locator, timeout)
+        self._element_cache.put(locator, element)
+
+        return read(element)
+
+    def take_snapshot(self, locators, wait_for=None, timeout=None):
+        """
+        Read the state of all the {name: locator} elements at once.
+
+        Returns the {name: ElementSnapshot} map. If the wait_for locator
+        is given, waits for that element to be present first.
+        """
+        if wait_for is not None:
+            self.wait_for_present_element(wait_for, timeout)
+
+        return take_snapshot(self.browser, locators)
+
+    def wait_until(self, condition, timeout=None, fail_on=None):
+        """
+        Wait for the composite condition to hold (see the conditions
+        module), reading all its elements in one call per poll.
+
+        Returns the {snapshot_key: ElementSnapshot} map of the poll where
+        the condition holds. Raises ConditionFailed as soon as the
+        fail_on condition holds, or TimeoutException naming the checks
+        that were never met. Without a timeout, waits as long as the
+        slowest of the locators' timeouts.
+        """
+        checks = leaves(condition) + (leaves(fail_on) if fail_on else [])
+        locators = {
+            snapshot_key(check.locator): check.locator for check in checks
+        }
+        if timeout is None:
+            timeout = max(
+                self.timeout_for(locator) for locator in locators.values()
+            )
+
+        deadline = time.monotonic() + timeout
+        never_met = None
+        while True:
+            try:
+                snapshot = take_snapshot(self.browser, locators)
+            except JavascriptException:
+                # The page is being replaced; poll again.
+                snapshot = None
+
+            if snapshot is not None:
+                if fail_on is not None and evaluate(fail_on, snapshot):
+                    raise ConditionFailed(
+                        f"{describe(fail_on)} holds while waiting for "
+                        f"{describe(condition)}"
+                    )
+                if evaluate(condition, snapshot):
+                    return snapshot
+
+                last_unmet = unmet(condition, snapshot)
+                never_met = (
+                    set(last_unmet) if never_met is None
+                    else never_met & set(last_unmet)
+                )
+
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(CONDITION_POLL_INTERVAL)
+
+        if never_met is None:
+            reason = "the page could not be read"
+        else:
+            reason = ", ".join(
+                sorted(never_met) if never_met else last_unmet
+            )
+        raise TimeoutException(
+            f"{describe(condition)} did not hold after {timeout} s; "
+            f"not met: {reason}"
+        )
+
+    def is_element_present(self, how, what, timeout=None):
+        """Return True if the element appears within the timeout."""
+        element = self.wait_for_present_element((how, what), timeout)
+
+        return element is not None
+
+    def is_not_element_present(
+            self,
+            how,
+            what,
+            timeout=None,
+            strict=False,
+            quiet_window=DEFAULT_QUIET_WINDOW
+    ):
+        """
+        Return True if the element is not present on the page.
+
+        By default, waits (at most for the timeout) until the page
+        settles: the document is loaded, and the DOM and the network
+        stay quiet for the quiet window. Then checks for the element
+        once. In strict mode (or when the page cannot be observed),
+        returns True only if the element does not appear within
+        the whole timeout, which is the one learned for the locator
+        unless given.
+        """
+        timeout = self.timeout_for((how, what), timeout)
+        if not strict:
+            try:
+                wait_for_settled_page(self.browser, timeout, quiet_window)
+            except ScriptWaitUnavailable:
+                pass
+            else:
+                return not self.browser.find_elements(how, what)
+
+        element = wait_for_presence(self.browser, (how, what), timeout)
+
+        return element is None
+
+    def is_disappeared(self, how, what, timeout=None):
+        """
+        Return True if the element disappears within the timeout.
+
+        The default timeout is not learned: the time an element takes
+        to disappear is not recorded.
+        """
+        if timeout is None:
+            timeout = DEFAULT_TIMEOUT
+
+        return wait_for_absence(self.browser, (how, what), timeout)
 
     def should_be_login_and_sign_up_link(self):
         """Assert the presence of the login and sign-up link."""
@@ -68,43 +406,100 @@ class BasePage:
             *BasePageLocators.LOGIN_AND_SIGN_UP_LINK
         ), "Login and sign-up link is not present but should be"
 
-    def go_to_login_and_sign_up_page(self, timeout=DEFAULT_TIMEOUT):
+    def go_to_login_and_sign_up_page(self, timeout=None):
         """Navigate to the login and sign-up page."""
-        login_and_sign_up_link = WebDriverWait(self.browser, timeout).until(
-            EC.element_to_be_clickable(BasePageLocators.LOGIN_AND_SIGN_UP_LINK)
+        locator = BasePageLocators.LOGIN_AND_SIGN_UP_LINK
+        login_and_sign_up_link = WebDriverWait(
+            self.browser, self.timeout_for(locator, timeout)
+        ).until(EC.element_to_be_clickable(locator))
+        self.navigate_by_click(
+            login_and_sign_up_link,
+            "LoginAndSignUpPage",
+            "go_to_login_and_sign_up_page",
+            timeout
         )
-        login_and_sign_up_link.click()
 
-    def should_be_authorized_user(self, timeout=DEFAULT_TIMEOUT):
+    def should_be_authorized_user(self, timeout=None):
         """Assert the user is authorized (the user icon is visible)."""
-        try:
-            WebDriverWait(self.browser, timeout).until(
-                EC.presence_of_element_located(BasePageLocators.USER_ICON)
-            )
-        except TimeoutException:
-            assert False, (
-                "User icon is not present, indicating unauthorized user"
-            )
+        assert self.is_element_present(
+            *BasePageLocators.USER_ICON, timeout=timeout
+        ), "User icon is not present, indicating unauthorized user"
 
-    def go_to_basket(self, timeout=DEFAULT_TIMEOUT):
+    def go_to_basket(self, timeout=None):
         """Navigate to the basket page."""
-        basket_button = WebDriverWait(self.browser, timeout).until(
-            EC.element_to_be_clickable(BasePageLocators.BASKET_BUTTON)
+        locator = BasePageLocators.BASKET_BUTTON
+        basket_button = WebDriverWait(
+            self.browser, self.timeout_for(locator, timeout)
+        ).until(EC.element_to_be_clickable(locator))
+        self.navigate_by_click(
+            basket_button, "BasketPage", "go_to_basket", timeout
         )
-        basket_button.click()
+
+    def navigate_by_click(self, element, page, action, timeout=None):
+        """
+        Click the element and measure the load of the page it leads to
+        (see measure_page_load()).
+
+        With the page timings on, waits for the new document first:
+        right after the click, the script could read the timing of the
+        previous document, or of none.
+        """
+        self.start_navigation()
+        if self.page_timings is None:
+            element.click()
+            return
+
+        previous = document_identity(self.browser)
+        element.click()
+        WebDriverWait(self.browser, self.timeout_for(None, timeout)).until(
+            lambda browser: document_identity(browser) not in (None, previous)
+        )
+        self.measure_page_load(page, action)
 
     def solve_quiz_alert(self, timeout=DEFAULT_TIMEOUT):
         """
         Solve the quiz presented in a JavaScript alert.
 
         Used on product pages with promo offers requiring a math answer.
+        Returns the dialogs shown as [{"type", "message", "response"}]:
+        the quiz prompt and the alert with its result, if any.
+
+        If QUIZ_SOLVER_JS is installed, the page has already answered
+        the quiz, and its record is read in one call. Otherwise,
+        the real prompt is answered.
         """
+        # A script run while a dialog is open fails; the prompt can
+        # still open between the check and the script. The browsers
+        # leave it open then (unhandledPromptBehavior "ignore").
+        if not EC.alert_is_present()(self.browser):
+            try:
+                dialogs = self.browser.execute_script(TAKE_QUIZ_DIALOGS_JS)
+            except UnexpectedAlertPresentException:
+                dialogs = None
+            if dialogs:
+                return dialogs
+
         alert = WebDriverWait(self.browser, timeout).until(
             EC.alert_is_present()
         )
-
-        x = alert.text.split(" ")[2]
-        answer = str(math.log(abs((12 * math.sin(float(x))))))
-
+        question = alert.text
+        answer = quiz_answer(question)
         alert.send_keys(answer)
         alert.accept()
+        dialogs = [{"type": "prompt", "message": question, "response": answer}]
+
+        # The result alert may open a moment after the prompt closes;
+        # left open, it would fail every later command.
+        try:
+            result = WebDriverWait(self.browser, QUIZ_RESULT_TIMEOUT).until(
+                EC.alert_is_present()
+            )
+        except TimeoutException:
+            return dialogs
+
+        dialogs.append(
+            {"type": "alert", "message": result.text, "response": None}
+        )
+        result.accept()
+
+        return dialogs
@@ -6,15 +6,22 @@ Includes assertions for verifying the basket's empty state.
 
 from .base_page import BasePage
 from .locators import BasketPageLocators
+from .page_timings import LoadBudget
 
 
 class BasketPage(BasePage):
     """The page object class for the basket page."""
 
-    def should_be_empty(self):
+    # The storefront's targets (in ms); slower loads warn.
+    load_budgets = (
+        LoadBudget("ttfb", 1500),
+        LoadBudget("load", 4000),
+    )
+
+    def should_be_empty(self, strict=False):
         """Assert that the basket contains no products."""
         assert self.is_not_element_present(
-            *BasketPageLocators.BASKET_ITEMS
+            *BasketPageLocators.BASKET_ITEMS, strict=strict
         ), "Basket is not empty but should be"
 
     def should_be_empty_basket_message(self):
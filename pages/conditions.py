@@ -0,0 +1,153 @@
+"""
+Conditions over several page elements, checked in a single poll.
+
+A condition is a leaf (present, absent, visible, has_text, or
+contains_text of a locator) or a combination of conditions (all_of,
+any_of, or none_of); a bare locator in a combination means present().
+BasePage.wait_until() reads all the elements of a condition with one
+execute_script call per poll (see the snapshots module) and evaluates
+it in Python, so a set of checks does not need a wait per element.
+"""
+
+from collections import namedtuple
+
+from .locator_timings import locator_name
+
+# A check of one element: kind is "present", "absent", "visible",
+# "has_text", or "contains_text"; text is used by the text checks.
+Condition = namedtuple("Condition", ["kind", "locator", "text"])
+
+# A combination of conditions: mode is "all", "any", or "none".
+Composite = namedtuple("Composite", ["mode", "conditions"])
+
+
+class ConditionFailed(Exception):
+    """Raised when the condition to fail on holds while waiting."""
+
+
+def present(locator):
+    """Return the condition of the element being present in the DOM."""
+    return Condition("present", tuple(locator), None)
+
+
+def absent(locator):
+    """Return the condition of the element not being in the DOM."""
+    return Condition("absent", tuple(locator), None)
+
+
+def visible(locator):
+    """Return the condition of the element being visible."""
+    return Condition("visible", tuple(locator), None)
+
+
+def has_text(locator, text):
+    """Return the condition of the element's visible text being text."""
+    return Condition("has_text", tuple(locator), text)
+
+
+def contains_text(locator, text):
+    """Return the condition of the element's visible text containing text."""
+    return Condition("contains_text", tuple(locator), text)
+
+
+def all_of(*conditions):
+    """Return the condition of all the conditions holding."""
+    return Composite("all", tuple(map(_as_condition, conditions)))
+
+
+def any_of(*conditions):
+    """Return the condition of at least one of the conditions holding."""
+    return Composite("any", tuple(map(_as_condition, conditions)))
+
+
+def none_of(*conditions):
+    """Return the condition of none of the conditions holding."""
+    return Composite("none", tuple(map(_as_condition, conditions)))
+
+
+def _as_condition(condition):
+    """Return the condition; a bare locator means present(locator)."""
+    if isinstance(condition, (Condition, Composite)):
+        return condition
+
+    return present(condition)
+
+
+def leaves(condition):
+    """Return the element checks the condition consists of."""
+    condition = _as_condition(condition)
+    if isinstance(condition, Condition):
+        return [condition]
+
+    return [leaf for part in condition.conditions for leaf in leaves(part)]
+
+
+def snapshot_key(locator):
+    """Return the key of the locator's element in the snapshot."""
+    return locator_name(locator)
+
+
+def evaluate(condition, snapshot):
+    """
+    Return True if the condition holds in the snapshot.
+
+    The snapshot is the {snapshot_key: ElementSnapshot} map.
+    """
+    condition = _as_condition(condition)
+    if isinstance(condition, Composite):
+        results = (evaluate(part, snapshot) for part in condition.conditions)
+        if condition.mode == "all":
+            return all(results)
+        if condition.mode == "any":
+            return any(results)
+        return not any(results)
+
+    element = snapshot[snapshot_key(condition.locator)]
+    if condition.kind == "present":
+        return element.present
+    if condition.kind == "absent":
+        return not element.present
+    if condition.kind == "visible":
+        return element.visible
+    if condition.kind == "has_text":
+        return element.text == condition.text
+
+    return element.text is not None and condition.text in element.text
+
+
+def unmet(condition, snapshot):
+    """
+    Return the descriptions of the checks that keep the condition from
+    holding in the snapshot.
+
+    For none_of(), these are the checks that hold but should not.
+    """
+    condition = _as_condition(condition)
+    if evaluate(condition, snapshot):
+        return []
+    if isinstance(condition, Condition):
+        return [describe(condition)]
+    if condition.mode == "none":
+        return [
+            f"not {describe(part)}" for part in condition.conditions
+            if evaluate(part, snapshot)
+        ]
+
+    return [
+        description for part in condition.conditions
+        for description in unmet(part, snapshot)
+    ]
+
+
+def describe(condition):
+    """Return a readable description of the condition."""
+    condition = _as_condition(condition)
+    if isinstance(condition, Composite):
+        parts = ", ".join(map(describe, condition.conditions))
+        return f"{condition.mode}_of({parts})"
+
+    name = locator_name(condition.locator)
+    if condition.kind in ("has_text", "contains_text"):
+        return f"{condition.kind}({name}, {condition.text!r})"
+
+    return f"{condition.kind}({name})"
@@ -0,0 +1,260 @@
+"""
+Event-driven waits for the page objects based on a MutationObserver.
+
+A polling wait sends a WebDriver command (a full HTTP round trip) on
+every poll. Here a single asynchronous script observes the DOM mutations
+in the page and resolves as soon as the locator appears or disappears.
+When the script cannot be run (e.g., the browser blocks it), the waits
+fall back to regular WebDriverWait polling. The drivers that share the
+browser with other tabs (polling_waits_only) always poll, so that the
+browser is not held for the whole wait. The documents of the drivers
+without a browser (static_document) never change, so their waits check
+the element once.
+
+A similar script waits for the page to settle (the document is loaded,
+and both the DOM and the network stay quiet for a short window), so that
+the absence of an element can be checked once instead of waiting for
+the whole timeout.
+"""
+
+import time
+import weakref
+
+from selenium.common.exceptions import (
+    JavascriptException,
+    TimeoutException,
+    WebDriverException,
+)
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Defines findElement(how, what) in the page for the Selenium By strategies.
+FIND_ELEMENT_JS = """
+function findElement(how, what) {
+    var found;
+    switch (how) {
+        case "id":
+            return document.getElementById(what);
+        case "name":
+            return document.getElementsByName(what)[0] || null;
+        case "class name":
+            return document.getElementsByClassName(what)[0] || null;
+        case "tag name":
+            return document.getElementsByTagName(what)[0] || null;
+        case "css selector":
+            return document.querySelector(what);
+        case "xpath":
+            return document.evaluate(
+                what, document, null,
+                XPathResult.FIRST_ORDERED_NODE_TYPE, null
+            ).singleNodeValue;
+        case "link text":
+        case "partial link text":
+            found = Array.prototype.find.call(
+                document.getElementsByTagName("a"),
+                function (link) {
+                    var text = link.textContent.trim();
+                    return how === "link text"
+                        ? text === what : text.indexOf(what) !== -1;
+                }
+            );
+            return found || null;
+    }
+    throw new Error("Unsupported locator strategy: " + how);
+}
+"""
+
+# Resolves with the element (or true on disappearance) once the expected
+# state is reached, or with null (or false) when the timeout expires.
+WAIT_FOR_ELEMENT_JS = FIND_ELEMENT_JS + """
+var timeout = arguments[0], how = arguments[1], what = arguments[2],
+    present = arguments[3], done = arguments[arguments.length - 1];
+var observer = null, timer = null, finished = false;
+
+function finish(result) {
+    if (finished) { return; }
+    finished = true;
+    if (observer) { observer.disconnect(); }
+    clearTimeout(timer);
+    done(result);
+}
+
+function check() {
+    var element = findElement(how, what);
+    if (present && element) { finish(element); }
+    if (!present && !element) { finish(true); }
+}
+
+check();
+if (!finished) {
+    observer = new MutationObserver(check);
+    observer.observe(document, {
+        childList: true, subtree: true, attributes: true
+    });
+    timer = setTimeout(function () {
+        finish(present ? null : false);
+    }, timeout);
+}
+"""
+
+# Resolves with true once the document is loaded and neither DOM mutations
+# nor finished network requests happened during the quiet window, or with
+# false when the timeout expires.
+WAIT_FOR_SETTLED_PAGE_JS = """
+var timeout = arguments[0], quietWindow = arguments[1],
+    done = arguments[arguments.length - 1];
+var observer = null, resourceObserver = null, quietTimer = null,
+    finished = false;
+
+function finish(result) {
+    if (finished) { return; }
+    finished = true;
+    if (observer) { observer.disconnect(); }
+    if (resourceObserver) { resourceObserver.disconnect(); }
+    clearTimeout(quietTimer);
+    clearTimeout(deadlineTimer);
+    done(result);
+}
+
+function restartQuietTimer() {
+    clearTimeout(quietTimer);
+    quietTimer = setTimeout(function () { finish(true); }, quietWindow);
+}
+
+function observe() {
+    observer = new MutationObserver(restartQuietTimer);
+    observer.observe(document, {
+        childList: true, subtree: true, attributes: true,
+        characterData: true
+    });
+    if (window.PerformanceObserver) {
+        resourceObserver = new PerformanceObserver(restartQuietTimer);
+        resourceObserver.observe({type: "resource"});
+    }
+    restartQuietTimer();
+}
+
+var deadlineTimer = setTimeout(function () { finish(false); }, timeout);
+if (document.readyState === "complete") {
+    observe();
+} else {
+    window.addEventListener("load", observe);
+}
+"""
+
+# Default time (in seconds) the page must stay quiet to count as settled.
+DEFAULT_QUIET_WINDOW = 0.3
+
+# Extra time (in seconds) given to the driver to deliver a script result.
+SCRIPT_TIMEOUT_MARGIN = 2
+
+# The WebDriver default script timeout (in seconds).
+DEFAULT_SCRIPT_TIMEOUT = 30
+
+# The script timeout last set for each driver.
+_script_timeouts = weakref.WeakKeyDictionary()
+
+
+class ScriptWaitUnavailable(Exception):
+    """Raised when the waiting script cannot be run in the browser."""
+
+
+def wait_for_presence(browser, locator, timeout):
+    """Return the element once it is present, or None after the timeout."""
+    if getattr(browser, "static_document", False):
+        return next(iter(browser.find_elements(*locator)), None)
+
+    deadline = time.monotonic() + timeout
+    try:
+        return _execute_wait(
+            browser, deadline, WAIT_FOR_ELEMENT_JS, *locator, True
+        )
+    except ScriptWaitUnavailable:
+        pass
+
+    try:
+        return WebDriverWait(browser, _time_left(deadline)).until(
+            EC.presence_of_element_located(locator)
+        )
+    except TimeoutException:
+        return None
+
+
+def wait_for_absence(browser, locator, timeout):
+    """Return True if the element is absent or disappears in timeout."""
+    if getattr(browser, "static_document", False):
+        return not browser.find_elements(*locator)
+
+    deadline = time.monotonic() + timeout
+    try:
+        return _execute_wait(
+            browser, deadline, WAIT_FOR_ELEMENT_JS, *locator, False
+        )
+    except ScriptWaitUnavailable:
+        pass
+
+    try:
+        WebDriverWait(
+            browser, _time_left(deadline), 1, (TimeoutException,)
+        ).until_not(EC.presence_of_element_located(locator))
+    except TimeoutException:
+        return False
+
+    return True
+
+
+def wait_for_settled_page(browser, timeout, quiet_window=DEFAULT_QUIET_WINDOW):
+    """
+    Return True once the page is loaded and quiet, False after timeout.
+
+    Raises ScriptWaitUnavailable if the script cannot be run.
+    A static document is settled once loaded.
+    """
+    if getattr(browser, "static_document", False):
+        return True
+
+    deadline = time.monotonic() + timeout
+
+    return _execute_wait(
+        browser, deadline, WAIT_FOR_SETTLED_PAGE_JS,
+        int(quiet_window * 1000)
+    )
+
+
+def _execute_wait(browser, deadline, script, *args):
+    """
+    Run the waiting script until it resolves or the time is up.
+
+    The script receives the time left (in ms) as its first argument.
+    It is restarted if the page navigates while waiting.
+    """
+    if getattr(browser, "polling_waits_only", False):
+        raise ScriptWaitUnavailable("The browser is shared by other tabs")
+
+    while True:
+        time_left = _time_left(deadline)
+        try:
+            _ensure_script_timeout(browser, time_left)
+            return browser.execute_async_script(
+                script, int(time_left * 1000), *args
+            )
+        except JavascriptException as error:
+            # A navigation destroys the observed document.
+            if "unloaded" not in (error.msg or "") or time_left == 0:
+                raise ScriptWaitUnavailable(error.msg) from error
+        except WebDriverException as error:
+            raise ScriptWaitUnavailable(error.msg) from error
+
+
+def _time_left(deadline):
+    """Return the number of seconds left until the deadline."""
+    return max(deadline - time.monotonic(), 0)
+
+
+def _ensure_script_timeout(browser, timeout):
+    """Make sure the driver waits for the script result long enough."""
+    current = _script_timeouts.get(browser, DEFAULT_SCRIPT_TIMEOUT)
+    if timeout + SCRIPT_TIMEOUT_MARGIN > current:
+        current = timeout + SCRIPT_TIMEOUT_MARGIN
+        browser.set_script_timeout(current)
+        _script_timeouts[browser] = current
@@ -0,0 +1,114 @@
+"""
+Defines ElementCache: the element handles a page object has located.
+
+Locating an element is a WebDriver wait script, so reading the same
+element twice costs two waits. The cache keeps the handles a page
+object has found, keyed by the locator, and the next read uses the
+handle directly, without any check of its own. A handle only works in
+the document it was found in: after any navigation (a page object's,
+a raw get(), back(), refresh(), a form submit, or a JavaScript
+redirect), or once the element is removed, using it raises
+StaleElementReferenceException, and the element is located again once.
+
+The lookups of all the page objects are counted in ElementCacheStats:
+every hit saves the round trip of an element wait, and every stale
+handle costs the round trip of the failed read. The listeners of the
+stats (e.g., the command tracer) see every lookup.
+
+The document_identity() of the browser tells the navigations apart
+(e.g., the one a click starts) at the cost of a script of its own.
+"""
+
+import threading
+
+from selenium.common.exceptions import WebDriverException
+
+# Returns the token of the current document: a random string stored in
+# the window by the first run of the script in the document.
+DOCUMENT_TOKEN_JS = """
+if (!window.hasOwnProperty("__pageObjectDocument")) {
+    Object.defineProperty(window, "__pageObjectDocument", {
+        value: performance.timeOrigin + "-" + Math.random()
+    });
+}
+return window.__pageObjectDocument;
+"""
+
+
+def document_identity(browser):
+    """
+    Return the token of the browser's current document.
+
+    Returns None if it cannot be read (e.g., a dialog is open).
+    The HTTP driver numbers its documents itself.
+    """
+    if getattr(browser, "static_document", False):
+        return browser.document_id
+
+    try:
+        return browser.execute_script(DOCUMENT_TOKEN_JS)
+    except WebDriverException:
+        return None
+
+
+class ElementCacheStats:
+    """The hits, misses, and stale handles of the element caches."""
+
+    def __init__(self):
+        """Initialize the zero counts."""
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.listeners = []
+        self._lock = threading.Lock()
+
+    def record(self, outcome, locator=None):
+        """
+        Count a lookup of the locator: "hits", "misses", or "stale".
+
+        Calls listener(outcome, locator) of every listener.
+        """
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+        for listener in self.listeners:
+            listener(outcome, locator)
+
+    def add(self, counts):
+        """Add the counts of another process (see as_dict())."""
+        with self._lock:
+            for outcome, count in counts.items():
+                setattr(self, outcome, getattr(self, outcome) + count)
+
+    def as_dict(self):
+        """Return the counts as a dict."""
+        return {"hits": self.hits, "misses": self.misses, "stale": self.stale}
+
+    def hit_rate(self):
+        """Return the fraction of the lookups served from the cache."""
+        lookups = self.hits + self.misses + self.stale
+
+        return self.hits / lookups if lookups else 0.0
+
+    def round_trips_saved(self):
+        """Return the element waits saved less the failed stale reads."""
+        return self.hits - self.stale
+
+
+class ElementCache:
+    """The element handles of a page object by their locators."""
+
+    def __init__(self):
+        """Initialize the empty cache."""
+        self._elements = {}
+
+    def get(self, locator):
+        """Return the handle found for the locator earlier, or None."""
+        return self._elements.get(tuple(locator))
+
+    def put(self, locator, element):
+        """Remember the handle found for the locator."""
+        self._elements[tuple(locator)] = element
+
+    def forget(self, locator):
+        """Drop the locator's handle."""
+        self._elements.pop(tuple(locator), None)
@@ -0,0 +1,187 @@
+"""
+Defines LocatorTimings: per-locator timeouts learned from past runs.
+
+Records how long each locator takes to appear after the navigation to
+its page and keeps the latencies in a small SQLite database shared
+across the runs (and the pytest-xdist workers). A locator's timeout is
+the p99 of its recent latencies times a safety factor, within bounds;
+the locators without enough history keep the default timeout. The
+locators whose latency has grown in the current run compared with
+their history are reported as drifting.
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from . import locators
+
+# Default path of the database.
+DEFAULT_TIMINGS_DB = ".locator_timings.sqlite"
+
+# The learned timeout is the p99 latency times the safety factor,
+# within the bounds (in seconds).
+SAFETY_FACTOR = 3
+MIN_TIMEOUT = 1
+MAX_TIMEOUT = 10
+
+# The number of samples needed to learn a timeout, and the number of
+# the latest samples kept per locator.
+MIN_SAMPLES = 20
+HISTORY_SIZE = 200
+
+# A locator drifts if its median latency in the current run exceeds the
+# historical one by the ratio and by the minimum difference (in seconds).
+DRIFT_RATIO = 1.5
+MIN_DRIFT = 0.05
+
+# The time the database waits for a lock held by another worker.
+DB_LOCK_TIMEOUT = 30
+
+
+def _locator_names():
+    """Return {locator: "LocatorsClass.NAME"} of pages/locators.py."""
+    names = {}
+    for class_name, locators_class in vars(locators).items():
+        if not class_name.endswith("Locators"):
+            continue
+        for name, value in vars(locators_class).items():
+            if name.isupper():
+                names[value] = f"{class_name}.{name}"
+
+    return names
+
+
+_LOCATOR_NAMES = _locator_names()
+
+
+def locator_name(locator):
+    """Return the name of the locator, e.g., BasePageLocators.USER_ICON."""
+    locator = tuple(locator)
+
+    return _LOCATOR_NAMES.get(locator, "=".join(locator))
+
+
+def _percentile(values, fraction):
+    """Return the nearest-rank percentile of the values."""
+    ordered = sorted(values)
+
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+class LocatorTimings:
+    """The appearance latencies of the locators and their timeouts."""
+
+    def __init__(self, path=DEFAULT_TIMINGS_DB):
+        """
+        Open the database and learn the timeouts from its history.
+
+        The timeouts stay fixed for the whole run.
+        """
+        self.path = path
+        self._pending = []
+        self._lock = threading.Lock()
+
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS appearances ("
+                "locator TEXT NOT NULL, latency REAL NOT NULL, "
+                "recorded_at REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS appearances_by_locator "
+                "ON appearances (locator, recorded_at)"
+            )
+            self._timeouts = {
+                locator: self._learn_timeout(latencies)
+                for locator, latencies in self._history(db).items()
+                if len(latencies) >= MIN_SAMPLES
+            }
+
+    def timeout_for(self, locator, default):
+        """Return the learned timeout of the locator or the default."""
+        return self._timeouts.get(locator_name(locator), default)
+
+    def record(self, locator, latency):
+        """Remember the time the locator took to appear."""
+        with self._lock:
+            self._pending.append(
+                (locator_name(locator), latency, time.time())
+            )
+
+    def flush(self):
+        """Save the recorded latencies and prune the old ones."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        with self._connect() as db:
+            db.executemany(
+                "INSERT INTO appearances VALUES (?, ?, ?)", pending
+            )
+            for locator in {name for name, _, _ in pending}:
+                db.execute(
+                    "DELETE FROM appearances WHERE locator = ? AND rowid "
+                    "NOT IN (SELECT rowid FROM appearances WHERE locator = ? "
+                    "ORDER BY recorded_at DESC LIMIT ?)",
+                    (locator, locator, HISTORY_SIZE)
+                )
+
+    def drifting_locators(self, since):
+        """
+        Return (locator, historical p50, current p50) of the locators
+        whose latency has grown in the samples recorded since the time.
+        """
+        with self._connect() as db:
+            history = self._history(db, "recorded_at < ?", since)
+            current = self._history(db, "recorded_at >= ?", since)
+
+        drifting = []
+        for locator, latencies in sorted(current.items()):
+            previous = history.get(locator, [])
+            if len(previous) < MIN_SAMPLES:
+                continue
+
+            previous_p50 = _percentile(previous, 0.5)
+            current_p50 = _percentile(latencies, 0.5)
+            if (
+                    current_p50 > previous_p50 * DRIFT_RATIO
+                    and current_p50 - previous_p50 > MIN_DRIFT
+            ):
+                drifting.append((locator, previous_p50, current_p50))
+
+        return drifting
+
+    def _learn_timeout(self, latencies):
+        """Return the bounded p99 latency times the safety factor."""
+        timeout = _percentile(latencies, 0.99) * SAFETY_FACTOR
+
+        return min(max(timeout, MIN_TIMEOUT), MAX_TIMEOUT)
+
+    def _history(self, db, condition="1", *params):
+        """Return {locator: [latency]} of the samples that match."""
+        history = {}
+        for locator, latency in db.execute(
+                f"SELECT locator, latency FROM appearances WHERE {condition}",
+                params
+        ):
+            history.setdefault(locator, []).append(latency)
+
+        return history
+
+    @contextmanager
+    def _connect(self):
+        """
+        Open a transaction that waits for the other workers' writes.
+
+        Commits it and closes the connection at the end.
+        """
+        db = sqlite3.connect(self.path, timeout=DB_LOCK_TIMEOUT)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
@@ -41,13 +41,14 @@ class ProductPageLocators:
 
     # Messages after adding a product to the basket.
     PRODUCT_ADDED_MESSAGE = (
-        By.CSS_SELECTOR, "#messages .alert-success:nth-of-type(1) .alertinner"
+        By.CSS_SELECTOR,
+        "#messages div.alert-success:nth-of-type(1) .alertinner"
     )
     BASKET_TOTAL_MESSAGE = (By.CSS_SELECTOR, "#messages .alert-info")
 
     # Text within the messages after adding a product to the basket.
     PRODUCT_NAME_IN_MESSAGE = (
-        By.CSS_SELECTOR, "#messages .alert-success:nth-of-type(1) strong"
+        By.CSS_SELECTOR, "#messages div.alert-success:nth-of-type(1) strong"
     )
     BASKET_TOTAL = (By.CSS_SELECTOR, "#messages .alert-info strong")
 
@@ -7,7 +7,7 @@ Provides methods for the URL/form assertions and new user sign-up.
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
-from .base_page import BasePage, DEFAULT_TIMEOUT
+from .base_page import BasePage
 from .locators import LoginAndSignUpPageLocators
 
 
@@ -38,36 +38,30 @@ class LoginAndSignUpPage(BasePage):
             *LoginAndSignUpPageLocators.SIGN_UP_FORM
         ), "Sign-up form is not present"
 
-    def sign_up_new_user(self, email, password, timeout=DEFAULT_TIMEOUT):
+    def sign_up_new_user(self, email, password, timeout=None):
         """
         Fill the sign-up form and submit it.
 
         Uses the email and password generated in the setup() fixture.
         """
-        email_input = WebDriverWait(self.browser, timeout).until(
-            EC.presence_of_element_located(
-                LoginAndSignUpPageLocators.EMAIL_INPUT
-            )
+        email_input = self.find_present_element(
+            LoginAndSignUpPageLocators.EMAIL_INPUT, timeout
         )
         email_input.send_keys(email)
 
-        password_input_1 = WebDriverWait(self.browser, timeout).until(
-            EC.presence_of_element_located(
-                LoginAndSignUpPageLocators.PASSWORD_INPUT_1
-            )
+        password_input_1 = self.find_present_element(
+            LoginAndSignUpPageLocators.PASSWORD_INPUT_1, timeout
         )
         password_input_1.send_keys(password)
 
-        password_input_2 = WebDriverWait(self.browser, timeout).until(
-            EC.presence_of_element_located(
-                LoginAndSignUpPageLocators.PASSWORD_INPUT_2
-            )
+        password_input_2 = self.find_present_element(
+            LoginAndSignUpPageLocators.PASSWORD_INPUT_2, timeout
         )
         password_input_2.send_keys(password)
 
-        sign_up_button = WebDriverWait(self.browser, timeout).until(
-            EC.element_to_be_clickable(
-                LoginAndSignUpPageLocators.SIGN_UP_BUTTON
-            )
-        )
+        locator = LoginAndSignUpPageLocators.SIGN_UP_BUTTON
+        sign_up_button = WebDriverWait(
+            self.browser, self.timeout_for(locator, timeout)
+        ).until(EC.element_to_be_clickable(locator))
+        self.start_navigation()
         sign_up_button.click()
@@ -0,0 +1,283 @@
+"""
+Defines PageTimings: the page-load metrics of the page objects.
+
+After a page object opens a page (or navigates to another one), a single
+asynchronous script (polled in a browser shared by other tabs) reads
+the Navigation Timing entry of the document and the Resource Timing
+entries of its resources: the time to the first byte,
+DOMContentLoaded, the load event, the bytes transferred, and the
+number of resources. The loads are kept in a small SQLite database
+shared across the runs (and the pytest-xdist workers), so the run report
+shows every page's medians next to their history.
+
+A page object declares its budgets as LoadBudget values. A soft budget
+only warns (BudgetExceeded) when it is exceeded; a hard one fails the
+test.
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from selenium.common.exceptions import WebDriverException
+
+# Default path of the database.
+DEFAULT_PAGE_TIMINGS_DB = ".page_timings.sqlite"
+
+# Returns the timings of the current document, or null if the browser
+# has no Navigation Timing entry for it. The times are in ms from the
+# start of the navigation.
+COLLECT_PAGE_TIMING_JS = """
+function collectPageTiming() {
+    var navigation = performance.getEntriesByType("navigation")[0];
+    if (!navigation) {
+        return null;
+    }
+    var resources = performance.getEntriesByType("resource");
+    var transferSize = navigation.transferSize || 0;
+    resources.forEach(function (resource) {
+        transferSize += resource.transferSize || 0;
+    });
+    return {
+        ttfb: navigation.responseStart - navigation.startTime,
+        dom_content_loaded:
+            navigation.domContentLoadedEventEnd - navigation.startTime,
+        load: navigation.loadEventEnd - navigation.startTime,
+        transfer_size: transferSize,
+        resources: resources.length
+    };
+}
+"""
+
+# Resolves with the timings once the document is loaded.
+PAGE_TIMING_JS = COLLECT_PAGE_TIMING_JS + """
+var done = arguments[arguments.length - 1];
+
+// loadEventEnd is set once the load event handlers have run.
+if (document.readyState === "complete") {
+    setTimeout(function () { done(collectPageTiming()); }, 0);
+} else {
+    window.addEventListener("load", function () {
+        setTimeout(function () { done(collectPageTiming()); }, 0);
+    });
+}
+"""
+
+# Returns the timings if the document is loaded, and "loading" if not.
+POLL_PAGE_TIMING_JS = COLLECT_PAGE_TIMING_JS + """
+var navigation = performance.getEntriesByType("navigation")[0];
+if (navigation && !(navigation.loadEventEnd > 0)) {
+    return "loading";
+}
+return collectPageTiming();
+"""
+
+# Time (in seconds) between the polls of the page timing, and the time
+# to wait for the load event (as long as the script timeout).
+PAGE_TIMING_POLL_INTERVAL = 0.1
+PAGE_TIMING_POLL_TIMEOUT = 30
+
+# The metrics of a load: the times are in ms, the transfer size is in
+# bytes (0 for the resources served from the browser's cache).
+METRICS = ("ttfb", "dom_content_loaded", "load", "transfer_size", "resources")
+
+# The number of the latest loads kept per page.
+HISTORY_SIZE = 200
+
+# The time the database waits for a lock held by another worker.
+DB_LOCK_TIMEOUT = 30
+
+# A limit of a page's load metric; a hard budget fails the test.
+LoadBudget = namedtuple(
+    "LoadBudget", ["metric", "limit", "hard"], defaults=(False,)
+)
+
+# The metrics of a page load (see METRICS).
+PageTiming = namedtuple("PageTiming", METRICS)
+
+
+class BudgetExceeded(UserWarning):
+    """Warns that a page load has exceeded a soft budget."""
+
+
+def read_page_timing(browser):
+    """
+    Return the PageTiming of the browser's current page.
+
+    Returns None if the browser cannot run the script (e.g., the HTTP
+    driver) or has no timing of the page. A browser shared by other
+    tabs (polling_waits_only) is polled until the load event instead
+    of being held by an asynchronous script.
+    """
+    try:
+        if getattr(browser, "polling_waits_only", False):
+            timing = _poll_page_timing(browser)
+        else:
+            timing = browser.execute_async_script(PAGE_TIMING_JS)
+    except WebDriverException:
+        return None
+    if timing is None:
+        return None
+
+    return PageTiming(**{metric: timing[metric] for metric in METRICS})
+
+
+def _poll_page_timing(browser):
+    """Return the timings once loaded, or None if the time is up."""
+    deadline = time.monotonic() + PAGE_TIMING_POLL_TIMEOUT
+    while True:
+        timing = browser.execute_script(POLL_PAGE_TIMING_JS)
+        if timing != "loading":
+            return timing
+        if time.monotonic() > deadline:
+            return None
+        time.sleep(PAGE_TIMING_POLL_INTERVAL)
+
+
+def exceeded_budgets(timing, budgets):
+    """Return the budgets the PageTiming exceeds."""
+    return [
+        budget for budget in budgets
+        if getattr(timing, budget.metric) > budget.limit
+    ]
+
+
+def describe_budget(budget, timing):
+    """Return a readable description of the exceeded budget."""
+    unit = " B" if budget.metric == "transfer_size" else (
+        "" if budget.metric == "resources" else " ms"
+    )
+
+    return (
+        f"{budget.metric} {getattr(timing, budget.metric):.0f}{unit} > "
+        f"{budget.limit}{unit}"
+    )
+
+
+def _median(values):
+    """Return the nearest-rank median of the values."""
+    ordered = sorted(values)
+
+    return ordered[max(math.ceil(0.5 * len(ordered)) - 1, 0)]
+
+
+class PageTimings:
+    """The page loads measured by the page objects."""
+
+    def __init__(self, path=DEFAULT_PAGE_TIMINGS_DB):
+        """Open the database."""
+        self.path = path
+        self._pending = []
+        self._lock = threading.Lock()
+
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS page_loads ("
+                "page TEXT NOT NULL, action TEXT NOT NULL, "
+                + ", ".join(f"{metric} REAL NOT NULL" for metric in METRICS)
+                + ", over_budget INTEGER NOT NULL, "
+                "recorded_at REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS page_loads_by_page "
+                "ON page_loads (page, recorded_at)"
+            )
+
+    def record(self, page, action, timing, over_budget):
+        """
+        Remember a load of the page by the page-object action.
+
+        over_budget is the number of the budgets the load exceeded.
+        """
+        with self._lock:
+            self._pending.append(
+                (page, action, *timing, over_budget, time.time())
+            )
+
+    def flush(self):
+        """Save the recorded loads and prune the old ones."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        with self._connect() as db:
+            db.executemany(
+                "INSERT INTO page_loads VALUES "
+                f"({', '.join('?' * (len(METRICS) + 4))})",
+                pending
+            )
+            for page in {load[0] for load in pending}:
+                db.execute(
+                    "DELETE FROM page_loads WHERE page = ? AND rowid "
+                    "NOT IN (SELECT rowid FROM page_loads WHERE page = ? "
+                    "ORDER BY recorded_at DESC LIMIT ?)",
+                    (page, page, HISTORY_SIZE)
+                )
+
+    def report(self, since):
+        """
+        Return the lines of the per-page report of the loads recorded
+        since the time, with the load medians of the earlier runs.
+        """
+        with self._connect() as db:
+            current = self._loads(db, "recorded_at >= ?", since)
+            history = self._loads(db, "recorded_at < ?", since)
+
+        lines = []
+        for page, loads in sorted(current.items()):
+            medians = {
+                metric: _median([load[metric] for load in loads])
+                for metric in METRICS
+            }
+            line = (
+                f"{page}: {len(loads)} loads, "
+                f"TTFB p50 {medians['ttfb']:.0f} ms, "
+                f"DOMContentLoaded p50 {medians['dom_content_loaded']:.0f} "
+                f"ms, load p50 {medians['load']:.0f} ms"
+            )
+            previous = [load["load"] for load in history.get(page, [])]
+            if previous and _median(previous):
+                change = medians["load"] / _median(previous) - 1
+                line += f" ({change:+.0%} vs history)"
+            line += (
+                f", {medians['transfer_size'] / 1024:.0f} KiB in "
+                f"{medians['resources']:.0f} resources"
+            )
+            over_budget = sum(1 for load in loads if load["over_budget"])
+            if over_budget:
+                line += f", {over_budget} over budget"
+            lines.append(line)
+
+        return lines
+
+    def _loads(self, db, condition, *params):
+        """Return {page: [{metric: value, "over_budget": n}]} that match."""
+        loads = {}
+        for row in db.execute(
+                f"SELECT page, {', '.join(METRICS)}, over_budget "
+                f"FROM page_loads WHERE {condition}",
+                params
+        ):
+            loads.setdefault(row[0], []).append(
+                dict(zip(METRICS + ("over_budget",), row[1:]))
+            )
+
+        return loads
+
+    @contextmanager
+    def _connect(self):
+        """
+        Open a transaction that waits for the other workers' writes.
+
+        Commits it and closes the connection at the end.
+        """
+        db = sqlite3.connect(self.path, timeout=DB_LOCK_TIMEOUT)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
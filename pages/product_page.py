@@ -2,62 +2,124 @@
 Contains ProductPage: the page object class for the product page.
 
 Includes methods for product interaction and basket message validation.
+The getters and checks accept an optional snapshot of the page (see
+take_product_snapshot()) to avoid going back to the browser.
 """
 
+from operator import attrgetter
+
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
-from .base_page import BasePage, DEFAULT_TIMEOUT
+from .base_page import BasePage
+from .conditions import ConditionFailed, all_of, any_of, has_text, none_of
 from .locators import ProductPageLocators
+from .page_timings import LoadBudget
+from .snapshots import locators_of
 
 
 class ProductPage(BasePage):
     """The page object class for the product page."""
 
-    def get_product_name(self, timeout=DEFAULT_TIMEOUT):
+    # The storefront's targets (in ms): slower loads warn, and a load
+    # slower than the hard limit fails the test.
+    load_budgets = (
+        LoadBudget("ttfb", 1500),
+        LoadBudget("load", 5000),
+        LoadBudget("load", 20000, hard=True),
+    )
+
+    def take_product_snapshot(
+            self,
+            after_adding=False,
+            timeout=None
+    ):
+        """
+        Read all the product page elements in a single round trip.
+
+        If after_adding is True, waits for the 'Product added' message
+        first, as it appears only after the page is reloaded.
+        """
+        return self.take_snapshot(
+            locators_of(ProductPageLocators),
+            wait_for=(
+                ProductPageLocators.PRODUCT_ADDED_MESSAGE
+                if after_adding else None
+            ),
+            timeout=timeout
+        )
+
+    def get_product_name(self, timeout=None, snapshot=None):
         """Return the product name from the product page."""
-        return WebDriverWait(self.browser, timeout).until(
-            EC.presence_of_element_located(ProductPageLocators.PRODUCT_NAME)
-        ).text
+        if snapshot is not None:
+            return snapshot["PRODUCT_NAME"].text
+
+        return self.read_element(
+            ProductPageLocators.PRODUCT_NAME, attrgetter("text"), timeout
+        )
 
-    def get_product_price(self, timeout=DEFAULT_TIMEOUT):
+    def get_product_price(self, timeout=None, snapshot=None):
         """Return the product price from the product page."""
-        return WebDriverWait(self.browser, timeout).until(
-            EC.presence_of_element_located(ProductPageLocators.PRODUCT_PRICE)
-        ).text
+        if snapshot is not None:
+            return snapshot["PRODUCT_PRICE"].text
 
-    def get_product_name_in_message(self, timeout=DEFAULT_TIMEOUT):
+        return self.read_element(
+            ProductPageLocators.PRODUCT_PRICE, attrgetter("text"), timeout
+        )
+
+    def get_product_name_in_message(
+            self,
+            timeout=None,
+            snapshot=None
+    ):
         """Return the product name from the 'Product added' message."""
-        return WebDriverWait(self.browser, timeout).until(
-            EC.presence_of_element_located(
-                ProductPageLocators.PRODUCT_NAME_IN_MESSAGE)
-        ).text
+        if snapshot is not None:
+            return snapshot["PRODUCT_NAME_IN_MESSAGE"].text
 
-    def get_basket_total(self, timeout=DEFAULT_TIMEOUT):
+        return self.read_element(
+            ProductPageLocators.PRODUCT_NAME_IN_MESSAGE,
+            attrgetter("text"),
+            timeout
+        )
+
+    def get_basket_total(self, timeout=None, snapshot=None):
         """Return the basket total from the basket total message."""
-        return WebDriverWait(self.browser, timeout).until(
-            EC.presence_of_element_located(ProductPageLocators.BASKET_TOTAL)
-        ).text
+        if snapshot is not None:
+            return snapshot["BASKET_TOTAL"].text
 
-    def add_product_to_basket(self, timeout=DEFAULT_TIMEOUT):
-        """Add the product to the basket."""
-        add_button = WebDriverWait(self.browser, timeout).until(
-            EC.element_to_be_clickable(
-                ProductPageLocators.ADD_TO_BASKET_BUTTON
-            )
+        return self.read_element(
+            ProductPageLocators.BASKET_TOTAL, attrgetter("text"), timeout
         )
+
+    def add_product_to_basket(self, timeout=None):
+        """Add the product to the basket."""
+        locator = ProductPageLocators.ADD_TO_BASKET_BUTTON
+        add_button = WebDriverWait(
+            self.browser, self.timeout_for(locator, timeout)
+        ).until(EC.element_to_be_clickable(locator))
+        self.start_navigation()
+        # Not measured: the page it loads may open the quiz prompt, which
+        # blocks the timing script.
         add_button.click()
 
-    def should_be_product_added_message(self):
+    def should_be_product_added_message(self, snapshot=None):
         """Assert the presence of the 'Product added' message."""
-        assert self.is_element_present(
-            *ProductPageLocators.PRODUCT_ADDED_MESSAGE
-        ), "'Product added' message is not present but should be"
+        if snapshot is not None:
+            is_present = snapshot["PRODUCT_ADDED_MESSAGE"].present
+        else:
+            is_present = self.is_element_present(
+                *ProductPageLocators.PRODUCT_ADDED_MESSAGE
+            )
 
-    def should_not_be_product_added_message(self):
+        assert is_present, (
+            "'Product added' message is not present but should be"
+        )
+
+    def should_not_be_product_added_message(self, strict=False):
         """Assert the absence of the 'Product added' message."""
         assert self.is_not_element_present(
-            *ProductPageLocators.PRODUCT_ADDED_MESSAGE
+            *ProductPageLocators.PRODUCT_ADDED_MESSAGE, strict=strict
         ), "'Product added' message is present but should not be"
 
     def should_disappear_product_added_message(self):
@@ -66,27 +128,73 @@ class ProductPage(BasePage):
             *ProductPageLocators.PRODUCT_ADDED_MESSAGE
         ), "'Product added' message did not disappear but should have"
 
-    def should_be_basket_total_message(self):
+    def should_be_basket_total_message(self, snapshot=None):
         """Assert the presence of the basket total message."""
-        assert self.is_element_present(
-            *ProductPageLocators.BASKET_TOTAL_MESSAGE
-        ), "Basket total message is not present but should be"
+        if snapshot is not None:
+            is_present = snapshot["BASKET_TOTAL_MESSAGE"].present
+        else:
+            is_present = self.is_element_present(
+                *ProductPageLocators.BASKET_TOTAL_MESSAGE
+            )
+
+        assert is_present, "Basket total message is not present but should be"
 
     def should_be_correct_product_name_in_product_added_message(
             self,
-            product_name
+            product_name,
+            snapshot=None
     ):
         """Assert the product name in message matches added product."""
-        product_name_in_message = self.get_product_name_in_message()
+        product_name_in_message = self.get_product_name_in_message(
+            snapshot=snapshot
+        )
         assert product_name == product_name_in_message, (
             f"Expected product name '{product_name}' in 'Product added' "
             f"message, but got '{product_name_in_message}'"
         )
 
-    def should_be_correct_price_in_basket_total_message(self, product_price):
+    def should_be_correct_price_in_basket_total_message(
+            self,
+            product_price,
+            snapshot=None
+    ):
         """Assert the basket total matches the added product's price."""
-        basket_total = self.get_basket_total()
+        basket_total = self.get_basket_total(snapshot=snapshot)
         assert product_price == basket_total, (
             f"Expected basket total '{product_price}', "
             f"but got '{basket_total}'"
         )
+
+    def should_be_product_added_to_basket(
+            self,
+            product_name,
+            product_price,
+            timeout=None
+    ):
+        """
+        Assert both messages appear with the added product's name and
+        price, waiting for all of them in a single polling loop.
+
+        Fails as soon as a message shows another name or price.
+        """
+        name = ProductPageLocators.PRODUCT_NAME_IN_MESSAGE
+        total = ProductPageLocators.BASKET_TOTAL
+        try:
+            self.wait_until(
+                all_of(
+                    ProductPageLocators.PRODUCT_ADDED_MESSAGE,
+                    ProductPageLocators.BASKET_TOTAL_MESSAGE,
+                    has_text(name, product_name),
+                    has_text(total, product_price),
+                ),
+                timeout,
+                fail_on=any_of(
+                    all_of(name, none_of(has_text(name, product_name))),
+                    all_of(total, none_of(has_text(total, product_price))),
+                )
+            )
+        except (ConditionFailed, TimeoutException) as error:
+            raise AssertionError(
+                f"Product '{product_name}' for '{product_price}' is not "
+                f"shown as added to the basket: {error}"
+            ) from None
@@ -0,0 +1,55 @@
+"""
+Single-round-trip snapshots of several page elements.
+
+Reads the presence, the text, and the visibility of all the given
+locators in one execute_script call, so that a series of reads and
+checks does not need a WebDriver command per element.
+"""
+
+from collections import namedtuple
+
+from .dom_waits import FIND_ELEMENT_JS
+
+# Returns {name: {present, text, visible}} for the {name: [how, what]} map.
+# Like WebElement.text, the text of an invisible element is empty.
+SNAPSHOT_JS = FIND_ELEMENT_JS + """
+var locators = arguments[0], result = {};
+
+function isVisible(element) {
+    var style = window.getComputedStyle(element);
+    return style.visibility !== "hidden" && style.display !== "none"
+        && element.getClientRects().length > 0;
+}
+
+Object.keys(locators).forEach(function (name) {
+    var element = findElement(locators[name][0], locators[name][1]);
+    var visible = element !== null && isVisible(element);
+    result[name] = {
+        present: element !== null,
+        text: visible ? element.innerText.trim() : (element ? "" : null),
+        visible: visible
+    };
+});
+return result;
+"""
+
+# The state of a single element; the text is None if it is not present.
+ElementSnapshot = namedtuple("ElementSnapshot", ["present", "text", "visible"])
+
+
+def locators_of(locators_class):
+    """Return the {name: locator} map of a locators class."""
+    return {
+        name: value for name, value in vars(locators_class).items()
+        if not name.startswith("_") and isinstance(value, tuple)
+    }
+
+
+def take_snapshot(browser, locators):
+    """Return the {name: ElementSnapshot} map for the {name: locator} map."""
+    result = browser.execute_script(
+        SNAPSHOT_JS,
+        {name: list(locator) for name, locator in locators.items()}
+    )
+
+    return {name: ElementSnapshot(**result[name]) for name in locators}
@@ -0,0 +1,26 @@
+"""
+The infrastructure supporting the tests: browser management and plugins.
+
+Modules:
+    async_cdp: Defines AsyncBrowser, an asyncio DevTools client.
+    auth_state: Defines AuthStateStore that shares a logged-in user.
+    browser_pool: Defines BrowserPool that reuses browsers between tests.
+    browser_profiles: Defines BrowserProfile, the browser's performance
+        settings.
+    cdp: Defines CdpConnection, a DevTools client that receives events.
+    chrome_service: Defines SharedChromeService, one ChromeDriver for all
+        the browsers.
+    command_trace: Defines CommandTracer that times the WebDriver commands.
+    duration_schedule: Defines DurationStore that balances the tests
+        by their durations.
+    failure_artifacts: Defines FailureArtifacts that saves the state
+        of the failed tests' browsers.
+    http_cache: Defines HttpCache that records and replays responses.
+    http_driver: Defines HttpDriver that runs the no_js tests without
+        a browser.
+    local_store: Defines LocalStore, a local stand-in for the web store.
+    profile_template: Defines ProfileTemplate, a pre-warmed Chrome
+        profile.
+    store_api: Defines StoreApi that signs up users without the UI.
+    tab_scheduler: Defines TabScheduler that runs cases in browser tabs.
+"""
@@ -0,0 +1,201 @@
+"""
+Defines AsyncBrowser and AsyncTab: an asyncio DevTools client.
+
+Bridges the thread-based CdpConnection to asyncio: the commands are
+awaitable, and the browser's events (page loads, JavaScript dialogs)
+are delivered to the event loop, so many tabs can be driven at once
+from one thread without polling. Every tab gets its own isolated
+browsing context, so the cookies of the tabs do not mix.
+"""
+
+import asyncio
+import json
+
+from .cdp import CdpConnection, CdpError, COMMAND_TIMEOUT
+
+# Default time (in seconds) to wait for a page to load.
+PAGE_LOAD_TIMEOUT = 30
+
+
+class JavascriptError(CdpError):
+    """Raised when the evaluated script throws an exception."""
+
+
+class AsyncBrowser:
+    """The tabs of a Chrome browser driven from an event loop."""
+
+    def __init__(self, connection):
+        """Initialize the client over the browser's DevTools connection."""
+        self.connection = connection
+        self._tabs = {}
+        self._loop = None
+
+        for method in ("Page.loadEventFired", "Page.javascriptDialogOpening"):
+            connection.on(method, self._event_handler(method))
+
+    @classmethod
+    def to_browser(cls, browser):
+        """Connect to the browser driven by the Selenium WebDriver."""
+        return cls(CdpConnection.to_browser(browser))
+
+    async def send(
+            self,
+            method,
+            params=None,
+            session_id=None,
+            timeout=COMMAND_TIMEOUT
+    ):
+        """Send the command and return its result."""
+        future = self.connection.send_async(method, params, session_id)
+
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+    async def new_tab(self):
+        """Open a tab in a new isolated browsing context."""
+        self._loop = asyncio.get_running_loop()
+
+        context_id = (await self.send(
+            "Target.createBrowserContext"
+        ))["browserContextId"]
+        target_id = (await self.send(
+            "Target.createTarget",
+            {"url": "about:blank", "browserContextId": context_id}
+        ))["targetId"]
+        session_id = (await self.send(
+            "Target.attachToTarget", {"targetId": target_id, "flatten": True}
+        ))["sessionId"]
+
+        tab = AsyncTab(self, target_id, context_id, session_id)
+        self._tabs[session_id] = tab
+        await tab.send("Page.enable")
+
+        return tab
+
+    async def close_tab(self, tab):
+        """Close the tab and dispose of its browsing context."""
+        self._tabs.pop(tab.session_id, None)
+        await self.send("Target.closeTarget", {"targetId": tab.target_id})
+        await self.send(
+            "Target.disposeBrowserContext",
+            {"browserContextId": tab.context_id}
+        )
+
+    def close(self):
+        """
+        Close the open tabs and the DevTools connection.
+
+        Needs no event loop, e.g., for the fixtures' teardown.
+        """
+        for tab in self._tabs.values():
+            try:
+                self.connection.send(
+                    "Target.closeTarget", {"targetId": tab.target_id}
+                )
+                self.connection.send(
+                    "Target.disposeBrowserContext",
+                    {"browserContextId": tab.context_id}
+                )
+            except (CdpError, TimeoutError):
+                # The browser has already closed the tab.
+                pass
+        self._tabs.clear()
+        self.connection.close()
+
+    def _event_handler(self, method):
+        """Return the handler passing the event to its tab's event loop."""
+        def handle(params, session_id):
+            tab = self._tabs.get(session_id)
+            if tab is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(tab.on_event, method, params)
+
+        return handle
+
+
+class AsyncTab:
+    """A browser tab with awaitable navigation, scripts, and dialogs."""
+
+    def __init__(self, browser, target_id, context_id, session_id):
+        """Initialize the tab attached with the session."""
+        self.browser = browser
+        self.target_id = target_id
+        self.context_id = context_id
+        self.session_id = session_id
+        self._loaded = asyncio.Event()
+        self._dialogs = asyncio.Queue()
+
+    async def send(self, method, params=None, timeout=COMMAND_TIMEOUT):
+        """Send the command to the tab and return its result."""
+        return await self.browser.send(
+            method, params, self.session_id, timeout
+        )
+
+    async def navigate(self, url, timeout=PAGE_LOAD_TIMEOUT):
+        """Open the URL and wait for the page to load."""
+        self._loaded.clear()
+        result = await self.send("Page.navigate", {"url": url})
+        if result.get("errorText"):
+            raise CdpError(f"Cannot open {url}: {result['errorText']}")
+
+        await asyncio.wait_for(self._loaded.wait(), timeout)
+
+    async def evaluate(self, expression, timeout=COMMAND_TIMEOUT):
+        """
+        Return the JSON value of the expression.
+
+        If the expression is a promise, returns the value it resolves
+        with. Raises JavascriptError if the script throws.
+        """
+        result = await self.send("Runtime.evaluate", {
+            "expression": expression,
+            "awaitPromise": True,
+            "returnByValue": True,
+        }, timeout)
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            raise JavascriptError(
+                details.get("exception", {}).get("description")
+                or details.get("text", "Script error")
+            )
+
+        return result["result"].get("value")
+
+    async def call(self, script, *args, timeout=COMMAND_TIMEOUT):
+        """
+        Run an asynchronous WebDriver script and return its result.
+
+        The script receives the args in arguments and a callback to
+        call with the result last, as in execute_async_script().
+        The elements in the result are returned as True.
+        """
+        expression = (
+            "new Promise(function (done) {"
+            f"(function () {{{script}}}).apply(null, "
+            f"{json.dumps(list(args))}.concat([done]));"
+            "}).then(function (result) {"
+            "return result instanceof Node ? true : result; })"
+        )
+
+        return await self.evaluate(expression, timeout)
+
+    async def next_dialog(self, timeout=COMMAND_TIMEOUT):
+        """Return the message of the next JavaScript dialog opened."""
+        return await asyncio.wait_for(self._dialogs.get(), timeout)
+
+    async def handle_dialog(self, accept=True, prompt_text=None):
+        """Accept (with the prompt text) or dismiss the open dialog."""
+        params = {"accept": accept}
+        if prompt_text is not None:
+            params["promptText"] = prompt_text
+
+        await self.send("Page.handleJavaScriptDialog", params)
+
+    async def close(self):
+        """Close the tab and dispose of its browsing context."""
+        await self.browser.close_tab(self)
+
+    def on_event(self, method, params):
+        """Handle the tab's event in the event loop."""
+        if method == "Page.loadEventFired":
+            self._loaded.set()
+        elif method == "Page.javascriptDialogOpening":
+            self._dialogs.put_nowait(params["message"])
@@ -0,0 +1,155 @@
+"""
+Defines AuthStateStore: a logged-in user's state shared across tests.
+
+Instead of signing up a new user for every test, the user is signed up
+once per worker (or once per run) and the user's cookies and local
+storage are saved to a state file. The later tests restore that state
+into their browsers. The file is guarded by a lock, so it is safe to
+share between the pytest-xdist workers. A state expires after a TTL,
+and a stale state (the store no longer recognizes the session) is
+replaced with a fresh account.
+"""
+
+import json
+import time
+
+from filelock import FileLock
+
+from .browser_pool import add_script_to_new_documents
+from .store_api import inject_cookies
+
+# Default lifetime (in seconds) of a saved state.
+DEFAULT_TTL = 30 * 60
+
+# Returns {origin: {key: value}} with the local storage of the document.
+CAPTURE_LOCAL_STORAGE_JS = """
+var items = {};
+for (var i = 0; i < window.localStorage.length; i++) {
+    var key = window.localStorage.key(i);
+    items[key] = window.localStorage.getItem(key);
+}
+var result = {};
+result[window.location.origin] = items;
+return result;
+"""
+
+# Fills the local storage of the matching origin once per tab, before
+# the page's own scripts run. The {items} placeholder is a JSON object.
+RESTORE_LOCAL_STORAGE_JS = """
+(function (items) {
+    var origin = window.location.origin;
+    if (!items[origin] || window.sessionStorage.__authStateRestored) {
+        return;
+    }
+    Object.keys(items[origin]).forEach(function (key) {
+        window.localStorage.setItem(key, items[origin][key]);
+    });
+    window.sessionStorage.__authStateRestored = "1";
+})({items});
+"""
+
+
+def new_auth_state(email, cookies):
+    """Return the state of a just signed up user."""
+    return {
+        "created_at": time.time(),
+        "email": email,
+        "cookies": cookies,
+        "local_storage": {},
+    }
+
+
+def restore_auth_state(browser, state):
+    """Log the browser in with the saved cookies and local storage."""
+    inject_cookies(browser, state["cookies"])
+
+    if any(state["local_storage"].values()):
+        add_script_to_new_documents(
+            browser,
+            RESTORE_LOCAL_STORAGE_JS.replace(
+                "{items}", json.dumps(state["local_storage"])
+            )
+        )
+
+
+def capture_local_storage(browser):
+    """Return the local storage of the page opened in the browser."""
+    return browser.execute_script(CAPTURE_LOCAL_STORAGE_JS)
+
+
+class AuthStateStore:
+    """A state file with a logged-in user shared by the tests."""
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        """Initialize the store; the lock file is placed next to it."""
+        self.path = path
+        self.ttl = ttl
+        self._lock = FileLock(f"{path}.lock")
+        # States checked against the web store in this process.
+        self._validated = set()
+
+    def load_or_create(self, create):
+        """
+        Return the saved state, or a new one if it is missing or expired.
+
+        The create callable signs up a new user and returns its state.
+        """
+        with self._lock:
+            state = self._read()
+            if state is None or self.is_expired(state):
+                state = create()
+                self._write(state)
+
+        return state
+
+    def replace(self, stale_state, create):
+        """
+        Replace the stale state with a new one.
+
+        If another worker has already replaced it, returns that state.
+        """
+        with self._lock:
+            state = self._read()
+            if (
+                    state is None
+                    or state["created_at"] == stale_state["created_at"]
+                    or self.is_expired(state)
+            ):
+                state = create()
+                self._write(state)
+
+        return state
+
+    def is_validated(self, state):
+        """Return True if the state was checked in this process."""
+        return state["created_at"] in self._validated
+
+    def mark_validated(self, state, local_storage):
+        """Remember the checked state and save its local storage."""
+        self._validated.add(state["created_at"])
+
+        with self._lock:
+            saved_state = self._read()
+            if (
+                    saved_state is not None
+                    and saved_state["created_at"] == state["created_at"]
+            ):
+                saved_state["local_storage"].update(local_storage)
+                self._write(saved_state)
+
+    def is_expired(self, state):
+        """Return True if the state is older than the TTL."""
+        return time.time() - state["created_at"] > self.ttl
+
+    def _read(self):
+        """Return the saved state or None if there is none."""
+        try:
+            with open(self.path, encoding="utf-8") as state_file:
+                return json.load(state_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write(self, state):
+        """Save the state to the file."""
+        with open(self.path, "w", encoding="utf-8") as state_file:
+            json.dump(state, state_file)
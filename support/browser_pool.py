@@ -0,0 +1,228 @@
+"""
+Defines BrowserPool: a pool of warm browsers leased to the tests.
+
+Starting Chrome and ChromeDriver is the most expensive step of a test.
+The pool keeps the started browsers and resets their state between the
+tests instead of quitting them. A browser is recycled after a number of
+uses or when it cannot be reset (e.g., after a crash). With the warm-up
+on, the pool starts the next browser in a background thread while the
+tests use the current one, so a recycled browser is replaced at once.
+"""
+
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import (
+    NoAlertPresentException,
+    WebDriverException,
+)
+
+# Default number of tests served by a browser before it is recycled.
+DEFAULT_MAX_USES = 20
+
+# Clear the web storage of the current document's origin (in the
+# browsers without the DevTools commands), and its session storage.
+CLEAR_STORAGE_SCRIPT = """
+try { window.localStorage.clear(); } catch (e) {}
+try { window.sessionStorage.clear(); } catch (e) {}
+"""
+CLEAR_SESSION_STORAGE_SCRIPT = """
+try { window.sessionStorage.clear(); } catch (e) {}
+"""
+
+# The storage types cleared through DevTools for every visited origin.
+CLEARED_STORAGE_TYPES = ",".join((
+    "local_storage",
+    "indexeddb",
+    "websql",
+    "cache_storage",
+    "service_workers",
+    "file_systems",
+))
+
+# The identifiers of the scripts added to the new documents of a browser.
+_new_document_scripts = weakref.WeakKeyDictionary()
+
+
+def add_script_to_new_documents(browser, source):
+    """
+    Run the script in every new document before the page's own scripts.
+
+    The script stays installed until the browser is reset.
+    """
+    identifier = browser.execute_cdp_cmd(
+        "Page.addScriptToEvaluateOnNewDocument", {"source": source}
+    )["identifier"]
+    _new_document_scripts.setdefault(browser, []).append(identifier)
+
+    return identifier
+
+
+def dismiss_alert(browser):
+    """Dismiss the alert open in the browser's current tab, if any."""
+    try:
+        browser.switch_to.alert.dismiss()
+    except NoAlertPresentException:
+        pass
+
+
+def visited_origins(browser):
+    """Return the HTTP(S) origins in the current tab's history."""
+    history = browser.execute_cdp_cmd("Page.getNavigationHistory", {})
+    origins = set()
+    for entry in history["entries"]:
+        parts = urlsplit(entry["url"])
+        if parts.scheme in ("http", "https"):
+            origins.add(f"{parts.scheme}://{parts.netloc}")
+
+    return origins
+
+
+class BrowserPool:
+    """Lease warm browsers to the tests and reset them afterwards."""
+
+    def __init__(self, factory, max_uses=DEFAULT_MAX_USES, warm_up=False):
+        """
+        Initialize the pool.
+
+        The factory is a callable without arguments that starts
+        a new browser. With warm_up, a spare browser is started in the
+        background whenever no idle browser is left.
+        """
+        self.factory = factory
+        self.max_uses = max_uses
+        self._idle = []
+        self._uses = {}
+        self._spare = None
+        self._executor = (
+            ThreadPoolExecutor(1, thread_name_prefix="browser-warm-up")
+            if warm_up else None
+        )
+        # The new browsers that were ready in time and the ones the test
+        # waited for, and the startup time (in seconds) the warm-up saved.
+        self.warm_up_hits = 0
+        self.warm_up_misses = 0
+        self.startup_time_saved = 0.0
+
+    def acquire(self):
+        """Return an idle browser or start a new one if there is none."""
+        browser = self._idle.pop() if self._idle else self._new_browser()
+        self._uses[browser] = self._uses.get(browser, 0) + 1
+
+        if self._executor is not None and not self._idle and not self._spare:
+            self._spare = self._executor.submit(self._timed_factory)
+
+        return browser
+
+    def release(self, browser):
+        """Reset the browser and return it to the pool or recycle it."""
+        if self._uses[browser] >= self.max_uses or not self.reset(browser):
+            self.discard(browser)
+        else:
+            self._idle.append(browser)
+
+    def discard(self, browser):
+        """Quit the browser and forget about it."""
+        self._uses.pop(browser, None)
+        try:
+            browser.quit()
+        except WebDriverException:
+            # The browser has already crashed; nothing to clean up.
+            pass
+
+    def close(self):
+        """Quit all the idle browsers and the spare one."""
+        while self._idle:
+            self.discard(self._idle.pop())
+
+        if self._executor is not None:
+            spare, self._spare = self._spare, None
+            if spare is not None and spare.exception() is None:
+                self.discard(spare.result()[0])
+            self._executor.shutdown()
+
+    def _new_browser(self):
+        """Return the spare browser, or start one if there is no spare."""
+        spare, self._spare = self._spare, None
+        if spare is None:
+            if self._executor is not None:
+                self.warm_up_misses += 1
+            return self.factory()
+
+        ready = spare.done()
+        waiting_started = time.perf_counter()
+        if spare.exception() is not None:
+            self.warm_up_misses += 1
+            return self.factory()
+        browser, startup_time = spare.result()
+        waiting_time = time.perf_counter() - waiting_started
+
+        if ready:
+            self.warm_up_hits += 1
+        else:
+            self.warm_up_misses += 1
+        self.startup_time_saved += max(startup_time - waiting_time, 0)
+
+        return browser
+
+    def _timed_factory(self):
+        """Start a browser; return it and its startup time (in seconds)."""
+        started = time.perf_counter()
+        browser = self.factory()
+
+        return browser, time.perf_counter() - started
+
+    @staticmethod
+    def reset(browser):
+        """
+        Bring the browser back to a clean state.
+
+        Dismisses the open alerts (a command would fail while one is
+        open), closes the extra tabs, removes the scripts added to the
+        new documents, clears the cookies of all the domains and the
+        storage of all the origins the tabs have visited, and opens
+        a blank page. The session storage is cleared for the current
+        document only: DevTools cannot reach it for the others.
+        Returns False if the browser does not respond.
+        """
+        try:
+            dismiss_alert(browser)
+            with_cdp = hasattr(browser, "execute_cdp_cmd")
+            origins = set()
+
+            handles = browser.window_handles
+            for handle in handles[1:]:
+                browser.switch_to.window(handle)
+                dismiss_alert(browser)
+                if with_cdp:
+                    origins |= visited_origins(browser)
+                browser.close()
+            browser.switch_to.window(handles[0])
+            dismiss_alert(browser)
+
+            for identifier in _new_document_scripts.pop(browser, []):
+                browser.execute_cdp_cmd(
+                    "Page.removeScriptToEvaluateOnNewDocument",
+                    {"identifier": identifier}
+                )
+
+            if with_cdp:
+                browser.execute_script(CLEAR_SESSION_STORAGE_SCRIPT)
+                for origin in sorted(origins | visited_origins(browser)):
+                    browser.execute_cdp_cmd("Storage.clearDataForOrigin", {
+                        "origin": origin,
+                        "storageTypes": CLEARED_STORAGE_TYPES,
+                    })
+                # Unlike delete_all_cookies(), clears all the domains.
+                browser.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            else:
+                browser.execute_script(CLEAR_STORAGE_SCRIPT)
+                browser.delete_all_cookies()
+
+            browser.get("about:blank")
+        except WebDriverException:
+            return False
+
+        return True
@@ -0,0 +1,89 @@
+"""
+Defines BrowserProfile: the named sets of browser performance settings.
+
+The tests only check the text of the pages, so they do not need the
+images, web fonts, and analytics scripts, nor do they need to wait for
+them to load. The "fast" profile runs a headless browser with the eager
+page load strategy (the pages are ready once their DOM is), blocks
+those resources, and turns off Chrome's background services.
+The "default" profile keeps the browser as it is.
+"""
+
+from collections import namedtuple
+
+# The name of the profile used when none is chosen.
+DEFAULT_PROFILE = "default"
+
+# The URL patterns of the resources the tests do not need.
+UNNEEDED_RESOURCES = (
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+)
+
+# The Chrome arguments turning off the background services.
+NO_BACKGROUND_SERVICES = (
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-extensions",
+    "--disable-sync",
+    "--metrics-recording-only",
+    "--no-first-run",
+)
+
+BrowserProfile = namedtuple(
+    "BrowserProfile",
+    ("name", "headless", "page_load_strategy", "blocked_urls", "arguments")
+)
+
+PROFILES = {
+    profile.name: profile
+    for profile in (
+        BrowserProfile(DEFAULT_PROFILE, False, "normal", (), ()),
+        BrowserProfile(
+            "fast", True, "eager", UNNEEDED_RESOURCES, NO_BACKGROUND_SERVICES
+        ),
+    )
+}
+
+
+def apply_profile_options(profile, options):
+    """Set the profile's launch settings on the Chrome options."""
+    options.page_load_strategy = profile.page_load_strategy
+    if profile.headless:
+        options.add_argument("--headless=new")
+    for argument in profile.arguments:
+        options.add_argument(argument)
+
+
+def apply_profile_blocking(profile, browser):
+    """
+    Block the profile's unneeded resources in the browser's tab.
+
+    The blocking survives the browser reset, which keeps the first tab.
+    """
+    if not profile.blocked_urls:
+        return
+
+    browser.execute_cdp_cmd("Network.enable", {})
+    browser.execute_cdp_cmd(
+        "Network.setBlockedURLs", {"urls": list(profile.blocked_urls)}
+    )
+
+
+def describe_profile(profile):
+    """Return a one-line summary of the profile for the reports."""
+    settings = [
+        "headless" if profile.headless else "headed",
+        f"{profile.page_load_strategy} page load",
+    ]
+    if profile.blocked_urls:
+        settings.append(f"{len(profile.blocked_urls)} blocked URL patterns")
+    if profile.arguments:
+        settings.append("background services off")
+
+    return f"{profile.name} ({', '.join(settings)})"
@@ -0,0 +1,150 @@
+"""
+Defines CdpConnection: a Chrome DevTools Protocol client with events.
+
+Selenium's execute_cdp_cmd() can send commands but cannot receive
+events. The features that react to the browser's events (e.g., the
+Fetch.requestPaused event of the HTTP cache) connect to the DevTools
+websocket of the browser started by ChromeDriver directly.
+"""
+
+import itertools
+import json
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from urllib.request import urlopen
+
+import websocket
+
+logger = logging.getLogger(__name__)
+
+# Default time (in seconds) to wait for the result of a command.
+COMMAND_TIMEOUT = 10
+
+
+def browser_websocket_url(browser):
+    """Return the DevTools websocket URL of the Chrome browser."""
+    address = browser.capabilities["goog:chromeOptions"]["debuggerAddress"]
+    with urlopen(
+            f"http://{address}/json/version", timeout=COMMAND_TIMEOUT
+    ) as response:
+        return json.load(response)["webSocketDebuggerUrl"]
+
+
+class CdpError(Exception):
+    """Raised when the browser returns an error for a command."""
+
+
+class CdpConnection:
+    """A DevTools websocket connection to the browser target."""
+
+    def __init__(self, websocket_url):
+        """
+        Connect to the websocket and start the background threads.
+
+        One thread reads the messages, another one runs the event
+        handlers, so that the handlers can send commands themselves.
+        """
+        self._socket = websocket.create_connection(
+            websocket_url, suppress_origin=True, enable_multithread=True
+        )
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._handlers = {}
+        self._events = queue.Queue()
+
+        threading.Thread(target=self._read, daemon=True).start()
+        threading.Thread(target=self._dispatch, daemon=True).start()
+
+    @classmethod
+    def to_browser(cls, browser):
+        """Connect to the browser driven by the Selenium WebDriver."""
+        return cls(browser_websocket_url(browser))
+
+    def on(self, method, handler):
+        """
+        Call the handler for every event with the method name.
+
+        The handler receives the event's params and session ID.
+        """
+        self._handlers.setdefault(method, []).append(handler)
+
+    def send_async(self, method, params=None, session_id=None):
+        """Send the command and return a Future of its result."""
+        message_id = next(self._ids)
+        future = Future()
+        self._pending[message_id] = future
+
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id is not None:
+            message["sessionId"] = session_id
+
+        try:
+            self._socket.send(json.dumps(message))
+        except (websocket.WebSocketException, OSError) as error:
+            self._pending.pop(message_id, None)
+            future.set_exception(CdpError(str(error)))
+
+        return future
+
+    def send(
+            self,
+            method,
+            params=None,
+            session_id=None,
+            timeout=COMMAND_TIMEOUT
+    ):
+        """Send the command and return its result."""
+        return self.send_async(method, params, session_id).result(timeout)
+
+    def close(self):
+        """Close the websocket; the background threads stop."""
+        self._socket.close()
+
+    def _read(self):
+        """Resolve the results of the commands and queue the events."""
+        while True:
+            try:
+                message = json.loads(self._socket.recv())
+            except (websocket.WebSocketException, OSError, ValueError):
+                break
+
+            if "id" not in message:
+                self._events.put(message)
+                continue
+
+            future = self._pending.pop(message["id"], None)
+            if future is None:
+                continue
+            if "error" in message:
+                future.set_exception(CdpError(message["error"]["message"]))
+            else:
+                future.set_result(message.get("result", {}))
+
+        for future in list(self._pending.values()):
+            future.set_exception(CdpError("DevTools connection is closed"))
+        self._pending.clear()
+        self._events.put(None)
+
+    def _dispatch(self):
+        """Run the handlers of the queued events in order."""
+        while True:
+            message = self._events.get()
+            if message is None:
+                return
+
+            for handler in self._handlers.get(message["method"], ()):
+                try:
+                    handler(
+                        message.get("params", {}), message.get("sessionId")
+                    )
+                except (CdpError, TimeoutError):
+                    # The target has gone away (e.g., its tab was closed).
+                    pass
+                except Exception:
+                    # A failing handler must not stop the events of the
+                    # others (e.g., the paused requests would hang).
+                    logger.exception(
+                        "DevTools handler of %s failed", message["method"]
+                    )
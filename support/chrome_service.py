@@ -0,0 +1,94 @@
+"""
+Defines SharedChromeService: one ChromeDriver process for all sessions.
+
+webdriver.Chrome starts a ChromeDriver process of its own for every
+browser. The shared service starts ChromeDriver once (per pytest-xdist
+worker), and every browser opens a session of it, so only Chrome
+itself is started for a new browser.
+"""
+
+import threading
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chromium.remote_connection import (
+    ChromiumRemoteConnection,
+)
+from selenium.webdriver.common.desired_capabilities import (
+    DesiredCapabilities,
+)
+from selenium.webdriver.common.driver_finder import DriverFinder
+from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
+
+
+class SharedServiceChrome(webdriver.Chrome):
+    """A Chrome browser driven through the shared ChromeDriver service."""
+
+    def __init__(self, service, options):
+        """Open a session of the running service with the options."""
+        self.service = service
+        self.options = options
+
+        RemoteWebDriver.__init__(
+            self,
+            command_executor=ChromiumRemoteConnection(
+                remote_server_addr=service.service_url,
+                vendor_prefix="goog",
+                browser_name=DesiredCapabilities.CHROME["browserName"],
+            ),
+            options=options
+        )
+
+    def quit(self):
+        """Close the browser; the shared service keeps running."""
+        RemoteWebDriver.quit(self)
+
+
+class SharedChromeService:
+    """A long-lived ChromeDriver process shared by the browsers."""
+
+    def __init__(self):
+        """Initialize the service; it is started by the first browser."""
+        self._service = Service()
+        self._browser_path = None
+        self._located = False
+        self._running = False
+        self._lock = threading.Lock()
+
+    def new_browser(self, options):
+        """
+        Return a new browser with the options.
+
+        Starts ChromeDriver if it is not running (e.g., after a failed
+        session stopped it). Safe to call from several threads.
+        """
+        with self._lock:
+            if not self._running or self._service.process.poll() is not None:
+                self._start()
+
+        if self._browser_path:
+            options.binary_location = self._browser_path
+            options.browser_version = None
+
+        return SharedServiceChrome(self._service, options)
+
+    def stop(self):
+        """Stop ChromeDriver."""
+        with self._lock:
+            if self._running:
+                self._service.stop()
+                self._running = False
+
+    def _start(self):
+        """Locate ChromeDriver (and Chrome, if managed) and start it."""
+        if not self._located:
+            finder = DriverFinder(self._service, Options())
+            self._browser_path = finder.get_browser_path()
+            self._service.path = (
+                self._service.env_path() or finder.get_driver_path()
+            )
+            self._located = True
+
+        self._service.start()
+        self._running = True
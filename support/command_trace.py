@@ -0,0 +1,245 @@
+"""
+Defines CommandTracer: a per-command latency trace of the WebDriver.
+
+Every command the browser sends to ChromeDriver (including the ones of
+its elements and alerts) is timed and attributed to the page-object
+method that issued it, e.g., ProductPage.add_product_to_basket, and to
+the locator it looks for. The tracer wraps the execute() method of the
+browser instance, so the page objects need no changes, and it only
+appends a record to a list per command. Each test's trace is written
+to a JSON-lines file, and the traces of all the tests (including the
+ones of the pytest-xdist workers) are summarized at the end of the run.
+A test is traced in the thread that runs it, so the test cases running
+at once in the tabs of one browser (see support/tab_scheduler.py) get
+traces of their own.
+The page objects' element cache lookups (see pages/element_cache.py)
+are traced as records of their own, so the summary shows the round
+trips the cache has saved.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import defaultdict
+
+from selenium.webdriver.common.by import By
+
+# Default directory of the trace files.
+DEFAULT_TRACE_DIR = "command_traces"
+
+# The name given to the commands issued outside the page objects
+# (e.g., by the fixtures).
+OUTSIDE_PAGE_OBJECTS = "<outside page objects>"
+
+# The "command" of the element cache lookup records.
+ELEMENT_CACHE_LOOKUP = "elementCacheLookup"
+
+# The module prefix of the page objects.
+PAGE_OBJECTS_PACKAGE = "pages."
+
+# The locator strategies, for finding the locators in the script args.
+LOCATOR_STRATEGIES = {
+    value for name, value in vars(By).items() if name.isupper()
+}
+
+
+def trace_path(directory, test_id):
+    """Return the path of the trace file of the test."""
+    return os.path.join(
+        directory, re.sub(r"[^\w.-]+", "_", test_id).strip("_") + ".jsonl"
+    )
+
+
+def _issuer_of_command():
+    """
+    Return the outermost page-object method on the call stack.
+
+    That is the method the test (or fixture) has called, e.g.,
+    ProductPage.add_product_to_basket rather than the BasePage helper
+    it uses.
+    """
+    issuer = OUTSIDE_PAGE_OBJECTS
+    frame = sys._getframe(2)
+    while frame is not None:
+        if (
+                frame.f_globals.get("__name__", "").startswith(
+                    PAGE_OBJECTS_PACKAGE
+                )
+                and "self" in frame.f_locals
+        ):
+            issuer = frame.f_code.co_qualname
+        frame = frame.f_back
+
+    return issuer
+
+
+def _locator_of_command(params):
+    """Return the "how=what" locator the command looks for, if any."""
+    if not params:
+        return None
+
+    if params.get("using") in LOCATOR_STRATEGIES:
+        return f"{params['using']}={params['value']}"
+
+    args = params.get("args") or ()
+    for how, what in zip(args, args[1:]):
+        if how in LOCATOR_STRATEGIES and isinstance(what, str):
+            return f"{how}={what}"
+
+    return None
+
+
+class CommandTracer:
+    """Time the browsers' commands and write a trace per test."""
+
+    def __init__(self, directory=DEFAULT_TRACE_DIR):
+        """Initialize the tracer writing to the directory."""
+        self.directory = directory
+        self._local = threading.local()
+        self._instrumented = weakref.WeakSet()
+        os.makedirs(directory, exist_ok=True)
+
+    def instrument(self, browser):
+        """Wrap the browser's execute() method; repeated calls are no-ops."""
+        if browser in self._instrumented:
+            return
+        self._instrumented.add(browser)
+
+        execute = browser.execute
+
+        def traced_execute(driver_command, params=None):
+            records = getattr(self._local, "records", None)
+            if records is None:
+                return execute(driver_command, params)
+
+            started = time.perf_counter()
+            error = None
+            try:
+                return execute(driver_command, params)
+            except Exception as exception:
+                error = type(exception).__name__
+                raise
+            finally:
+                records.append({
+                    "command": driver_command,
+                    "duration": time.perf_counter() - started,
+                    "method": _issuer_of_command(),
+                    "locator": _locator_of_command(params),
+                    "error": error,
+                })
+
+        browser.execute = traced_execute
+
+    def record_cache_lookup(self, outcome, locator):
+        """
+        Trace an element cache lookup: "hits", "misses", or "stale".
+
+        Listens to the page objects' ElementCacheStats.
+        """
+        records = getattr(self._local, "records", None)
+        if records is None:
+            return
+
+        records.append({
+            "command": ELEMENT_CACHE_LOOKUP,
+            "duration": 0.0,
+            "method": _issuer_of_command(),
+            "locator": f"{locator[0]}={locator[1]}" if locator else None,
+            "error": None,
+            "cache": outcome,
+        })
+
+    def start_test(self):
+        """Start recording the commands of a test in this thread."""
+        self._local.records = []
+
+    def finish_test(self, test_id):
+        """Stop recording and write the test's trace file."""
+        records = getattr(self._local, "records", None)
+        self._local.records = None
+        if not records:
+            return
+
+        with open(
+                trace_path(self.directory, test_id), "w", encoding="utf-8"
+        ) as trace_file:
+            for record in records:
+                trace_file.write(json.dumps(record) + "\n")
+
+
+def clear_traces(directory):
+    """Remove the trace files of a previous run."""
+    if not os.path.isdir(directory):
+        return
+
+    for name in os.listdir(directory):
+        if name.endswith(".jsonl"):
+            os.remove(os.path.join(directory, name))
+
+
+def summarize_traces(directory, limit=10):
+    """
+    Return the report lines on the slowest page-object methods and
+    locators of all the trace files in the directory, and on their
+    element cache lookups.
+    """
+    by_method = defaultdict(list)
+    by_locator = defaultdict(list)
+    cache_lookups = defaultdict(int)
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".jsonl"):
+                continue
+            with open(
+                    os.path.join(directory, name), encoding="utf-8"
+            ) as trace_file:
+                for line in trace_file:
+                    record = json.loads(line)
+                    if record["command"] == ELEMENT_CACHE_LOOKUP:
+                        cache_lookups[record["cache"]] += 1
+                        continue
+                    by_method[record["method"]].append(record["duration"])
+                    if record["locator"]:
+                        by_locator[record["locator"]].append(
+                            record["duration"]
+                        )
+
+    if not by_method and not cache_lookups:
+        return []
+
+    lines = []
+    for title, durations in (
+            ("page-object method", by_method),
+            ("locator", by_locator),
+    ):
+        lines.append(
+            f"{'total, s':>9} {'commands':>8} {'max, ms':>8}  "
+            f"slowest by {title}"
+        )
+        slowest = sorted(
+            durations.items(), key=lambda item: sum(item[1]), reverse=True
+        )
+        for name, times in slowest[:limit]:
+            lines.append(
+                f"{sum(times):9.3f} {len(times):8d} "
+                f"{max(times) * 1000:8.1f}  {name}"
+            )
+        lines.append("")
+
+    lookups = sum(cache_lookups.values())
+    if lookups:
+        lines.append(
+            f"element cache: {cache_lookups['hits']} hits, "
+            f"{cache_lookups['misses']} misses, "
+            f"{cache_lookups['stale']} stale "
+            f"({cache_lookups['hits'] / lookups:.0%} hit rate, "
+            f"{cache_lookups['hits'] - cache_lookups['stale']} "
+            f"round trips saved)"
+        )
+        lines.append("")
+
+    return lines[:-1]
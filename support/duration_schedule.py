@@ -0,0 +1,216 @@
+"""
+Defines DurationStore and the duration-aware ordering of the tests.
+
+Keeps the duration of every test (its setup, call, and teardown) from
+the earlier runs in a JSON file. The tests are split into groups: the
+tests sharing an expensive fixture (e.g., the logged-in user of a test
+class) form one group, so that they run on one worker; every other test
+is a group of its own. The groups are ordered longest first, so the
+pytest-xdist workers, each taking the next group once it is free,
+follow the longest-processing-time-first schedule. The CI shards are
+balanced the same way: every group goes to the least loaded shard.
+
+The durations are keyed by the tests' node IDs without the parts that
+change between the runs (see duration_key()).
+"""
+
+import argparse
+import heapq
+import json
+import statistics
+
+from filelock import FileLock
+
+# Default path of the durations file.
+DEFAULT_DURATIONS_FILE = ".test_durations.json"
+
+# The fixtures worth sharing between the tests of one node (e.g., the
+# logged-in user of a test class): such tests are grouped together.
+SHARED_FIXTURES = ("authorized_user",)
+
+# The weight of the latest run in a test's saved duration.
+SMOOTHING = 0.5
+
+# Duration (in seconds) assumed for the tests when there is no history.
+DEFAULT_DURATION = 1.0
+
+# Replaces the local store's URL (its port changes) in the saved keys.
+LOCAL_STORE_URL = "local-store/"
+
+
+def parse_shard(value):
+    """Return (index, count) of the "i/N" shard, with 1 <= i <= N."""
+    try:
+        index, count = (int(number) for number in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected i/N (e.g., 1/4), got {value!r}"
+        ) from None
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(
+            f"shard index must be within 1 and {count}, got {index}"
+        )
+
+    return index, count
+
+
+def duration_key(nodeid, local_store_url=None):
+    """
+    Return the key of the test's saved duration.
+
+    Drops the group suffix pytest-xdist adds to the node IDs of the
+    xdist_group tests ("...::test@group"), and replaces the URL of the
+    local store in the parametrized IDs with LOCAL_STORE_URL.
+    """
+    if nodeid.rfind("@") > nodeid.rfind("]"):
+        nodeid = nodeid.rpartition("@")[0]
+    if local_store_url:
+        nodeid = nodeid.replace(local_store_url, LOCAL_STORE_URL)
+
+    return nodeid
+
+
+def group_key(item):
+    """
+    Return the key of the test's group.
+
+    The tests with a shared fixture are grouped by their parent node
+    (the class or the module); every other test is a group of its own.
+    """
+    if set(SHARED_FIXTURES) & set(item.fixturenames):
+        return item.parent.nodeid
+
+    return item.nodeid
+
+
+class DurationStore:
+    """The durations of the tests measured in the earlier runs."""
+
+    def __init__(self, path=DEFAULT_DURATIONS_FILE, local_store_url=None):
+        """
+        Load the saved durations; the lock file is placed next to it.
+
+        local_store_url is the URL of the local store the tests run
+        against, if any (see duration_key()).
+        """
+        self.path = path
+        self.local_store_url = local_store_url
+        self._lock = FileLock(f"{path}.lock")
+        self._measured = {}
+        self._skipped = set()
+        with self._lock:
+            self.durations = self._read()
+
+    def estimate(self, item):
+        """
+        Return the expected duration of the test.
+
+        A test with no history is expected to take the median duration
+        of the known tests.
+        """
+        duration = self.durations.get(self.key(item.nodeid))
+        if duration is not None:
+            return duration
+        if self.durations:
+            return statistics.median(self.durations.values())
+
+        return DEFAULT_DURATION
+
+    def key(self, nodeid):
+        """Return the key of the test's saved duration."""
+        return duration_key(nodeid, self.local_store_url)
+
+    def groups(self, items):
+        """Return [(expected duration, [items])] of the tests' groups."""
+        groups = {}
+        for item in items:
+            groups.setdefault(group_key(item), []).append(item)
+
+        return [
+            (sum(self.estimate(item) for item in grouped), grouped)
+            for grouped in groups.values()
+        ]
+
+    def order(self, items):
+        """Return the tests with their groups ordered longest first."""
+        groups = sorted(
+            self.groups(items), key=lambda group: group[0], reverse=True
+        )
+
+        return [item for _, grouped in groups for item in grouped]
+
+    def shard(self, items, index, count):
+        """
+        Return the tests of the shard (1-based) and the other tests.
+
+        Every group, longest first, goes to the least loaded shard.
+        The tests keep their collection order.
+        """
+        shards = [(0.0, number, []) for number in range(1, count + 1)]
+        for duration, grouped in sorted(
+                self.groups(items), key=lambda group: group[0], reverse=True
+        ):
+            load, number, assigned = heapq.heappop(shards)
+            assigned.extend(grouped)
+            heapq.heappush(shards, (load + duration, number, assigned))
+
+        assigned = next(shard[2] for shard in shards if shard[1] == index)
+        selected = set(map(id, assigned))
+
+        return (
+            [item for item in items if id(item) in selected],
+            [item for item in items if id(item) not in selected],
+        )
+
+    def record(self, nodeid, duration, skipped=False):
+        """Add the duration of a test phase; skipped tests are not saved."""
+        nodeid = self.key(nodeid)
+        if skipped:
+            self._skipped.add(nodeid)
+        self._measured[nodeid] = self._measured.get(nodeid, 0) + duration
+
+    def save(self):
+        """Merge the measured durations into the file."""
+        measured = {
+            nodeid: duration
+            for nodeid, duration in self._measured.items()
+            if nodeid not in self._skipped
+        }
+        if not measured:
+            return
+
+        with self._lock:
+            durations = self._read()
+            for nodeid, duration in measured.items():
+                previous = durations.get(nodeid)
+                durations[nodeid] = round(
+                    duration if previous is None
+                    else previous + (duration - previous) * SMOOTHING,
+                    3
+                )
+            with open(self.path, "w", encoding="utf-8") as file:
+                json.dump(durations, file, indent=2, sort_keys=True)
+
+    def _read(self):
+        """Return the saved durations, or {} if there are none."""
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+
+class DurationRecorder:
+    """The pytest plugin that saves the durations of the tests run."""
+
+    def __init__(self, store):
+        """Initialize the plugin saving the durations to the store."""
+        self.store = store
+
+    def pytest_runtest_logreport(self, report):
+        """Add the duration of the test phase."""
+        self.store.record(report.nodeid, report.duration, report.skipped)
+
+    def pytest_sessionfinish(self):
+        """Save the durations of the run."""
+        self.store.save()
@@ -0,0 +1,222 @@
+"""
+Defines FailureArtifacts: the state of the browser of a failed test.
+
+When a test fails, its browser's screenshot, DOM, console log, and the
+latest WebDriver commands are saved to a directory per test. The
+passing tests pay only for a cheap record of their latest commands.
+The browser is queried right away, before it is reset, but the decoding,
+compression, and disk writes run in a background thread pool, so
+the teardown is not blocked. Once the total size exceeds the limit,
+the artifacts of the oldest runs are deleted, then the oldest tests'
+artifacts of the current run.
+"""
+
+import base64
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium.common.exceptions import WebDriverException
+
+# Default directory of the artifacts and its size limit (in megabytes).
+DEFAULT_ARTIFACTS_DIR = "artifacts"
+DEFAULT_MAX_SIZE_MB = 200
+
+# The number of the latest commands kept per browser.
+HISTORY_SIZE = 50
+
+# The length the commands' parameters are cut to in the history.
+MAX_PARAMS_LENGTH = 200
+
+# The number of the threads writing the artifacts.
+WRITER_THREADS = 2
+
+
+def _directory_size(path):
+    """Return the total size (in bytes) of the files in the directory."""
+    size = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.path.getsize(os.path.join(directory, name))
+            except OSError:
+                # Removed by another worker's cleanup meanwhile.
+                pass
+
+    return size
+
+
+def _command_record(started, duration, command, params, error):
+    """Return the JSON record of a command in the history."""
+    if params:
+        params = json.dumps(params, default=str)[:MAX_PARAMS_LENGTH]
+
+    return {
+        "started": started,
+        "duration": duration,
+        "command": command,
+        "params": params or None,
+        "error": error,
+    }
+
+
+class FailureArtifacts:
+    """Save the artifacts of the failed tests of a run."""
+
+    def __init__(self, directory, run_id, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        """
+        Initialize the artifacts of the run.
+
+        They are saved to directory/run_id/<test ID>/.
+        """
+        self.directory = directory
+        self.run_directory = os.path.join(directory, run_id)
+        self.max_size = max_size_mb * 1024 * 1024
+        self._histories = weakref.WeakKeyDictionary()
+        self._executor = ThreadPoolExecutor(
+            WRITER_THREADS, thread_name_prefix="artifacts"
+        )
+        self._cleanup_lock = threading.Lock()
+
+    def instrument(self, browser):
+        """
+        Record the browser's latest commands from now on.
+
+        Repeated calls only forget the commands recorded so far.
+        """
+        if browser in self._histories:
+            self._histories[browser].clear()
+            return
+        history = self._histories[browser] = deque(maxlen=HISTORY_SIZE)
+
+        execute = browser.execute
+
+        def recorded_execute(driver_command, params=None):
+            started = time.time()
+            error = None
+            try:
+                return execute(driver_command, params)
+            except Exception as exception:
+                error = f"{type(exception).__name__}: {exception}".strip()
+                raise
+            finally:
+                history.append((
+                    started, time.time() - started, driver_command,
+                    params, error
+                ))
+
+        browser.execute = recorded_execute
+
+    def capture(self, browser, test_id):
+        """
+        Query the state of the browser and save it in the background.
+
+        Returns the directory of the test's artifacts.
+        """
+        commands = list(self._histories.get(browser, ()))
+        captured = {}
+        for name, query in (
+                ("screenshot", browser.get_screenshot_as_base64),
+                ("url", lambda: browser.current_url),
+                ("dom", lambda: browser.page_source),
+                ("console", lambda: browser.get_log("browser")),
+        ):
+            try:
+                captured[name] = query()
+            except WebDriverException as exception:
+                # E.g., the browser has crashed or an alert is open.
+                captured[name] = None
+                captured.setdefault("errors", {})[name] = exception.msg
+
+        test_directory = os.path.join(
+            self.run_directory,
+            re.sub(r"[^\w.-]+", "_", test_id).strip("_")
+        )
+        self._executor.submit(
+            self._write, test_directory, test_id, captured, commands
+        )
+
+        return test_directory
+
+    def close(self):
+        """Wait for the pending writes."""
+        self._executor.shutdown()
+
+    def _write(self, test_directory, test_id, captured, commands):
+        """Write the captured state of the test, then enforce the limit."""
+        os.makedirs(test_directory, exist_ok=True)
+
+        if captured["screenshot"] is not None:
+            with open(
+                    os.path.join(test_directory, "screenshot.png"), "wb"
+            ) as file:
+                file.write(base64.b64decode(captured["screenshot"]))
+
+        if captured["dom"] is not None:
+            with gzip.open(
+                    os.path.join(test_directory, "dom.html.gz"), "wt",
+                    encoding="utf-8"
+            ) as file:
+                file.write(captured["dom"])
+
+        with gzip.open(
+                os.path.join(test_directory, "log.json.gz"), "wt",
+                encoding="utf-8"
+        ) as file:
+            json.dump({
+                "test": test_id,
+                "url": captured["url"],
+                "console": captured["console"],
+                "commands": [
+                    _command_record(*command) for command in commands
+                ],
+                "errors": captured.get("errors", {}),
+            }, file, indent=2)
+
+        self._enforce_size_limit(test_directory)
+
+    def _enforce_size_limit(self, latest):
+        """
+        Delete the oldest artifacts while over the size limit: the other
+        runs' first, then the current run's tests, except the latest.
+        """
+        with self._cleanup_lock:
+            size = _directory_size(self.directory)
+            for path in self._oldest_first(self.directory):
+                if size <= self.max_size:
+                    return
+                if path == self.run_directory:
+                    continue
+                removed = _directory_size(path)
+                shutil.rmtree(path, ignore_errors=True)
+                size -= removed
+
+            for path in self._oldest_first(self.run_directory):
+                if size <= self.max_size:
+                    return
+                if path == latest:
+                    continue
+                removed = _directory_size(path)
+                shutil.rmtree(path, ignore_errors=True)
+                size -= removed
+
+    @staticmethod
+    def _oldest_first(directory):
+        """Return the paths of the subdirectories, the oldest first."""
+        entries = []
+        for entry in os.scandir(directory):
+            try:
+                if entry.is_dir():
+                    entries.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                # Removed by another worker's cleanup meanwhile.
+                pass
+
+        return [path for _, path in sorted(entries)]
@@ -0,0 +1,316 @@
+"""
+Record-and-replay HTTP cache for the page loads based on CDP Fetch.
+
+In the record mode, the responses to the cacheable GET requests (the
+store's static CSS, JS, images, and fonts by default) are saved to an
+on-disk content-addressed store. In the replay mode, the cached
+responses are served to the browser locally, while everything else,
+including the dynamic POSTs such as adding to the basket and signing
+up, goes to the web store. The pages themselves are not cached by
+default, because they carry the per-session state (messages, basket,
+logged-in user).
+
+The store is bounded in size: the least recently used entries are
+evicted first. It is safe to share between the pytest-xdist workers.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import warnings
+
+from filelock import FileLock
+
+from .cdp import CdpConnection, CdpError
+
+# The cache modes.
+OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+
+# Default cache directory and size limit (in megabytes).
+DEFAULT_CACHE_DIR = ".http_cache"
+DEFAULT_MAX_SIZE_MB = 200
+
+# The (URL regex, is cacheable) rules; the first matching rule wins,
+# and the URLs that match no rule are not cached.
+DEFAULT_CACHE_RULES = (
+    (r"/(basket|accounts)/", False),
+    (r"/static/", True),
+    (r"\.(css|js|png|jpe?g|gif|svg|ico|woff2?|ttf|eot)(\?|$)", True),
+)
+
+# Time (in seconds) to wait for the interception in the first tab; if
+# the tab is not attached by then, the browser starts without waiting.
+FIRST_PAGE_TIMEOUT = 2
+
+# The resource types intercepted; the documents and the XHR/fetch calls
+# (e.g., the POST requests) go to the web store untouched.
+INTERCEPTED_RESOURCE_TYPES = ("Stylesheet", "Script", "Image", "Font")
+
+# The response headers that do not apply to the decoded body.
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class HttpCacheStore:
+    """A size-bounded content-addressed store of HTTP responses."""
+
+    def __init__(self, directory, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        """Open the store, creating the directory if needed."""
+        self.directory = directory
+        self.max_size = max_size_mb * 1024 * 1024
+        self._blobs_dir = os.path.join(directory, "blobs")
+        self._index_path = os.path.join(directory, "index.json")
+        self._file_lock = FileLock(os.path.join(directory, "index.lock"))
+        self._lock = threading.Lock()
+
+        os.makedirs(self._blobs_dir, exist_ok=True)
+        with self._file_lock:
+            self._index = self._read_index()
+
+    def get(self, url):
+        """Return (status, headers, body) of the cached URL or None."""
+        with self._lock:
+            entry = self._index.get(url)
+            if entry is None:
+                return None
+            entry["last_used"] = time.time()
+
+        try:
+            with open(self._blob_path(entry["digest"]), "rb") as blob:
+                body = blob.read()
+        except FileNotFoundError:
+            # Another worker has evicted the entry.
+            return None
+
+        return entry["status"], entry["headers"], body
+
+    def put(self, url, status, headers, body):
+        """Save the response; identical bodies are stored once."""
+        digest = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            temporary_path = f"{blob_path}.{os.getpid()}.tmp"
+            with open(temporary_path, "wb") as blob:
+                blob.write(body)
+            os.replace(temporary_path, blob_path)
+
+        with self._lock:
+            self._index[url] = {
+                "status": status,
+                "headers": headers,
+                "digest": digest,
+                "size": len(body),
+                "last_used": time.time(),
+            }
+
+    def flush(self):
+        """Merge the index with the saved one, evict, and save it."""
+        with self._file_lock, self._lock:
+            index = self._read_index()
+            for url, entry in self._index.items():
+                saved_entry = index.get(url)
+                if (
+                        saved_entry is None
+                        or saved_entry["last_used"] < entry["last_used"]
+                ):
+                    index[url] = entry
+
+            self._evict(index)
+
+            with open(self._index_path, "w", encoding="utf-8") as file:
+                json.dump(index, file)
+            self._index = index
+
+    def _evict(self, index):
+        """Remove the least recently used entries beyond the size limit."""
+        sizes = {entry["digest"]: entry["size"] for entry in index.values()}
+        total_size = sum(sizes.values())
+
+        by_last_use = sorted(index, key=lambda url: index[url]["last_used"])
+        for url in by_last_use:
+            if total_size <= self.max_size:
+                break
+
+            digest = index.pop(url)["digest"]
+            if all(entry["digest"] != digest for entry in index.values()):
+                total_size -= sizes[digest]
+                try:
+                    os.remove(self._blob_path(digest))
+                except FileNotFoundError:
+                    pass
+
+    def _read_index(self):
+        """Return the saved index or an empty one."""
+        try:
+            with open(self._index_path, encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _blob_path(self, digest):
+        """Return the path of the blob with the digest."""
+        return os.path.join(self._blobs_dir, digest)
+
+
+class HttpCache:
+    """The cache mode, rules, and store shared by the browsers."""
+
+    def __init__(self, store, mode, rules=DEFAULT_CACHE_RULES):
+        """Initialize the cache; rules are (URL regex, is cacheable)."""
+        self.store = store
+        self.mode = mode
+        self.rules = [(re.compile(pattern), flag) for pattern, flag in rules]
+
+    def is_cacheable(self, method, url):
+        """Return True if the request's response may be cached."""
+        if method != "GET":
+            return False
+
+        for pattern, is_cacheable in self.rules:
+            if pattern.search(url):
+                return is_cacheable
+
+        return False
+
+    def attach(self, browser):
+        """
+        Start intercepting the requests of the Chrome browser.
+
+        The interception stops once the browser quits.
+        """
+        interceptor = FetchInterceptor(browser, self)
+        interceptor.start()
+
+        quit_browser = browser.quit
+
+        def stop_and_quit():
+            try:
+                interceptor.stop()
+            finally:
+                quit_browser()
+
+        browser.quit = stop_and_quit
+
+        return interceptor
+
+
+class FetchInterceptor:
+    """Record or replay the responses of a browser via CDP Fetch."""
+
+    def __init__(self, browser, cache):
+        """Initialize the interceptor of the browser's requests."""
+        self.browser = browser
+        self.cache = cache
+        self._cdp = None
+        self._first_page_ready = threading.Event()
+
+    def start(self):
+        """
+        Enable the interception in all the tabs, existing and new ones.
+
+        The new tabs wait for the debugger, so no request escapes.
+        """
+        self._cdp = CdpConnection.to_browser(self.browser)
+        self._cdp.on("Target.attachedToTarget", self._on_attached)
+        self._cdp.on("Fetch.requestPaused", self._on_request_paused)
+        self._cdp.send("Target.setAutoAttach", {
+            "autoAttach": True,
+            "waitForDebuggerOnStart": True,
+            "flatten": True,
+        })
+        if not self._first_page_ready.wait(FIRST_PAGE_TIMEOUT):
+            warnings.warn(
+                "HTTP cache: the first tab was not intercepted within "
+                f"{FIRST_PAGE_TIMEOUT} s; its first requests may bypass "
+                "the cache",
+                RuntimeWarning
+            )
+
+    def stop(self):
+        """
+        Close the DevTools connection; its background threads stop.
+
+        The browser keeps the tabs' requests going without Fetch.
+        """
+        if self._cdp is not None:
+            self._cdp.close()
+
+    def _on_attached(self, params, _):
+        """Enable the Fetch domain in a new page target."""
+        session_id = params["sessionId"]
+        if params["targetInfo"]["type"] == "page":
+            stage = "Response" if self.cache.mode == RECORD else "Request"
+            self._cdp.send("Fetch.enable", {"patterns": [
+                {"resourceType": resource_type, "requestStage": stage}
+                for resource_type in INTERCEPTED_RESOURCE_TYPES
+            ]}, session_id)
+            self._first_page_ready.set()
+
+        self._cdp.send_async(
+            "Runtime.runIfWaitingForDebugger", session_id=session_id
+        )
+
+    def _on_request_paused(self, params, session_id):
+        """Serve, save, or pass through the paused request."""
+        request = params["request"]
+        request_id = params["requestId"]
+
+        if self.cache.is_cacheable(request["method"], request["url"]):
+            if "responseStatusCode" in params:
+                self._record(params, session_id)
+            elif self._replay(params, session_id):
+                return
+
+        self._cdp.send_async(
+            "Fetch.continueRequest", {"requestId": request_id}, session_id
+        )
+
+    def _record(self, params, session_id):
+        """Save a successful response to the store."""
+        if params["responseStatusCode"] != 200:
+            return
+
+        try:
+            result = self._cdp.send(
+                "Fetch.getResponseBody",
+                {"requestId": params["requestId"]},
+                session_id
+            )
+        except CdpError:
+            # E.g., a redirect or a response without a body.
+            return
+
+        body = result["body"]
+        body = (
+            base64.b64decode(body) if result["base64Encoded"]
+            else body.encode()
+        )
+        headers = [
+            header for header in params.get("responseHeaders", [])
+            if header["name"].lower() not in DROPPED_HEADERS
+        ]
+        self.cache.store.put(
+            params["request"]["url"], params["responseStatusCode"],
+            headers, body
+        )
+
+    def _replay(self, params, session_id):
+        """Fulfill the request from the store; return False on a miss."""
+        cached = self.cache.store.get(params["request"]["url"])
+        if cached is None:
+            return False
+
+        status, headers, body = cached
+        self._cdp.send_async("Fetch.fulfillRequest", {
+            "requestId": params["requestId"],
+            "responseCode": status,
+            "responseHeaders": headers,
+            "body": base64.b64encode(body).decode(),
+        }, session_id)
+
+        return True
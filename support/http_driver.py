@@ -0,0 +1,473 @@
+"""
+Defines HttpDriver: a browserless stand-in for the JavaScript-free tests.
+
+Many checks only inspect the HTML the server renders (e.g., the presence
+of the login link or of the empty basket message), so they do not need
+a browser. HttpDriver fetches the pages over a pooled HTTP session that
+keeps the cookies, parses them with lxml, and finds the elements with
+the locator strategies the page objects use (the CSS selectors are
+translated to XPath by cssselect). Clicking a link follows its href,
+and clicking a submit button sends its form (lxml's form values) with
+the values typed into the inputs.
+The page objects work with it unchanged; its documents never change,
+so the waits check them once (see static_document in
+pages/dom_waits.py).
+
+The tests that need JavaScript or rendering get a clear
+JavaScriptUnavailable error and have to run in a browser.
+"""
+
+import functools
+import re
+from urllib.parse import urlencode, urljoin, urlsplit, urlunsplit
+
+import lxml.html
+import requests
+from cssselect import HTMLTranslator, SelectorError
+from lxml.etree import XPathError
+from requests.adapters import HTTPAdapter
+from selenium.common.exceptions import (
+    InvalidSelectorException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    WebDriverException,
+)
+from selenium.webdriver.common.by import By
+
+from .store_api import POOL_SIZE, REQUEST_TIMEOUT
+
+# The elements whose content is not rendered as the page's text.
+NON_RENDERED_TAGS = frozenset((
+    "head", "noscript", "script", "style", "template", "title",
+))
+
+# The elements that start a new line of the text.
+BLOCK_TAGS = frozenset((
+    "address", "article", "aside", "blockquote", "br", "dd", "details",
+    "div", "dl", "dt", "fieldset", "figcaption", "figure", "footer",
+    "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li",
+    "main", "nav", "ol", "p", "pre", "section", "table", "tr", "ul",
+))
+
+# The input types that are not typed into.
+NON_TEXT_INPUT_TYPES = (
+    "button", "checkbox", "file", "hidden", "image", "radio", "reset",
+    "submit",
+)
+
+# The characters of the special keys (e.g., Keys.ENTER), not typed.
+SPECIAL_KEYS_PATTERN = re.compile("[\ue000-\uf8ff]")
+
+# Hides an element through its inline style.
+HIDDEN_STYLE_PATTERN = re.compile(
+    r"(?:display\s*:\s*none|visibility\s*:\s*hidden)", re.IGNORECASE
+)
+
+# The locator strategies sent as CSS selectors, as WebDriver does.
+CSS_LOCATORS = {
+    By.ID: '[id="{}"]',
+    By.NAME: '[name="{}"]',
+    By.CLASS_NAME: ".{}",
+    By.TAG_NAME: "{}",
+    By.CSS_SELECTOR: "{}",
+}
+
+
+class JavaScriptUnavailable(WebDriverException):
+    """Raised when a test on the HTTP driver needs a real browser."""
+
+
+def parse_html(html):
+    """Return the tree of the parsed HTML document."""
+    return lxml.html.document_fromstring(
+        html if html.strip() else "<html></html>"
+    ).getroottree()
+
+
+@functools.lru_cache(maxsize=None)
+def _css_to_xpath(selector):
+    """Return the XPath of the scope's descendants matching the CSS."""
+    return HTMLTranslator().css_to_xpath(selector, prefix="descendant::")
+
+
+def find_nodes(scope, by, value):
+    """
+    Return the scope's descendant elements located by (by, value).
+
+    The scope is the document's tree or one of its elements.
+    """
+    if by in CSS_LOCATORS:
+        by, value = By.XPATH, CSS_LOCATORS[by].format(value)
+        try:
+            value = _css_to_xpath(value)
+        except SelectorError as error:
+            raise InvalidSelectorException(
+                f"Invalid CSS selector {value!r}: {error}"
+            ) from error
+
+    if by == By.XPATH:
+        try:
+            nodes = scope.xpath(value)
+        except XPathError as error:
+            raise InvalidSelectorException(
+                f"Invalid XPath {value!r}: {error}"
+            ) from error
+        return [
+            node for node in nodes
+            if isinstance(node, lxml.html.HtmlElement)
+        ]
+
+    links = scope.xpath("descendant::a")
+    if by == By.LINK_TEXT:
+        return [link for link in links if _text(link) == value]
+    if by == By.PARTIAL_LINK_TEXT:
+        return [link for link in links if value in _text(link)]
+
+    raise InvalidSelectorException(
+        f"Locator strategy {by!r} is not supported by HttpDriver"
+    )
+
+
+def _text(node):
+    """Return the rendered text of the element, as WebElement.text does."""
+    parts = []
+
+    def collect(current):
+        parts.append(current.text or "")
+        for child in current:
+            # The comments are skipped, but not the text after them.
+            if isinstance(child.tag, str) and (
+                    child.tag not in NON_RENDERED_TAGS
+            ):
+                block = "\n" if child.tag in BLOCK_TAGS else ""
+                parts.append(block)
+                collect(child)
+                parts.append(block)
+            parts.append(child.tail or "")
+
+    collect(node)
+    lines = (" ".join(line.split()) for line in "".join(parts).split("\n"))
+
+    return "\n".join(line for line in lines if line)
+
+
+def _is_displayed(node):
+    """Return False if the element is hidden by its markup."""
+    if node.tag == "input" and node.get("type") == "hidden":
+        return False
+    while node is not None:
+        if (
+                node.tag in NON_RENDERED_TAGS
+                or node.get("hidden") is not None
+                or HIDDEN_STYLE_PATTERN.search(node.get("style", ""))
+        ):
+            return False
+        node = node.getparent()
+
+    return True
+
+
+def _is_submit_button(node):
+    """Return True if clicking the element submits its form."""
+    if node.tag == "button":
+        return node.get("type", "submit").lower() == "submit"
+
+    return node.tag == "input" and (
+        node.get("type", "").lower() in ("image", "submit")
+    )
+
+
+def _is_text_field(node):
+    """Return True if the element accepts typed text."""
+    return node.tag == "textarea" or node.tag == "input" and (
+        node.get("type", "text").lower() not in NON_TEXT_INPUT_TYPES
+    )
+
+
+class HttpElement:
+    """
+    An element of a page fetched by HttpDriver.
+
+    Like a browser's element, it goes stale once another page loads.
+    """
+
+    def __init__(self, driver, node):
+        """Initialize the element of the driver's current page."""
+        self._driver = driver
+        self._node = node
+        self._document = driver._document
+
+    def __eq__(self, other):
+        """Return True if both refer to the same element."""
+        return isinstance(other, HttpElement) and other._node is self._node
+
+    def __hash__(self):
+        """Return the hash of the element's node."""
+        return id(self._node)
+
+    @property
+    def _live_node(self):
+        """Return the node, or raise if its page is no longer loaded."""
+        if self._driver._document is not self._document:
+            raise StaleElementReferenceException(
+                "The element's page is no longer loaded"
+            )
+
+        return self._node
+
+    @property
+    def tag_name(self):
+        """Return the element's tag name."""
+        return self._live_node.tag
+
+    @property
+    def text(self):
+        """Return the element's rendered text."""
+        node = self._live_node
+
+        return _text(node) if _is_displayed(node) else ""
+
+    def get_attribute(self, name):
+        """Return the value of the element's attribute, or None."""
+        node = self._live_node
+        if name == "value" and _is_text_field(node):
+            return node.value
+
+        return node.get(name)
+
+    get_dom_attribute = get_attribute
+
+    def is_displayed(self):
+        """Return False if the element is hidden by its markup."""
+        return _is_displayed(self._live_node)
+
+    def is_enabled(self):
+        """Return False if the element is disabled."""
+        return self._live_node.get("disabled") is None
+
+    def find_element(self, by=By.ID, value=None):
+        """Return the first descendant element located by (by, value)."""
+        return self._driver._first(self._live_node, by, value)
+
+    def find_elements(self, by=By.ID, value=None):
+        """Return the descendant elements located by (by, value)."""
+        return self._driver._all(self._live_node, by, value)
+
+    def click(self):
+        """
+        Follow the link or submit the form of the submit button;
+        other elements need a browser.
+        """
+        node = self._live_node
+        href = node.get("href")
+        if node.tag == "a" and href is not None:
+            self._driver._navigate(
+                "GET", urljoin(self._driver.current_url, href)
+            )
+            return
+
+        form = next(node.iterancestors("form"), None)
+        if form is None or not _is_submit_button(node):
+            raise JavaScriptUnavailable(
+                f"Clicking <{node.tag}> needs a browser"
+            )
+
+        self._driver._submit(form, node)
+
+    def send_keys(self, *value):
+        """Type the text into the input; the special keys are ignored."""
+        node = self._live_node
+        if not _is_text_field(node):
+            raise JavaScriptUnavailable(
+                f"Typing into <{node.tag}> needs a browser"
+            )
+
+        node.value = (node.value or "") + SPECIAL_KEYS_PATTERN.sub(
+            "", "".join(map(str, value))
+        )
+
+    def clear(self):
+        """Clear the text of the input."""
+        node = self._live_node
+        if _is_text_field(node):
+            node.value = ""
+
+
+class HttpDriver:
+    """
+    The browser as seen by the page objects, without the browser.
+
+    Fetches the pages with a pooled HTTP session and keeps the cookies
+    until reset().
+    """
+
+    # The waits check the element once (see pages/dom_waits.py).
+    static_document = True
+
+    # document_id: the number of the documents loaded, which identifies
+    # the current one (see pages/element_cache.py).
+
+    def __init__(self, user_language, timeout=REQUEST_TIMEOUT):
+        """Initialize the pooled HTTP session for the given locale."""
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept-Language"] = user_language
+        self.document_id = 0
+        self._load("about:blank", "")
+
+    def get(self, url):
+        """Load the page, following the redirects."""
+        self._navigate("GET", url, referer=False)
+
+    def refresh(self):
+        """Load the current page again."""
+        self.get(self._url)
+
+    @property
+    def current_url(self):
+        """Return the URL of the page after the redirects."""
+        return self._url
+
+    @property
+    def page_source(self):
+        """Return the HTML of the page as the server sent it."""
+        return self._html
+
+    @property
+    def title(self):
+        """Return the title of the page."""
+        title = self._document.find(".//title")
+        if title is None:
+            return ""
+
+        return " ".join(title.text_content().split())
+
+    def find_element(self, by=By.ID, value=None):
+        """Return the first element located by (by, value)."""
+        return self._first(self._document, by, value)
+
+    def find_elements(self, by=By.ID, value=None):
+        """Return the elements located by (by, value)."""
+        return self._all(self._document, by, value)
+
+    def get_cookies(self):
+        """Return the cookies of the session as WebDriver cookie dicts."""
+        return [
+            {
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "secure": cookie.secure,
+            }
+            for cookie in self.session.cookies
+        ]
+
+    def get_cookie(self, name):
+        """Return the cookie with the name, or None."""
+        return next(
+            (
+                cookie for cookie in self.get_cookies()
+                if cookie["name"] == name
+            ),
+            None
+        )
+
+    def add_cookie(self, cookie):
+        """Add the WebDriver cookie dict to the session."""
+        self.session.cookies.set(
+            cookie["name"], cookie["value"],
+            domain=cookie.get("domain", ""),
+            path=cookie.get("path", "/"),
+            secure=cookie.get("secure", False)
+        )
+
+    def delete_all_cookies(self):
+        """Delete the cookies of the session."""
+        self.session.cookies.clear()
+
+    def execute_script(self, script, *args):
+        """Scripts need a browser."""
+        raise JavaScriptUnavailable("Running scripts needs a browser")
+
+    execute_async_script = execute_script
+
+    def get_screenshot_as_base64(self):
+        """Screenshots need a browser."""
+        raise JavaScriptUnavailable("Screenshots need a browser")
+
+    def get_log(self, log_type):
+        """Browser logs need a browser."""
+        raise JavaScriptUnavailable("Browser logs need a browser")
+
+    def reset(self):
+        """Forget the cookies and the page, keeping the connections."""
+        self.delete_all_cookies()
+        self._load("about:blank", "")
+
+    def quit(self):
+        """Close the pooled connections."""
+        self.session.close()
+
+    def _navigate(self, method, url, data=None, referer=True):
+        """
+        Load the response to the request, following the redirects.
+
+        Like a browser, sends the current page as the referer of
+        the clicks and the forms.
+        """
+        headers = {}
+        if referer and self._url.startswith("http"):
+            headers["Referer"] = self._url
+
+        response = self.session.request(
+            method, url, data=data, headers=headers, timeout=self.timeout
+        )
+        self._load(response.url, response.text)
+
+    def _load(self, url, html):
+        """Make the page the current document; it gets a new ID."""
+        self._url = url
+        self._html = html
+        self._document = parse_html(html)
+        self.document_id += 1
+
+    def _submit(self, form, submitter):
+        """Send the form as submitted by the submit button."""
+        method = submitter.get("formmethod", form.get("method", "get"))
+        action = urljoin(
+            self._url, submitter.get("formaction", form.get("action", ""))
+        )
+        data = form.form_values()
+        if submitter.get("name"):
+            data.append((submitter.get("name"), submitter.get("value", "")))
+
+        if method.lower() == "post":
+            self._navigate("POST", action, data)
+        else:
+            self._navigate(
+                "GET",
+                urlunsplit(urlsplit(action)._replace(query=urlencode(data)))
+            )
+
+    def _all(self, scope, by, value):
+        """Return the scope's elements located by (by, value)."""
+        return [
+            HttpElement(self, node) for node in find_nodes(scope, by, value)
+        ]
+
+    def _first(self, scope, by, value):
+        """Return the scope's first element located by (by, value)."""
+        elements = self._all(scope, by, value)
+        if not elements:
+            raise NoSuchElementException(
+                f"Unable to locate element: {{\"method\": \"{by}\", "
+                f"\"selector\": \"{value}\"}}"
+            )
+
+        return elements[0]
@@ -0,0 +1,469 @@
+"""
+Defines LocalStore: a local stand-in for the demo web store.
+
+Serves the main, product, login and sign-up, and basket pages with the
+markup matching the selectors in pages/locators.py, including the quiz
+prompt of the ?promo=offerN product pages and the known bug of offer 7.
+Makes it possible to run the whole suite on localhost without network
+access (e.g., in CI) and to benchmark the framework itself.
+"""
+
+import html
+import re
+import secrets
+import threading
+from decimal import Decimal
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# The only product sold by the stand-in store.
+PRODUCT_ID = 207
+PRODUCT_NAME = "Coders at Work"
+PRODUCT_PRICE = Decimal("19.99")
+
+# The promo offer that adds a product with a wrong name (a known bug).
+BUGGY_PROMO_OFFER = "offer7"
+
+# Matches the language prefix of a path, e.g., /en-gb/basket/.
+LANGUAGE_PREFIX_PATTERN = re.compile(r"^/([a-z]{2}(?:-[a-z]{2})?)(/.*)$")
+
+# The language prefixes used for the --language values that differ.
+LANGUAGE_PREFIXES = {"en": "en-gb"}
+
+# The cookies used by the store (the same as on the real one).
+CSRF_COOKIE = "csrftoken"
+SESSION_COOKIE = "sessionid"
+BASKET_COOKIE = "oscar_open_basket"
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="{language}">
+<head>
+<meta charset="utf-8">
+<title>{title} | Oscar - Sandbox</title>
+</head>
+<body>
+<header class="header">
+<ul class="nav">{account_links}</ul>
+<div class="basket-mini">
+<a class="btn btn-default" href="{prefix}basket/">View basket</a>
+</div>
+</header>
+<div id="messages">{messages}</div>
+<div id="content_inner">{content}</div>
+{scripts}
+</body>
+</html>
+"""
+
+GUEST_LINKS = """
+<li><a id="login_link" href="{prefix}accounts/login/">Login or register</a>
+</li>
+"""
+
+USER_LINKS = """
+<li><a href="{prefix}accounts/"><i class="icon-user"></i> Account</a></li>
+<li><a id="logout_link" href="{prefix}accounts/logout/">Logout</a></li>
+"""
+
+MAIN_CONTENT = """
+<h2>Welcome!</h2>
+<a href="{prefix}catalogue/coders-at-work_207/">Coders at Work</a>
+"""
+
+PRODUCT_CONTENT = """
+<article class="product_page">
+<div class="product_main">
+<h1>{name}</h1>
+<p class="price_color">{price}</p>
+<form id="add_to_basket_form" method="post"
+      action="{prefix}basket/add/{product_id}/{query}">
+<input type="hidden" name="csrfmiddlewaretoken" value="{csrf_token}">
+<button type="submit" class="btn btn-lg btn-primary btn-add-to-basket">
+Add to basket
+</button>
+</form>
+</div>
+</article>
+"""
+
+# Asks the quiz question of the promo offers before adding the product.
+QUIZ_SCRIPT = """
+<script>
+document.getElementById("add_to_basket_form").addEventListener(
+    "submit",
+    function () {
+        var x = (Math.random() * 1000).toFixed(3);
+        window.prompt("x = " + x);
+    }
+);
+</script>
+"""
+
+PRODUCT_ADDED_MESSAGES = """
+<div class="alert alert-safe alert-noicon alert-success fade in">
+<div class="alertinner"><strong>{name}</strong> has been added to your basket.
+</div>
+</div>
+<div class="alert alert-safe alert-noicon alert-info fade in">
+<div class="alertinner">
+<p>Your basket total is now <strong>{total}</strong></p>
+</div>
+</div>
+"""
+
+EMPTY_BASKET_CONTENT = """
+<p>Your basket is empty. <a href="{prefix}">Continue shopping</a></p>
+"""
+
+BASKET_CONTENT = """
+<div class="basket-items">{items}</div>
+"""
+
+BASKET_ITEM = """
+<div class="row"><h3>{name}</h3><div class="price_color">{price}</div></div>
+"""
+
+LOGIN_CONTENT = """
+<div class="row">
+<form id="login_form" action="{prefix}accounts/login/" method="post">
+<input type="hidden" name="csrfmiddlewaretoken" value="{csrf_token}">
+<h2>Log In</h2>
+<input type="email" name="login-username" id="id_login-username">
+<input type="password" name="login-password" id="id_login-password">
+<button name="login_submit" type="submit" value="Log In">Log In</button>
+</form>
+<form id="register_form" action="{prefix}accounts/login/" method="post">
+<input type="hidden" name="csrfmiddlewaretoken" value="{csrf_token}">
+<h2>Register</h2>
+{error}
+<input type="email" name="registration-email" id="id_registration-email">
+<input type="password" name="registration-password1"
+       id="id_registration-password1">
+<input type="password" name="registration-password2"
+       id="id_registration-password2">
+<button name="registration_submit" type="submit" value="Register">
+Register
+</button>
+</form>
+</div>
+"""
+
+ACCOUNT_CONTENT = """
+<h1>Profile</h1>
+<p>{email}</p>
+"""
+
+
+def format_price(amount):
+    """Format the amount the way the store does."""
+    return f"£{amount:.2f}"
+
+
+class LocalStore:
+    """A local stand-in web store served from a background thread."""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        """Bind the server; port 0 picks a free port."""
+        self._server = ThreadingHTTPServer((host, port), StoreRequestHandler)
+        self._server.store = self
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self.lock = threading.Lock()
+        # {email: password}
+        self.users = {}
+        # {session ID: email}
+        self.sessions = {}
+        # {basket key: [product name]}; users' baskets are kept by email.
+        self.baskets = {}
+        # {basket key: [HTML]} with the messages shown on the next page.
+        self.messages = {}
+
+    @property
+    def base_url(self):
+        """Return the URL of the store's main page."""
+        host, port = self._server.server_address[:2]
+
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        """Start serving the requests in the background."""
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+        """Stop the server and close its socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class StoreRequestHandler(BaseHTTPRequestHandler):
+    """Serve the pages of the stand-in store."""
+
+    # Keep-alive connections, as with the real store.
+    protocol_version = "HTTP/1.1"
+
+    # The headers and the body are separate writes: with Nagle's
+    # algorithm, every keep-alive response would wait for a delayed ACK.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        """Keep the test output clean."""
+
+    def do_GET(self):
+        """Handle a GET request."""
+        self._dispatch("GET")
+
+    def do_POST(self):
+        """Handle a POST request."""
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        """Route the request to the handler of the page."""
+        url = urlsplit(self.path)
+        self.store = self.server.store
+        self.cookies = SimpleCookie(self.headers.get("Cookie", ""))
+        self.new_cookies = {}
+
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode() if length else ""
+        self.form = {
+            name: values[0] for name, values in parse_qs(body).items()
+        }
+
+        match = LANGUAGE_PREFIX_PATTERN.match(url.path)
+        if match is None:
+            # Like Django's i18n_patterns, add the preferred language.
+            query = f"?{url.query}" if url.query else ""
+            self._redirect(f"/{self._preferred_language()}{url.path}{query}")
+            return
+
+        self.language, path = match.groups()
+        self.prefix = f"/{self.language}/"
+        self.query = url.query
+        handler = {
+            ("GET", "/"): self._main_page,
+            ("GET", "/catalogue/coders-at-work_207/"): self._product_page,
+            ("POST", f"/basket/add/{PRODUCT_ID}/"): self._add_to_basket,
+            ("GET", "/basket/"): self._basket_page,
+            ("GET", "/accounts/login/"): self._login_page,
+            ("POST", "/accounts/login/"): self._log_in_or_sign_up,
+            ("GET", "/accounts/logout/"): self._log_out,
+            ("GET", "/accounts/"): self._account_page,
+        }.get((method, path))
+
+        if handler is None:
+            self._send(404, "<h1>Not found</h1>")
+            return
+
+        if method == "POST" and not self._is_csrf_token_valid():
+            self._send(403, "<h1>CSRF verification failed</h1>")
+            return
+
+        handler()
+
+    def _main_page(self):
+        """Render the main page."""
+        self._render("Home", MAIN_CONTENT.format(prefix=self.prefix))
+
+    def _product_page(self):
+        """Render the product page; the promo offers ask the quiz."""
+        promo = parse_qs(self.query).get("promo")
+        content = PRODUCT_CONTENT.format(
+            prefix=self.prefix,
+            name=PRODUCT_NAME,
+            price=format_price(PRODUCT_PRICE),
+            product_id=PRODUCT_ID,
+            query=f"?{self.query}" if self.query else "",
+            csrf_token=self._csrf_token()
+        )
+        self._render(
+            PRODUCT_NAME, content, scripts=QUIZ_SCRIPT if promo else ""
+        )
+
+    def _add_to_basket(self):
+        """Add the product to the basket and go back to the product."""
+        promo = parse_qs(self.query).get("promo", [""])[0]
+        name = PRODUCT_NAME
+        if promo == BUGGY_PROMO_OFFER:
+            name = PRODUCT_NAME.upper()
+
+        key = self._basket_key(create=True)
+        with self.store.lock:
+            basket = self.store.baskets.setdefault(key, [])
+            basket.append(name)
+            total = format_price(PRODUCT_PRICE * len(basket))
+            self.store.messages.setdefault(key, []).append(
+                PRODUCT_ADDED_MESSAGES.format(
+                    name=html.escape(name), total=total
+                )
+            )
+
+        query = f"?{self.query}" if self.query else ""
+        self._redirect(f"{self.prefix}catalogue/coders-at-work_207/{query}")
+
+    def _basket_page(self):
+        """Render the basket page."""
+        key = self._basket_key()
+        with self.store.lock:
+            items = list(self.store.baskets.get(key, []))
+
+        if items:
+            content = BASKET_CONTENT.format(items="".join(
+                BASKET_ITEM.format(
+                    name=html.escape(name), price=format_price(PRODUCT_PRICE)
+                )
+                for name in items
+            ))
+        else:
+            content = EMPTY_BASKET_CONTENT.format(prefix=self.prefix)
+
+        self._render("Basket", content)
+
+    def _login_page(self, error=""):
+        """Render the login and sign-up page."""
+        self._render("Login or register", LOGIN_CONTENT.format(
+            prefix=self.prefix, csrf_token=self._csrf_token(), error=error
+        ))
+
+    def _log_in_or_sign_up(self):
+        """Handle the submitted login or sign-up form."""
+        if "registration_submit" in self.form:
+            email = self.form.get("registration-email", "")
+            password = self.form.get("registration-password1", "")
+            with self.store.lock:
+                error = None
+                if not email or email in self.store.users:
+                    error = "A user with this email address already exists"
+                elif (
+                        not password
+                        or password != self.form.get("registration-password2")
+                ):
+                    error = "The two password fields didn't match"
+                else:
+                    self.store.users[email] = password
+        else:
+            email = self.form.get("login-username", "")
+            password = self.form.get("login-password", "")
+            with self.store.lock:
+                error = None
+                if self.store.users.get(email) != password or not password:
+                    error = "Please enter a correct username and password"
+
+        if error is not None:
+            self._login_page(
+                error=f'<div class="alert alert-danger">{error}</div>'
+            )
+            return
+
+        session_id = secrets.token_hex(16)
+        with self.store.lock:
+            self.store.sessions[session_id] = email
+        self.new_cookies[SESSION_COOKIE] = session_id
+
+        self._redirect(self.prefix)
+
+    def _log_out(self):
+        """End the user's session."""
+        session_id = self._cookie(SESSION_COOKIE)
+        with self.store.lock:
+            self.store.sessions.pop(session_id, None)
+        self.new_cookies[SESSION_COOKIE] = ""
+
+        self._redirect(self.prefix)
+
+    def _account_page(self):
+        """Render the profile of the logged-in user."""
+        email = self._user()
+        if email is None:
+            self._redirect(f"{self.prefix}accounts/login/")
+            return
+
+        self._render(
+            "Profile", ACCOUNT_CONTENT.format(email=html.escape(email))
+        )
+
+    def _render(self, title, content, scripts=""):
+        """Send a page with the header and the pending messages."""
+        key = self._basket_key()
+        with self.store.lock:
+            messages = self.store.messages.pop(key, [])
+
+        links = USER_LINKS if self._user() is not None else GUEST_LINKS
+        self._send(200, PAGE_TEMPLATE.format(
+            language=self.language,
+            title=title,
+            prefix=self.prefix,
+            account_links=links.format(prefix=self.prefix),
+            messages="".join(messages),
+            content=content,
+            scripts=scripts
+        ))
+
+    def _user(self):
+        """Return the email of the logged-in user or None for a guest."""
+        with self.store.lock:
+            return self.store.sessions.get(self._cookie(SESSION_COOKIE))
+
+    def _basket_key(self, create=False):
+        """Return the key of the visitor's basket."""
+        email = self._user()
+        if email is not None:
+            return f"user:{email}"
+
+        basket_id = self._cookie(BASKET_COOKIE)
+        if basket_id is None and create:
+            basket_id = secrets.token_hex(8)
+            self.new_cookies[BASKET_COOKIE] = basket_id
+
+        return f"guest:{basket_id}"
+
+    def _csrf_token(self):
+        """Return the visitor's CSRF token, issuing a new one if needed."""
+        token = self._cookie(CSRF_COOKIE) or self.new_cookies.get(CSRF_COOKIE)
+        if token is None:
+            token = secrets.token_hex(16)
+            self.new_cookies[CSRF_COOKIE] = token
+
+        return token
+
+    def _is_csrf_token_valid(self):
+        """Return True if the form's CSRF token matches the cookie."""
+        token = self._cookie(CSRF_COOKIE)
+
+        return (
+            token is not None
+            and self.form.get("csrfmiddlewaretoken") == token
+        )
+
+    def _cookie(self, name):
+        """Return the value of the request's cookie or None."""
+        morsel = self.cookies.get(name)
+
+        return morsel.value if morsel is not None and morsel.value else None
+
+    def _preferred_language(self):
+        """Return the language prefix for the Accept-Language header."""
+        header = self.headers.get("Accept-Language") or "en"
+        language = header.split(",")[0].split(";")[0].strip().lower()
+
+        return LANGUAGE_PREFIXES.get(language, language)
+
+    def _redirect(self, location):
+        """Send a redirect to the location."""
+        self._send(302, "", extra_headers={"Location": location})
+
+    def _send(self, status, body, extra_headers=None):
+        """Send the response with the new cookies."""
+        payload = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        for name, value in self.new_cookies.items():
+            self.send_header("Set-Cookie", f"{name}={value}; Path=/")
+        self.end_headers()
+        self.wfile.write(payload)
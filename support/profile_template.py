@@ -0,0 +1,162 @@
+"""
+Defines ProfileTemplate: a pre-warmed Chrome profile cloned per browser.
+
+A new Chrome starts with an empty profile, so every browser downloads
+and compiles the store's CSS, JS, and fonts again. The template is
+a user data directory filled once per run by a browser that visits the
+store's pages. Its cookies and storage are then removed, so the
+browsers cloned from it share only the HTTP and code caches.
+
+A clone is a copy-on-write (reflink) copy where the file system supports
+it, and a real copy otherwise. No file is shared between the clones:
+Chrome rewrites its cache files in place, so a linked file would be
+written by several browsers and by the template at once. A clone is
+removed once its browser quits (see launch()), and the clones left
+behind at the end of the session by remove_clones().
+"""
+
+import os
+import shutil
+import tempfile
+
+from filelock import FileLock
+
+try:
+    import fcntl
+except ImportError:
+    # On Windows: the clones fall back to copies.
+    fcntl = None
+
+# The ioctl cloning a file on Linux file systems like Btrfs and XFS.
+FICLONE = 0x40049409
+
+# The user's data removed from the template: cookies, web storage,
+# history, and the locks of the browser that built it.
+USER_DATA = tuple(
+    os.path.join("Default", *path.split("/")) for path in (
+        "Cookies",
+        "Cookies-journal",
+        "Network/Cookies",
+        "Network/Cookies-journal",
+        "Local Storage",
+        "Session Storage",
+        "WebStorage",
+        "IndexedDB",
+        "Service Worker",
+        "Shared Storage",
+        "Sessions",
+        "History",
+        "History-journal",
+        "Login Data",
+        "Login Data-journal",
+        "Web Data",
+        "Web Data-journal",
+    )
+) + ("SingletonCookie", "SingletonLock", "SingletonSocket")
+
+# The file marking a completely built template.
+READY_FILE = "template-ready"
+
+
+def _remove(path):
+    """Remove the file, link, or directory if it exists."""
+    if os.path.islink(path) or os.path.isfile(path):
+        os.unlink(path)
+    elif os.path.isdir(path):
+        shutil.rmtree(path)
+
+
+class ProfileTemplate:
+    """A warm Chrome user data directory and its clones."""
+
+    def __init__(self, directory, clones_directory):
+        """
+        Initialize the template kept in the directory.
+
+        The clones are created in the clones directory. The template
+        is built once and shared by the processes using the directory.
+        """
+        self.directory = str(directory)
+        self.clones_directory = str(clones_directory)
+        self._lock = FileLock(f"{self.directory}.lock")
+        self._reflinks_supported = fcntl is not None
+
+    def build(self, start_browser, urls):
+        """
+        Fill the template by visiting the URLs unless it is ready.
+
+        start_browser(user_data_dir) returns a browser using the
+        directory.
+        """
+        with self._lock:
+            if os.path.exists(os.path.join(self.directory, READY_FILE)):
+                return
+
+            _remove(self.directory)
+            browser = start_browser(self.directory)
+            try:
+                for url in urls:
+                    browser.get(url)
+            finally:
+                browser.quit()
+
+            for path in USER_DATA:
+                _remove(os.path.join(self.directory, path))
+            open(os.path.join(self.directory, READY_FILE), "w").close()
+
+    def clone(self):
+        """Return the user data directory of a new clone."""
+        os.makedirs(self.clones_directory, exist_ok=True)
+        target = tempfile.mkdtemp(prefix="profile-", dir=self.clones_directory)
+
+        shutil.copytree(
+            self.directory, target,
+            copy_function=self._clone_file,
+            ignore=shutil.ignore_patterns(READY_FILE),
+            dirs_exist_ok=True
+        )
+
+        return target
+
+    def launch(self, start_browser):
+        """
+        Return a browser started with a new clone.
+
+        start_browser(user_data_dir) returns a browser using the
+        directory. The clone is removed once the browser quits.
+        """
+        user_data_dir = self.clone()
+        try:
+            browser = start_browser(user_data_dir)
+        except BaseException:
+            shutil.rmtree(user_data_dir, ignore_errors=True)
+            raise
+
+        quit_browser = browser.quit
+
+        def quit_and_remove_clone():
+            try:
+                quit_browser()
+            finally:
+                shutil.rmtree(user_data_dir, ignore_errors=True)
+
+        browser.quit = quit_and_remove_clone
+
+        return browser
+
+    def remove_clones(self):
+        """Remove the clones left behind (e.g., by crashed browsers)."""
+        shutil.rmtree(self.clones_directory, ignore_errors=True)
+
+    def _clone_file(self, source, target):
+        """Reflink the file, or copy it."""
+        if self._reflinks_supported:
+            try:
+                with open(source, "rb") as src, open(target, "wb") as dst:
+                    fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                return target
+            except OSError:
+                self._reflinks_supported = False
+                os.unlink(target)
+
+        return shutil.copy2(source, target)
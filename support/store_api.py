@@ -0,0 +1,121 @@
+"""
+Defines StoreApi: a non-UI client for the web store's account pages.
+
+Signs up new users by posting the registration form (with its CSRF
+token) over a pooled HTTP session, and injects the resulting session
+cookie into a browser, so that the tests start already logged in.
+"""
+
+import re
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from configuration import Links
+
+# The Django session cookie that identifies a logged-in user.
+SESSION_COOKIE = "sessionid"
+
+# Extracts the CSRF token from the hidden input of a form.
+CSRF_TOKEN_PATTERN = re.compile(
+    r"""name=["']csrfmiddlewaretoken["'][^>]*value=["']([^"']+)["']"""
+)
+
+# Number of keep-alive connections kept by the HTTP session.
+POOL_SIZE = 10
+
+# Timeout (in seconds) for a single HTTP request.
+REQUEST_TIMEOUT = 10
+
+
+def generate_user_credentials():
+    """Generate a unique email and a password using the current time."""
+    timestamp = str(time.time())
+
+    return timestamp + "@fakemail.org", timestamp + "xyz"
+
+
+class SignUpError(Exception):
+    """Raised when the web store does not sign up the user."""
+
+
+class StoreApi:
+    """Sign up users through HTTP requests and share them with browsers."""
+
+    def __init__(self, user_language):
+        """Initialize the pooled HTTP session for the given locale."""
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept-Language"] = user_language
+
+    def sign_up_new_user(self, email, password):
+        """
+        Sign up a new user and return the cookies of the user's session.
+
+        Each call starts with an empty cookie jar, so the connections
+        are reused while the users stay independent.
+        """
+        self.session.cookies.clear()
+
+        login_page = self.session.get(
+            Links.LOGIN_PAGE, timeout=REQUEST_TIMEOUT
+        )
+        login_page.raise_for_status()
+
+        csrf_token = CSRF_TOKEN_PATTERN.search(login_page.text)
+        if csrf_token is None:
+            raise SignUpError("CSRF token is not found on the login page")
+
+        response = self.session.post(
+            login_page.url,
+            data={
+                "csrfmiddlewaretoken": csrf_token.group(1),
+                "registration-email": email,
+                "registration-password1": password,
+                "registration-password2": password,
+                "registration_submit": "Register",
+            },
+            headers={"Referer": login_page.url},
+            timeout=REQUEST_TIMEOUT
+        )
+        response.raise_for_status()
+
+        if SESSION_COOKIE not in self.session.cookies:
+            raise SignUpError(f"User '{email}' was not signed up")
+
+        return [
+            {
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "secure": cookie.secure,
+            }
+            for cookie in self.session.cookies
+        ]
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
+
+
+def inject_cookies(browser, cookies):
+    """
+    Add the cookies to the browser.
+
+    Chromium browsers set them through CDP without loading a page.
+    Other browsers have to open the web store first.
+    """
+    if hasattr(browser, "execute_cdp_cmd"):
+        for cookie in cookies:
+            browser.execute_cdp_cmd("Network.setCookie", cookie)
+        return
+
+    browser.get(Links.MAIN_PAGE)
+    for cookie in cookies:
+        browser.add_cookie(cookie)
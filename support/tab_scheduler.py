@@ -0,0 +1,197 @@
+"""
+Defines TabScheduler: concurrent test cases in the tabs of one browser.
+
+A single Chrome instance runs several cases at once, each in a tab of
+its own isolated browsing context (separate cookies and storage, like
+an incognito window), so the baskets of the cases do not mix. Every
+WebDriver command goes through the scheduler: it takes the browser's
+lock, switches to the tab of the calling thread if needed, and runs the
+command. The waits poll (see TabDriver), so while a case waits for an
+element, the other cases use the browser.
+
+A case's tab stays open after the case has finished, until the caller
+is done with it (e.g., has saved the state of a failed case's tab).
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from selenium.webdriver.remote.command import Command
+
+# Time (in seconds) to wait for ChromeDriver to see a new tab.
+NEW_TAB_TIMEOUT = 5
+
+
+class TabDriver:
+    """
+    The browser as seen by the page objects of one tab.
+
+    Delegates everything to the browser and binds the calling thread
+    to the tab, so that the commands of the elements found through it
+    go to the tab too. All the tab's commands go through its execute()
+    method, so it can be wrapped like the browser's (e.g., to trace
+    the tab's commands).
+    """
+
+    # The event-driven waits hold the browser for the whole wait;
+    # the page objects poll instead (see pages/dom_waits.py).
+    polling_waits_only = True
+
+    def __init__(self, scheduler, handle):
+        """Initialize the driver of the tab with the window handle."""
+        self._scheduler = scheduler
+        self.handle = handle
+
+    def __getattr__(self, name):
+        """Return the browser's attribute, bound to the tab."""
+        self._scheduler.bind(self)
+
+        return getattr(self._scheduler.browser, name)
+
+    def execute(self, driver_command, params=None):
+        """Run the WebDriver command in the tab."""
+        return self._scheduler.execute_in_tab(
+            self.handle, driver_command, params
+        )
+
+
+class TabScheduler:
+    """Run callables concurrently, each with a tab of the browser."""
+
+    def __init__(self, browser, max_tabs):
+        """
+        Take over the browser's commands.
+
+        At most max_tabs cases run at the same time.
+        """
+        self.browser = browser
+        self.max_tabs = max_tabs
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._current_handle = browser.current_window_handle
+        self._home_handle = self._current_handle
+        self._executor = ThreadPoolExecutor(
+            max_tabs, thread_name_prefix="tab"
+        )
+        # The Futures of the submitted cases and the (context ID, tab)
+        # of their open tabs, by the caller's case IDs.
+        self._results = {}
+        self._tabs = {}
+        self._execute = browser.execute
+
+        def scheduled_execute(driver_command, params=None):
+            tab = getattr(self._local, "tab", None)
+            if tab is not None:
+                return tab.execute(driver_command, params)
+
+            return self.execute_in_tab(None, driver_command, params)
+
+        browser.execute = scheduled_execute
+
+    def __contains__(self, case_id):
+        """Return True if the case has been submitted."""
+        return case_id in self._results
+
+    def bind(self, tab):
+        """Send the calling thread's commands to the TabDriver's tab."""
+        self._local.tab = tab
+
+    def execute_in_tab(self, handle, driver_command, params=None):
+        """
+        Run the WebDriver command in the tab with the window handle.
+
+        With no handle, the command goes to the current window.
+        """
+        with self._lock:
+            if driver_command == Command.SWITCH_TO_WINDOW:
+                result = self._execute(driver_command, params)
+                self._current_handle = params["handle"]
+                return result
+
+            if handle is not None and handle != self._current_handle:
+                self._execute(Command.SWITCH_TO_WINDOW, {"handle": handle})
+                self._current_handle = handle
+
+            return self._execute(driver_command, params)
+
+    def submit(self, case_id, function, *args, **kwargs):
+        """
+        Run function(tab_driver, *args, **kwargs) in a new tab.
+
+        The tab stays open until finished(case_id).
+        """
+        self._results[case_id] = self._executor.submit(
+            self._run_in_tab, case_id, function, *args, **kwargs
+        )
+
+    def result(self, case_id):
+        """Wait for the case and return its result (or raise its error)."""
+        return self._results[case_id].result()
+
+    @contextmanager
+    def finished(self, case_id):
+        """
+        Wait for the case, provide its TabDriver, and close the tab.
+
+        The TabDriver is None if the tab has not been opened.
+        """
+        wait([self._results.pop(case_id)])
+        context_id, tab = self._tabs.pop(case_id, (None, None))
+        try:
+            yield tab
+        finally:
+            if tab is not None:
+                self._close_tab(context_id, tab.handle)
+
+    def close(self):
+        """
+        Drop the cases not started yet (e.g., when pytest stops early),
+        wait for the running ones, and quit the browser.
+        """
+        self._executor.shutdown(cancel_futures=True)
+        self.browser.quit()
+
+    def _run_in_tab(self, case_id, function, *args, **kwargs):
+        """Open a tab and run the function with its driver."""
+        context_id, handle = self._open_tab()
+        tab = TabDriver(self, handle)
+        self._tabs[case_id] = context_id, tab
+
+        return function(tab, *args, **kwargs)
+
+    def _open_tab(self):
+        """Return the context ID and window handle of a new isolated tab."""
+        self.bind(None)
+        with self._lock:
+            context_id = self.browser.execute_cdp_cmd(
+                "Target.createBrowserContext", {}
+            )["browserContextId"]
+            handle = self.browser.execute_cdp_cmd(
+                "Target.createTarget",
+                {"url": "about:blank", "browserContextId": context_id}
+            )["targetId"]
+
+        # The window handles of ChromeDriver are the DevTools target IDs.
+        deadline = time.monotonic() + NEW_TAB_TIMEOUT
+        while handle not in self.browser.window_handles:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"ChromeDriver does not see tab {handle}")
+            time.sleep(0.05)
+
+        return context_id, handle
+
+    def _close_tab(self, context_id, handle):
+        """Close the tab and dispose of its browsing context."""
+        self.bind(None)
+        with self._lock:
+            if self._current_handle == handle:
+                self.browser.switch_to.window(self._home_handle)
+            self.browser.execute_cdp_cmd(
+                "Target.closeTarget", {"targetId": handle}
+            )
+            self.browser.execute_cdp_cmd(
+                "Target.disposeBrowserContext",
+                {"browserContextId": context_id}
+            )
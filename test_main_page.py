@@ -1,7 +1,8 @@
 """
 Test module for the web store's main page.
 
-Covers access to the login and sign-up page and the guest basket state.
+Covers access to the login and sign-up page, the UI sign-up,
+and the guest basket state.
 """
 
 import pytest
@@ -10,12 +11,14 @@ from configuration import Links
 from pages.basket_page import BasketPage
 from pages.login_and_sign_up_page import LoginAndSignUpPage
 from pages.main_page import MainPage
+from support.store_api import generate_user_credentials
 
 
 @pytest.mark.login_and_sign_up
 class TestLoginAndSignUpFromMainPage:
     """Tests for accessing the login/sign-up page from the main page."""
 
+    @pytest.mark.no_js
     def test_guest_should_see_login_and_sign_up_link_on_main_page(
             self,
             browser
@@ -32,6 +35,8 @@ class TestLoginAndSignUpFromMainPage:
 
         main_page.should_be_login_and_sign_up_link()
 
+    @pytest.mark.navigation
+    @pytest.mark.no_js
     def test_guest_can_go_to_login_and_sign_up_page_from_main_page(
             self,
             browser
@@ -55,29 +60,52 @@ class TestLoginAndSignUpFromMainPage:
 
         login_and_sign_up_page.should_be_login_and_sign_up_page()
 
+    def test_guest_can_sign_up_from_main_page(self, browser, open_page):
+        """
+        Check that a guest can sign up through the sign-up form.
+
+        Steps:
+        1. Open the login and sign-up page (at its route, or from
+           the main page in the navigation runs).
+        2. Generate an email and a password using the current time.
+        3. Perform the sign-up.
+        4. Check that the user is authorized (the user icon is visible).
+        """
+        login_and_sign_up_page = open_page(
+            LoginAndSignUpPage,
+            via=MainPage(browser, Links.MAIN_PAGE)
+        )
+
+        email, password = generate_user_credentials()
+
+        login_and_sign_up_page.sign_up_new_user(email, password)
+
+        login_and_sign_up_page.should_be_authorized_user()
+
 
 @pytest.mark.basket_guest
 class TestGuestBasketFromMainPage:
     """Tests for the basket accessed by a guest from the main page."""
 
+    @pytest.mark.no_js
     def test_guest_cant_see_product_in_basket_opened_from_main_page(
             self,
-            browser
+            browser,
+            open_page
     ):
         """
         Check that a guest's basket is empty by default.
 
         Steps:
-        1. Open the main page.
-        2. Go to the basket page.
-        3. Check that the basket contains no items.
-        4. Check for the presence of the 'Empty basket' message.
+        1. Open the basket page (at its route, or from the main page
+           in the navigation runs).
+        2. Check that the basket contains no items.
+        3. Check for the presence of the 'Empty basket' message.
         """
-        main_page = MainPage(browser, Links.MAIN_PAGE)
-        main_page.open()
-
-        main_page.go_to_basket()
-        basket_page = BasketPage(browser, browser.current_url)
+        basket_page = open_page(
+            BasketPage,
+            via=MainPage(browser, Links.MAIN_PAGE)
+        )
 
         basket_page.should_be_empty()
         basket_page.should_be_empty_basket_message()
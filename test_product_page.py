@@ -4,14 +4,14 @@ Test module for the product page.
 Covers the login and sign-up page access, basket flow, and UI messages.
 """
 
-import time
+import asyncio
 
 import pytest
 
 from configuration import Links
+from pages.aio.product_page import AsyncProductPage
 from pages.basket_page import BasketPage
 from pages.login_and_sign_up_page import LoginAndSignUpPage
-from pages.main_page import MainPage
 from pages.product_page import ProductPage
 
 
@@ -19,6 +19,7 @@ from pages.product_page import ProductPage
 class TestLoginAndSignUpFromProductPage:
     """Tests for the login/sign-up page access from the product page."""
 
+    @pytest.mark.no_js
     def test_guest_should_see_login_and_sign_up_link_on_product_page(
             self,
             browser
@@ -35,6 +36,8 @@ class TestLoginAndSignUpFromProductPage:
 
         product_page.should_be_login_and_sign_up_link()
 
+    @pytest.mark.navigation
+    @pytest.mark.no_js
     def test_guest_can_go_to_login_and_sign_up_page_from_product_page(
             self,
             browser
@@ -63,6 +66,7 @@ class TestLoginAndSignUpFromProductPage:
 class TestGuestAddToBasketFromProductPage:
     """Tests for adding a product from the product page by a guest."""
 
+    @pytest.mark.no_js
     def test_guest_cant_see_product_added_message(self, browser):
         """
         Check that there is no 'Product added' message before adding.
@@ -76,24 +80,25 @@ class TestGuestAddToBasketFromProductPage:
 
         product_page.should_not_be_product_added_message()
 
+    @pytest.mark.no_js
     def test_guest_cant_see_product_in_basket_opened_from_product_page(
             self,
-            browser
+            browser,
+            open_page
     ):
         """
         Check that a guest's basket is empty by default.
 
         Steps:
-        1. Open the product page.
-        2. Go to the basket page.
-        3. Check that the basket contains no items.
-        4. Check for the presence of the 'Empty basket' message.
+        1. Open the basket page (at its route, or from the product page
+           in the navigation runs).
+        2. Check that the basket contains no items.
+        3. Check for the presence of the 'Empty basket' message.
         """
-        product_page = ProductPage(browser, Links.PRODUCT_PAGE)
-        product_page.open()
-
-        product_page.go_to_basket()
-        basket_page = BasketPage(browser, browser.current_url)
+        basket_page = open_page(
+            BasketPage,
+            via=ProductPage(browser, Links.PRODUCT_PAGE)
+        )
 
         basket_page.should_be_empty()
         basket_page.should_be_empty_basket_message()
@@ -108,6 +113,7 @@ class TestGuestAddToBasketFromProductPage:
         ) for n in range(10)
     ]
 
+    @pytest.mark.multi_tab
     @pytest.mark.parametrize("link", PROMO_LINKS)
     def test_guest_can_add_product_to_basket(self, browser, link):
         """
@@ -115,32 +121,35 @@ class TestGuestAddToBasketFromProductPage:
 
         Steps:
         1. Open the product page.
-        2. Get the product name on the product page.
-        3. Get the product price on the product page.
+        2. Take a snapshot of the product page.
+        3. Get the product name and price from the snapshot.
         4. Add the product to the basket.
         5. Solve the quiz in the alert.
-        6. Verify the 'Product added' message is present.
-        7. Verify the basket total message is present.
-        8. Verify the product name in the message matches added product.
-        9. Verify the basket total matches the added product's price.
+        6. Take a snapshot of the page once the messages appear.
+        7. Verify the 'Product added' message is present.
+        8. Verify the basket total message is present.
+        9. Verify the product name in the message matches added product.
+        10. Verify the basket total matches the added product's price.
         """
         product_page = ProductPage(browser, link)
         product_page.open()
 
-        product_name = product_page.get_product_name()
-        product_price = product_page.get_product_price()
+        snapshot = product_page.take_product_snapshot()
+        product_name = product_page.get_product_name(snapshot=snapshot)
+        product_price = product_page.get_product_price(snapshot=snapshot)
 
         product_page.add_product_to_basket()
 
         product_page.solve_quiz_alert()
 
-        product_page.should_be_product_added_message()
-        product_page.should_be_basket_total_message()
+        snapshot = product_page.take_product_snapshot(after_adding=True)
+        product_page.should_be_product_added_message(snapshot)
+        product_page.should_be_basket_total_message(snapshot)
         product_page.should_be_correct_product_name_in_product_added_message(
-            product_name
+            product_name, snapshot
         )
         product_page.should_be_correct_price_in_basket_total_message(
-            product_price
+            product_price, snapshot
         )
 
     @pytest.mark.xfail(
@@ -188,38 +197,82 @@ class TestGuestAddToBasketFromProductPage:
         product_page.should_disappear_product_added_message()
 
 
-@pytest.mark.basket_user
-class TestUserAddToBasketFromProductPage:
-    """Tests for adding a product from its page for registered users."""
+@pytest.mark.basket_guest
+class TestGuestAddToBasketConcurrently:
+    """Tests for adding products in several tabs at once (async API)."""
+
+    # The promo offers run together, and offer 7 separately: it is
+    # expected to fail due to a known bug.
+    PROMO_OFFERS = [
+        pytest.param([n for n in range(10) if n != 7], id="offers"),
+        pytest.param([7], id="offer7", marks=pytest.mark.xfail),
+    ]
 
-    @pytest.fixture(scope="function", autouse=True)
-    def setup(self, browser):
+    @pytest.mark.parametrize("offers", PROMO_OFFERS)
+    async def test_guests_can_add_products_to_basket_concurrently(
+            self,
+            async_browser,
+            offers
+    ):
         """
-        Sign up a new user before each test in this class.
+        Verify guests in separate tabs can add products at the same time.
 
-        Steps:
-        1. Open the main page.
-        2. Go to the login and sign-up page.
-        3. Generate an email and a password using the current time.
-        4. Perform the sign-up.
-        5. Check that the user is authorized (the user icon is visible).
+        Steps (for every promo offer, concurrently in a tab of its own):
+        1. Open the product page.
+        2. Get the product name and price.
+        3. Add the product to the basket.
+        4. Solve the quiz in the alert.
+        5. Verify the 'Product added' message is present.
+        6. Verify the basket total message is present.
+        7. Verify the product name in the message matches added product.
+        8. Verify the basket total matches the added product's price.
         """
-        main_page = MainPage(browser, Links.MAIN_PAGE)
-        main_page.open()
+        await asyncio.gather(*(
+            self.add_promo_product_to_basket(async_browser, offer)
+            for offer in offers
+        ))
+
+    @staticmethod
+    async def add_promo_product_to_basket(async_browser, offer):
+        """Run the add-to-basket steps for the offer in a new tab."""
+        tab = await async_browser.new_tab()
+        page = AsyncProductPage(
+            tab, f"{Links.PRODUCT_PAGE}?promo=offer{offer}"
+        )
+        await page.open()
 
-        main_page.go_to_login_and_sign_up_page()
-        login_and_sign_up_page = LoginAndSignUpPage(
-            browser,
-            browser.current_url
+        product_name = await page.get_product_name()
+        product_price = await page.get_product_price()
+
+        await page.add_product_to_basket()
+
+        await page.solve_quiz_alert()
+
+        await page.should_be_product_added_message()
+        await page.should_be_basket_total_message()
+        await page.should_be_correct_product_name_in_product_added_message(
+            product_name
         )
+        await page.should_be_correct_price_in_basket_total_message(
+            product_price
+        )
+
+        await tab.close()
 
-        timestamp = str(time.time())
-        email = timestamp + "@fakemail.org"
-        password = timestamp + "xyz"
 
-        login_and_sign_up_page.sign_up_new_user(email, password)
+@pytest.mark.basket_user
+class TestUserAddToBasketFromProductPage:
+    """Tests for adding a product from its page for registered users."""
 
-        login_and_sign_up_page.should_be_authorized_user()
+    @pytest.fixture(scope="function", autouse=True)
+    def setup(self, authorized_user):
+        """
+        Log in a registered user before each test in this class.
+
+        The user is signed up over HTTP (the UI flow is covered
+        by the sign-up test of the main page) and shared between
+        the tests, unless a test is marked with fresh_user.
+        """
 
     def test_user_cant_see_product_added_message(self, browser):
         """
@@ -227,40 +280,42 @@ class TestUserAddToBasketFromProductPage:
 
         Steps:
         1. Open the product page.
-        2. Check that there is no 'Product added' message.
+        2. Check that the user is authorized (the user icon is visible).
+        3. Check that there is no 'Product added' message.
         """
         product_page = ProductPage(browser, Links.PRODUCT_PAGE)
         product_page.open()
 
+        product_page.should_be_authorized_user()
+
         product_page.should_not_be_product_added_message()
 
+    # The basket of a shared user could already contain the product.
+    @pytest.mark.fresh_user
     def test_user_can_add_product_to_basket(self, browser):
         """
         Verify a user can add a product and the correct one is added.
 
         Steps:
         1. Open the product page.
-        2. Get the product name on the product page.
-        3. Get the product price on the product page.
-        4. Add the product to the basket.
-        5. Verify the 'Product added' message is present.
-        6. Verify the basket total message is present.
-        7. Verify the product name in the message matches added product.
-        8. Verify the basket total matches the added product's price.
+        2. Check that the user is authorized (the user icon is visible).
+        3. Take a snapshot of the product page.
+        4. Get the product name and price from the snapshot.
+        5. Add the product to the basket.
+        6. Wait for the 'Product added' and the basket total messages
+           with the product's name and price, all in one wait.
         """
         product_page = ProductPage(browser, Links.PRODUCT_PAGE)
         product_page.open()
 
-        product_name = product_page.get_product_name()
-        product_price = product_page.get_product_price()
+        product_page.should_be_authorized_user()
+
+        snapshot = product_page.take_product_snapshot()
+        product_name = product_page.get_product_name(snapshot=snapshot)
+        product_price = product_page.get_product_price(snapshot=snapshot)
 
         product_page.add_product_to_basket()
 
-        product_page.should_be_product_added_message()
-        product_page.should_be_basket_total_message()
-        product_page.should_be_correct_product_name_in_product_added_message(
-            product_name
-        )
-        product_page.should_be_correct_price_in_basket_total_message(
-            product_price
+        product_page.should_be_product_added_to_basket(
+            product_name, product_price
         )
@@ -0,0 +1,6 @@
+"""
+The tests of the framework's own code.
+
+Packages:
+    unit: Contains the unit tests that need no browser or web store.
+"""
@@ -0,0 +1,11 @@
+"""
+The unit tests of the framework's support code.
+
+They have their own pytest.ini, so the browser fixtures and hooks of
+the root conftest are not loaded: run them with `pytest tests/unit`.
+
+Modules:
+    test_duration_schedule: Tests the duration-aware scheduling.
+    test_http_cache: Tests the HTTP cache store and its rules.
+    test_http_driver: Tests the HTTP driver's element locating.
+"""
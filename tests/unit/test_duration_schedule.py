@@ -0,0 +1,186 @@
+"""
+Test module for the duration-aware scheduling of the tests.
+
+Covers the grouping of the tests, the duration keys, the balancing of
+the CI shards, and the pytest-xdist placement of the grouped tests.
+No browser is needed.
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from support.duration_schedule import (
+    LOCAL_STORE_URL,
+    DurationStore,
+    duration_key,
+    group_key,
+)
+
+pytest_plugins = ("pytester",)
+
+# The directory of the framework's conftest.py.
+FRAMEWORK_ROOT = Path(__file__).resolve().parents[2]
+
+
+class StubItem:
+    """A stand-in for a collected test item."""
+
+    def __init__(self, nodeid, *fixturenames):
+        """Initialize the item of the node ID using the fixtures."""
+        self.nodeid = nodeid
+        self.fixturenames = list(fixturenames)
+        self.parent = StubParent(nodeid.rpartition("::")[0])
+
+
+class StubParent:
+    """A stand-in for the class or module holding a test item."""
+
+    def __init__(self, nodeid):
+        """Initialize the node of the node ID."""
+        self.nodeid = nodeid
+
+
+class TestDurationKeys:
+    """Tests for the grouping of the tests and their duration keys."""
+
+    def test_tests_with_shared_fixture_are_grouped_by_parent(self):
+        """Check that only the tests with a shared fixture share a group."""
+        shared = StubItem("test_a.py::TestUser::test_one", "authorized_user")
+        alone = StubItem("test_a.py::TestGuest::test_two", "browser")
+
+        assert group_key(shared) == "test_a.py::TestUser"
+        assert group_key(alone) == alone.nodeid
+
+    def test_duration_key_drops_run_specific_parts(self):
+        """Check that the xdist group suffix and the store's port are gone."""
+        url = "http://127.0.0.1:51234/"
+        grouped = "test_a.py::TestUser::test_one@test_a.py::TestUser"
+        parametrized = f"test_a.py::test_add[{url}?promo=offer1]"
+        with_at = "test_a.py::test_sign_up[user@example.com]"
+
+        assert duration_key(grouped) == "test_a.py::TestUser::test_one"
+        assert duration_key(parametrized, url) == (
+            f"test_a.py::test_add[{LOCAL_STORE_URL}?promo=offer1]"
+        )
+        assert duration_key(with_at) == with_at
+
+
+class TestDurationStore:
+    """Tests for the saved durations and the CI shards."""
+
+    def test_recorded_durations_match_on_a_later_run(self, tmp_path):
+        """Check that a duration saved with one store port is found later."""
+        path = str(tmp_path / "durations.json")
+        first = DurationStore(path, local_store_url="http://127.0.0.1:1111/")
+        first.record("test_a.py::test_add[http://127.0.0.1:1111/x]", 2.5)
+        first.save()
+
+        second = DurationStore(path, local_store_url="http://127.0.0.1:2222/")
+        item = StubItem("test_a.py::test_add[http://127.0.0.1:2222/x]")
+
+        assert second.estimate(item) == 2.5
+
+    def test_shards_are_balanced_longest_group_first(self, tmp_path):
+        """
+        Check the longest-processing-time-first split into shards.
+
+        Steps:
+        1. Save the durations of a group of two tests and of three others.
+        2. Split the tests into two shards.
+        3. Check that the group stays in one shard and every next group
+           goes to the less loaded shard (6.5 s and 6 s).
+        """
+        path = tmp_path / "durations.json"
+        path.write_text(json.dumps({
+            "test_a.py::TestUser::test_one": 4.0,
+            "test_a.py::TestUser::test_two": 2.0,
+            "test_a.py::test_long": 5.0,
+            "test_a.py::test_short": 1.0,
+            "test_a.py::test_shorter": 0.5,
+        }), encoding="utf-8")
+        store = DurationStore(str(path))
+        items = [
+            StubItem("test_a.py::TestUser::test_one", "authorized_user"),
+            StubItem("test_a.py::TestUser::test_two", "authorized_user"),
+            StubItem("test_a.py::test_long"),
+            StubItem("test_a.py::test_short"),
+            StubItem("test_a.py::test_shorter"),
+        ]
+
+        first, rest = store.shard(items, 1, 2)
+        second, _ = store.shard(items, 2, 2)
+
+        assert [item.nodeid for item in first] == [
+            "test_a.py::TestUser::test_one",
+            "test_a.py::TestUser::test_two",
+            "test_a.py::test_shorter",
+        ]
+        assert [item.nodeid for item in second] == [
+            "test_a.py::test_long", "test_a.py::test_short"
+        ]
+        assert rest == second
+
+
+class TestXdistScheduling:
+    """Tests for the --schedule-by-durations option under pytest-xdist."""
+
+    def test_grouped_tests_run_on_one_xdist_worker(
+            self,
+            pytester,
+            monkeypatch
+    ):
+        """
+        Check that --schedule-by-durations keeps a group on one worker.
+
+        Steps:
+        1. Create a suite with the framework's conftest: a class of tests
+           sharing the authorized_user fixture, and ungrouped tests.
+        2. Run it on two pytest-xdist workers with --schedule-by-durations.
+        3. Check that all the tests of the class ran on the same worker.
+        """
+        pytest.importorskip("xdist")
+        monkeypatch.setenv("PYTHONPATH", str(FRAMEWORK_ROOT))
+        pytester.makeconftest(
+            (FRAMEWORK_ROOT / "conftest.py").read_text(encoding="utf-8")
+        )
+        pytester.makepyfile(test_grouped="""
+            import os
+            import time
+
+            import pytest
+
+
+            def record(name):
+                with open(f"{name}.worker", "w") as file:
+                    file.write(os.environ["PYTEST_XDIST_WORKER"])
+                time.sleep(0.2)
+
+
+            @pytest.fixture
+            def authorized_user():
+                return None
+
+
+            class TestShared:
+                @pytest.mark.parametrize("n", range(4))
+                def test_shared(self, authorized_user, n):
+                    record(f"shared{n}")
+
+
+            @pytest.mark.parametrize("n", range(4))
+            def test_alone(n):
+                record(f"alone{n}")
+        """)
+
+        result = pytester.runpytest_subprocess(
+            "-p", "xdist", "-n", "2", "--schedule-by-durations"
+        )
+
+        result.assert_outcomes(passed=8)
+        workers = {
+            (pytester.path / f"shared{n}.worker").read_text()
+            for n in range(4)
+        }
+        assert len(workers) == 1
@@ -0,0 +1,103 @@
+"""
+Test module for the record-and-replay HTTP cache.
+
+Covers the cacheability rules and the size-bounded store: the
+least-recently-used eviction, the blobs shared by several URLs, and the
+merging of the indexes saved by several pytest-xdist workers. No
+browser is needed.
+"""
+
+import itertools
+import os
+
+import pytest
+
+from support import http_cache
+from support.http_cache import HttpCache, HttpCacheStore, REPLAY
+
+STATIC_URL = "http://127.0.0.1:8000/static/"
+
+# Bytes per megabyte: the size limits of the stores are in megabytes.
+MB = 2 ** 20
+
+
+@pytest.fixture(autouse=True)
+def ticking_clock(monkeypatch):
+    """Make every use of the store's entries one second later."""
+    clock = itertools.count(1)
+    monkeypatch.setattr(http_cache.time, "time", lambda: next(clock))
+
+
+class TestCacheRules:
+    """Tests for the choice of the responses to cache."""
+
+    def test_only_matching_get_requests_are_cacheable(self, tmp_path):
+        """Check that the first matching rule decides, and POSTs never."""
+        cache = HttpCache(HttpCacheStore(str(tmp_path)), REPLAY)
+
+        assert cache.is_cacheable("GET", f"{STATIC_URL}css/styles.css")
+        assert cache.is_cacheable("GET", "http://cdn.test/font.woff2?v=4")
+        assert not cache.is_cacheable("GET", "http://127.0.0.1/basket/x.js")
+        assert not cache.is_cacheable("GET", "http://127.0.0.1/catalogue/")
+        assert not cache.is_cacheable("POST", f"{STATIC_URL}css/styles.css")
+
+
+class TestHttpCacheStore:
+    """Tests for the size-bounded store shared by the workers."""
+
+    def test_least_recently_used_entries_are_evicted(self, tmp_path):
+        """
+        Check that the flush evicts the entries used the longest ago.
+
+        Steps:
+        1. Save three 10-byte responses to a store limited to 25 bytes.
+        2. Read the first one again, so the second one is the oldest.
+        3. Flush the store and check that only the second one is gone,
+           with its body.
+        """
+        store = HttpCacheStore(str(tmp_path), max_size_mb=25 / MB)
+        for name in ("a", "b", "c"):
+            store.put(f"{STATIC_URL}{name}.js", 200, [], name.encode() * 10)
+        store.get(f"{STATIC_URL}a.js")
+
+        store.flush()
+
+        assert store.get(f"{STATIC_URL}b.js") is None
+        assert store.get(f"{STATIC_URL}a.js") == (200, [], b"a" * 10)
+        assert store.get(f"{STATIC_URL}c.js") == (200, [], b"c" * 10)
+        assert len(os.listdir(tmp_path / "blobs")) == 2
+
+    def test_shared_body_is_kept_while_still_used(self, tmp_path):
+        """Check that a body is removed with the last URL using it."""
+        store = HttpCacheStore(str(tmp_path), max_size_mb=15 / MB)
+        store.put(f"{STATIC_URL}old.js", 200, [], b"x" * 10)
+        store.put(f"{STATIC_URL}copy.js", 200, [], b"x" * 10)
+        store.put(f"{STATIC_URL}new.js", 200, [], b"y" * 10)
+
+        store.flush()
+
+        assert store.get(f"{STATIC_URL}old.js") is None
+        assert store.get(f"{STATIC_URL}copy.js") is None
+        assert store.get(f"{STATIC_URL}new.js") == (200, [], b"y" * 10)
+        assert len(os.listdir(tmp_path / "blobs")) == 1
+
+    def test_workers_indexes_are_merged(self, tmp_path):
+        """
+        Check that the stores of two workers share their entries.
+
+        Steps:
+        1. Open two stores on one directory and save a response to each.
+        2. Flush both and open the store again.
+        3. Check that both responses are found.
+        """
+        first = HttpCacheStore(str(tmp_path))
+        second = HttpCacheStore(str(tmp_path))
+        first.put(f"{STATIC_URL}a.js", 200, [], b"a")
+        second.put(f"{STATIC_URL}b.js", 200, [], b"b")
+
+        first.flush()
+        second.flush()
+        reopened = HttpCacheStore(str(tmp_path))
+
+        assert reopened.get(f"{STATIC_URL}a.js") == (200, [], b"a")
+        assert reopened.get(f"{STATIC_URL}b.js") == (200, [], b"b")
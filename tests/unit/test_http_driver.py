@@ -0,0 +1,131 @@
+"""
+Test module for the locating of the elements by HttpDriver.
+
+Covers the forgiving parsing of the store's markup, the CSS selectors,
+and the other locator strategies of the page objects. No browser or
+web store is needed.
+"""
+
+import pytest
+from selenium.common.exceptions import InvalidSelectorException
+from selenium.webdriver.common.by import By
+
+from pages import locators
+from support.http_driver import find_nodes, parse_html
+
+PAGE = """
+<div id="main" class="product_main page">
+  <h1>Coders at Work</h1>
+  <p class="price_color">£19.99
+  <p class="instock availability">In stock
+  <ul class="breadcrumb">
+    <li><a href="/">Home</a>
+    <li><a href="/books/">Books</a>
+    <li class="active">Coders at Work
+  </ul>
+  <img src="cover.jpg" alt="Cover"><br>
+  <form id="add_to_basket_form" action="/basket/add/">
+    <input type="hidden" name="csrfmiddlewaretoken" value="token">
+    <input name="quantity" value="1" data-role="qty">
+    <button class="btn btn-add-to-basket" type="submit">Add</button>
+  </form>
+</div>
+<div class="basket-mini"><a href="/basket/">View basket</a></div>
+"""
+
+
+@pytest.fixture(scope="module")
+def root():
+    """Return the parsed test page."""
+    return parse_html(PAGE)
+
+
+def texts(nodes):
+    """Return the whitespace-normalized direct text of the nodes."""
+    return [" ".join((node.text or "").split()) for node in nodes]
+
+
+class TestParsing:
+    """Tests for the parsing of the store's markup."""
+
+    def test_unclosed_elements_are_closed_like_a_browser_does(self, root):
+        """Check the implicitly closed paragraphs and list items."""
+        main = find_nodes(root, By.ID, "main")[0]
+        items = find_nodes(root, By.TAG_NAME, "li")
+
+        assert [node.tag for node in main] == [
+            "h1", "p", "p", "ul", "img", "br", "form"
+        ]
+        assert all(item.getparent().tag == "ul" for item in items)
+        assert texts(items) == ["", "", "Coders at Work"]
+
+    def test_void_elements_have_no_children(self, root):
+        """Check that the elements without an end tag contain nothing."""
+        image = find_nodes(root, By.TAG_NAME, "img")[0]
+
+        assert len(image) == 0
+        assert dict(image.attrib) == {"src": "cover.jpg", "alt": "Cover"}
+
+
+class TestLocating:
+    """Tests for the locator strategies of the page objects."""
+
+    @pytest.mark.parametrize("by, value", [
+        (By.CSS_SELECTOR, "div >"),
+        (By.CSS_SELECTOR, "a, "),
+        (By.CSS_SELECTOR, "p:unknown"),
+        (By.CSS_SELECTOR, "a::before"),
+        (By.XPATH, "//a["),
+    ])
+    def test_invalid_locators_are_rejected(self, root, by, value):
+        """Check the WebDriver error for the locators that cannot work."""
+        with pytest.raises(InvalidSelectorException):
+            find_nodes(root, by, value)
+
+    @pytest.mark.parametrize("selector, expected", [
+        (".product_main .price_color", ["£19.99"]),
+        ("#main > p", ["£19.99", "In stock"]),
+        ("h1 ~ p.availability", ["In stock"]),
+        ("p + p", ["In stock"]),
+        ("ul li:last-child", ["Coders at Work"]),
+        ("li:nth-child(2) > a", ["Books"]),
+        ("p:first-of-type", ["£19.99"]),
+        ("[data-role]", [""]),
+        ("a[href^='/b']", ["Books", "View basket"]),
+        ("a[href$=\"/\"]", ["Home", "Books", "View basket"]),
+        ("[class~=page] > h1, .basket-mini a", [
+            "Coders at Work", "View basket"
+        ]),
+        ("li:nth-child(odd)", ["", "Coders at Work"]),
+        ("#main > :not(p):not(ul):not(form)", ["Coders at Work", "", ""]),
+    ])
+    def test_css_selectors_match_in_document_order(
+            self,
+            root,
+            selector,
+            expected
+    ):
+        """Check the supported CSS selectors against the test page."""
+        assert texts(find_nodes(root, By.CSS_SELECTOR, selector)) == expected
+
+    def test_other_locator_strategies(self, root):
+        """Check the ID, name, class, tag, link text, and XPath strategies."""
+        assert len(find_nodes(root, By.NAME, "quantity")) == 1
+        assert len(find_nodes(root, By.CLASS_NAME, "btn-add-to-basket")) == 1
+        assert len(find_nodes(root, By.TAG_NAME, "INPUT")) == 2
+        assert texts(find_nodes(root, By.LINK_TEXT, "Books")) == ["Books"]
+        assert texts(find_nodes(root, By.PARTIAL_LINK_TEXT, "basket")) == [
+            "View basket"
+        ]
+        assert texts(find_nodes(root, By.XPATH, "//li[a]/a")) == [
+            "Home", "Books"
+        ]
+
+    def test_page_object_locators_are_supported(self, root):
+        """Check that every locator of the page objects can be used."""
+        for name, holder in vars(locators).items():
+            if not name.endswith("Locators"):
+                continue
+            for value in vars(holder).values():
+                if isinstance(value, tuple) and len(value) == 2:
+                    find_nodes(root, *value)